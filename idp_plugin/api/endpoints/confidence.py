@@ -8,7 +8,12 @@ from idp_plugin.core.database import get_db
 from idp_plugin.models.extractions import Extraction
 from idp_plugin.models.field_confidence import FieldConfidence
 from idp_plugin.services.confidence_service import ConfidenceService
-from idp_plugin.schemas.confidence import ConfidenceResponse, ConfidenceSummaryResponse
+from idp_plugin.services.audit_service import AuditService
+from idp_plugin.schemas.confidence import (
+    ConfidenceResponse,
+    ConfidenceSummaryResponse,
+    FieldCorrectionRequest
+)
 
 router = APIRouter()
 
@@ -50,6 +55,38 @@ async def get_confidence(
     return summary
 
 
-
-
-
+@router.post("/{document_id}/corrections", response_model=ConfidenceSummaryResponse)
+async def correct_fields(
+    document_id: str,
+    request: FieldCorrectionRequest,
+    db: Session = Depends(get_db)
+):
+    """
+    Record reviewer corrections and refresh the confidence of the corrected fields
+    
+    - **document_id**: Document ID
+    - **corrections**: {field_path: {"old": value, "new": value}}
+    """
+    extraction = db.query(Extraction).filter(
+        Extraction.document_id == document_id
+    ).first()
+    
+    if not extraction:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Extraction not found"
+        )
+    
+    confidence_service = ConfidenceService(db)
+    if not db.query(FieldConfidence.id).filter(FieldConfidence.extraction_id == extraction.id).first():
+        confidence_service.calculate_confidence_for_extraction(extraction)
+    
+    # Logging the corrections recalculates only the corrected fields
+    AuditService(db).log_user_correction(
+        document_id=document_id,
+        extraction_id=extraction.id,
+        corrections=request.corrections,
+        user_id=request.user_id
+    )
+    
+    return confidence_service.get_confidence_summary(extraction)
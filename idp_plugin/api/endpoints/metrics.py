@@ -0,0 +1,30 @@
+"""
+Metrics endpoint for IDP plugin
+Exposes pipeline timings, token usage, cache hit rates and queue depths in Prometheus format
+"""
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from idp_plugin.core.database import get_db
+from idp_plugin.models.documents import Document, DocumentStatus
+from idp_plugin.core.telemetry import DOCUMENTS_BY_STATUS, PROMETHEUS_CONTENT_TYPE, render_metrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(db: Session = Depends(get_db)):
+    """
+    Prometheus scrape endpoint
+
+    Documents waiting in each processing status are reported as idp_documents{status=...}
+    """
+    counts = dict(
+        db.query(Document.status, func.count(Document.id)).group_by(Document.status).all()
+    )
+    for document_status in DocumentStatus:
+        DOCUMENTS_BY_STATUS.set(counts.get(document_status, 0), status=document_status.value)
+
+    return PlainTextResponse(render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
@@ -10,6 +10,8 @@ from idp_plugin.models.documents import Document
 from idp_plugin.services.ocr_service import OCRService
 from idp_plugin.services.extraction_service import ExtractionService
 from idp_plugin.core.exceptions import OCRProcessingError, ExtractionError
+from idp_plugin.core.config import IDPConfig
+from idp_plugin.core.telemetry import start_trace, track_queue
 
 router = APIRouter()
 
@@ -33,13 +35,22 @@ async def process_document(
                 detail="Document not found"
             )
         
-        # Perform OCR
-        ocr_service = OCRService(db)
-        ocr_results = ocr_service.process_document(document)
+        with start_trace(document_id) as trace, track_queue("processing"):
+            # Perform OCR
+            ocr_service = OCRService(db)
+            ocr_results = ocr_service.process_document(document)
+            
+            # Perform extraction
+            extraction_service = ExtractionService(db)
+            extraction = extraction_service.extract_from_document(document)
         
-        # Perform extraction
-        extraction_service = ExtractionService(db)
-        extraction = extraction_service.extract_from_document(document)
+        # Persist per-document timing breakdown
+        if IDPConfig.PERSIST_TIMINGS:
+            document.document_metadata = {
+                **(document.document_metadata or {}),
+                "timings": trace.breakdown()
+            }
+            db.commit()
         
         return {
             "document_id": document_id,
@@ -4,7 +4,7 @@ Aggregates all endpoints
 """
 
 from fastapi import APIRouter
-from idp_plugin.api.endpoints import upload, process, extraction, confidence, mapping
+from idp_plugin.api.endpoints import upload, process, extraction, confidence, mapping, metrics
 
 # Create main router
 idp_router = APIRouter()
@@ -15,6 +15,7 @@ idp_router.include_router(process.router, tags=["IDP - Process"])
 idp_router.include_router(extraction.router, tags=["IDP - Extraction"])
 idp_router.include_router(confidence.router, tags=["IDP - Confidence"])
 idp_router.include_router(mapping.router, tags=["IDP - Mapping"])
+idp_router.include_router(metrics.router, tags=["IDP - Metrics"])
 
 
 
@@ -0,0 +1,116 @@
+"""
+Benchmark for quantized RAG retrieval
+Compares the exact float path with the int8 scan + float32 re-rank path
+on synthetic embeddings (no database or OpenAI key needed)
+
+Usage:
+    python idp_plugin/benchmark_rag_quantization.py --rows 20000 --queries 50
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add parent directory to path so we can import idp_plugin
+current_dir = Path(__file__).parent
+parent_dir = current_dir.parent
+if str(parent_dir) not in sys.path:
+    sys.path.insert(0, str(parent_dir))
+
+from idp_plugin.utils.vector_quantization import (
+    quantize_int8,
+    int8_matrix,
+    approximate_cosine_scores,
+    exact_cosine_scores,
+    top_indices
+)
+
+
+def make_embeddings(rows: int, dimensions: int, clusters: int, seed: int) -> np.ndarray:
+    """Clustered unit vectors, closer to real text embeddings than pure noise"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimensions))
+    assignments = rng.integers(0, clusters, size=rows)
+    vectors = centers[assignments] + 0.8 * rng.normal(size=(rows, dimensions))
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def exact_path(query, embeddings, top_k):
+    """Current RAGRetrievalService behaviour: per-row float cosine over Python lists"""
+    query_array = np.array(query)
+    query_norm = np.linalg.norm(query_array)
+    results = []
+    for row_id, embedding in enumerate(embeddings):
+        vec = np.array(embedding)
+        norm = np.linalg.norm(vec)
+        similarity = float(np.dot(query_array, vec) / (query_norm * norm)) if norm else 0.0
+        results.append((row_id, similarity))
+    results.sort(key=lambda x: x[1], reverse=True)
+    return [row_id for row_id, _ in results[:top_k]]
+
+
+def quantized_path(query, quantized_rows, embeddings, top_k, rerank_candidates):
+    """int8 candidate scan followed by exact float32 re-ranking"""
+    matrix = int8_matrix(quantized_rows)
+    shortlist = top_indices(approximate_cosine_scores(query, matrix), max(rerank_candidates, top_k))
+    exact = exact_cosine_scores(query, [embeddings[i] for i in shortlist])
+    return [int(shortlist[i]) for i in top_indices(exact, top_k)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark quantized RAG retrieval")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--rerank", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"Generating {args.rows} x {args.dimensions} embeddings...")
+    vectors = make_embeddings(args.rows, args.dimensions, clusters=64, seed=args.seed)
+    embeddings = vectors.tolist()  # What ARRAY(Float) materializes as
+    quantized = [quantize_int8(row)[0] for row in embeddings]
+
+    rng = np.random.default_rng(args.seed + 1)
+    query_ids = rng.integers(0, args.rows, size=args.queries)
+    queries = [
+        (vectors[i] + 0.5 * rng.normal(size=args.dimensions) / np.sqrt(args.dimensions)).tolist()
+        for i in query_ids
+    ]
+
+    # Memory per row
+    float_row_bytes = sys.getsizeof(embeddings[0]) + sum(sys.getsizeof(x) for x in embeddings[0])
+    print("\nStorage per row:")
+    print(f"  float64 ARRAY (Postgres payload): {args.dimensions * 8:>8} bytes")
+    print(f"  Python float list (materialized): {float_row_bytes:>8} bytes")
+    print(f"  int8 BYTEA:                       {len(quantized[0]):>8} bytes")
+
+    # Latency and recall
+    exact_times, quantized_times, recalls = [], [], []
+    for query in queries:
+        start = time.perf_counter()
+        exact_ids = exact_path(query, embeddings, args.top_k)
+        exact_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        quantized_ids = quantized_path(query, quantized, embeddings, args.top_k, args.rerank)
+        quantized_times.append(time.perf_counter() - start)
+
+        recalls.append(len(set(exact_ids) & set(quantized_ids)) / args.top_k)
+
+    def summary(times):
+        times_ms = np.array(times) * 1000
+        return f"p50 {np.percentile(times_ms, 50):8.2f} ms   p95 {np.percentile(times_ms, 95):8.2f} ms"
+
+    print(f"\nLatency over {args.queries} queries (top_k={args.top_k}, rerank={args.rerank}):")
+    print(f"  exact float path:       {summary(exact_times)}")
+    print(f"  int8 scan + re-rank:    {summary(quantized_times)}")
+    print(f"\nRecall@{args.top_k} of quantized path vs exact: {np.mean(recalls):.4f}")
+
+
+if __name__ == "__main__":
+    main()
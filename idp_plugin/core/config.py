@@ -40,8 +40,23 @@ class IDPConfig:
     # File limits
     MAX_FILE_SIZE: int = int(os.getenv("IDP_MAX_FILE_SIZE", str(50 * 1024 * 1024)))  # 50MB
     
+    # Prompt compaction (relevance-pruned extraction prompts)
+    PROMPT_COMPACTION_ENABLED: bool = os.getenv("IDP_PROMPT_COMPACTION", "true").lower() == "true"
+    PROMPT_ALWAYS_KEEP_PAGES: int = int(os.getenv("IDP_PROMPT_ALWAYS_KEEP_PAGES", "2"))
+    PROMPT_PAGE_KEEP_RATIO: float = float(os.getenv("IDP_PROMPT_PAGE_KEEP_RATIO", "0.25"))
+    PROMPT_PARAGRAPH_KEEP_RATIO: float = float(os.getenv("IDP_PROMPT_PARAGRAPH_KEEP_RATIO", "0.1"))
+
     # RAG
     RAG_TOP_K: int = int(os.getenv("IDP_RAG_TOP_K", "5"))
+    RAG_QUANTIZED_SCAN: bool = os.getenv("IDP_RAG_QUANTIZED_SCAN", "false").lower() == "true"
+    RAG_RERANK_CANDIDATES: int = int(os.getenv("IDP_RAG_RERANK_CANDIDATES", "200"))
+    RAG_HYBRID_ENABLED: bool = os.getenv("IDP_RAG_HYBRID", "true").lower() == "true"
+    RAG_HYBRID_VECTOR_WEIGHT: float = float(os.getenv("IDP_RAG_HYBRID_VECTOR_WEIGHT", "0.7"))
+    RAG_FUSION_CANDIDATES: int = int(os.getenv("IDP_RAG_FUSION_CANDIDATES", "50"))
+    RAG_LEXICAL_CHECK_SECONDS: float = float(os.getenv("IDP_RAG_LEXICAL_CHECK_SECONDS", "30"))
+    
+    # Telemetry
+    PERSIST_TIMINGS: bool = os.getenv("IDP_PERSIST_TIMINGS", "false").lower() == "true"
     
     # Error handling
     LLM_RETRY_ATTEMPTS: int = int(os.getenv("IDP_LLM_RETRY_ATTEMPTS", "3"))
@@ -0,0 +1,409 @@
+"""
+Tracing and metrics for IDP plugin
+Spans propagate through the services via contextvars; metrics are kept in process
+and rendered in Prometheus text format by the /metrics endpoint
+"""
+
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Histogram buckets in seconds (DB statements through multi-minute OCR runs)
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Spans kept per document trace (stage totals are always complete)
+MAX_TRACE_SPANS = 500
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    metric_type = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(_label_key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    metric_type = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    """Cumulative bucket histogram with labels"""
+
+    metric_type = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = STAGE_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series: Dict[LabelKey, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+                self._series[key] = series
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][index] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(
+                (key, list(series["counts"]), series["sum"], series["count"])
+                for key, series in self._series.items()
+            )
+        lines = []
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(key, (('le', _format_value(bound)),))} {cumulative}"
+                )
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds all metrics of the process and renders them for Prometheus"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._register(Counter(name, help_text))
+
+    def gauge(self, name: str, help_text: str) -> Gauge:
+        return self._register(Gauge(name, help_text))
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = STAGE_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, buckets))
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+
+registry = MetricsRegistry()
+
+STAGE_DURATION = registry.histogram(
+    "idp_stage_duration_seconds", "Time spent per pipeline stage (OCR, LLM, embedding, DB, mapping)"
+)
+STAGE_ERRORS = registry.counter("idp_stage_errors_total", "Pipeline stages that raised an exception")
+LLM_TOKENS = registry.counter("idp_llm_tokens_total", "OpenAI tokens used, by model, purpose and kind")
+LLM_REQUESTS = registry.counter("idp_llm_requests_total", "OpenAI API requests, by model and purpose")
+CACHE_REQUESTS = registry.counter("idp_cache_requests_total", "Cache lookups, by cache and result")
+CACHE_HIT_RATIO = registry.gauge("idp_cache_hit_ratio", "Cache hits / lookups since process start")
+QUEUE_DEPTH = registry.gauge("idp_queue_depth", "Work items currently in flight, by queue")
+DOCUMENTS_BY_STATUS = registry.gauge("idp_documents", "Documents per processing status")
+
+
+class Span:
+    """A timed unit of work; nested spans point at their parent"""
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.parent = parent
+        self.attributes = attributes or {}
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.status = "ok"
+
+    def finish(self) -> float:
+        self.duration = time.perf_counter() - self._start
+        return self.duration
+
+
+class Trace:
+    """Per-document timing breakdown collected from every span and DB statement"""
+
+    def __init__(self, document_id: Optional[str] = None):
+        self.document_id = document_id
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.spans: List[Dict[str, Any]] = []
+        self.tokens: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add_stage(self, name: str, duration: float) -> None:
+        with self._lock:
+            stage = self.stages.setdefault(name, {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+            stage["count"] += 1
+            stage["total_seconds"] += duration
+            stage["max_seconds"] = max(stage["max_seconds"], duration)
+
+    def add_span(self, span: Span) -> None:
+        self.add_stage(span.name, span.duration or 0.0)
+        with self._lock:
+            if len(self.spans) < MAX_TRACE_SPANS:
+                self.spans.append({
+                    "name": span.name,
+                    "parent": span.parent.name if span.parent else None,
+                    "offset_seconds": round(span.started_at - self.started_at, 6),
+                    "duration_seconds": round(span.duration or 0.0, 6),
+                    "status": span.status,
+                    "attributes": span.attributes
+                })
+
+    def add_tokens(self, kind: str, count: int) -> None:
+        with self._lock:
+            self.tokens[kind] = self.tokens.get(kind, 0) + count
+
+    def breakdown(self) -> Dict[str, Any]:
+        """JSON-serializable summary stored with the document"""
+        with self._lock:
+            return {
+                "document_id": self.document_id,
+                "total_seconds": round(time.perf_counter() - self._start, 6),
+                "stages": {
+                    name: {
+                        "count": int(stage["count"]),
+                        "total_seconds": round(stage["total_seconds"], 6),
+                        "max_seconds": round(stage["max_seconds"], 6)
+                    }
+                    for name, stage in sorted(self.stages.items())
+                },
+                "llm_tokens": dict(self.tokens),
+                "spans": list(self.spans)
+            }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("idp_current_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("idp_current_span", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    """Trace of the document being processed in this context, if any"""
+    return _current_trace.get()
+
+
+@contextmanager
+def start_trace(document_id: Optional[str] = None) -> Iterator[Trace]:
+    """
+    Collect every span in this context into a per-document trace
+
+    Args:
+        document_id: Document being processed
+
+    Yields:
+        Trace object
+    """
+    trace = Trace(document_id)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    Time a block as a pipeline stage
+
+    Observes idp_stage_duration_seconds{stage=name} and adds the span to the current trace.
+
+    Args:
+        name: Stage name, e.g. "ocr.page" or "llm.extraction"
+        **attributes: Extra context stored with the span in the trace
+    """
+    current = Span(name, parent=_current_span.get(), attributes=attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception:
+        current.status = "error"
+        STAGE_ERRORS.inc(stage=name)
+        raise
+    finally:
+        _current_span.reset(token)
+        STAGE_DURATION.observe(current.finish(), stage=name)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_span(current)
+
+
+def traced(name: str) -> Callable:
+    """Decorator form of span() for service methods"""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def observe_stage(name: str, duration: float) -> None:
+    """Record a timing that is too frequent to keep as an individual span (e.g. SQL statements)"""
+    STAGE_DURATION.observe(duration, stage=name)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_stage(name, duration)
+
+
+def record_llm_usage(model: str, purpose: str, usage: Any) -> None:
+    """
+    Count an OpenAI request and its tokens
+
+    Args:
+        model: Model name
+        purpose: "extraction", "reasoning" or "embedding"
+        usage: response.usage from the OpenAI client (may be None)
+    """
+    LLM_REQUESTS.inc(model=model, purpose=purpose)
+    if usage is None:
+        return
+    trace = _current_trace.get()
+    for kind in ("prompt_tokens", "completion_tokens"):
+        count = getattr(usage, kind, None) or 0
+        if count:
+            LLM_TOKENS.inc(count, model=model, purpose=purpose, kind=kind.replace("_tokens", ""))
+            if trace is not None:
+                trace.add_tokens(f"{purpose}_{kind}", count)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    """
+    Count a cache lookup and update the cache's hit ratio
+
+    Args:
+        cache: Cache name, e.g. "query_embedding"
+        hit: Whether the lookup was served from the cache
+    """
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+    hits = CACHE_REQUESTS.value(cache=cache, result="hit")
+    total = hits + CACHE_REQUESTS.value(cache=cache, result="miss")
+    CACHE_HIT_RATIO.set(hits / total if total else 0.0, cache=cache)
+
+
+@contextmanager
+def track_queue(queue: str) -> Iterator[None]:
+    """Count a work item as in flight on a queue for the duration of the block"""
+    QUEUE_DEPTH.inc(queue=queue)
+    try:
+        yield
+    finally:
+        QUEUE_DEPTH.dec(queue=queue)
+
+
+def instrument_engine(engine) -> None:
+    """
+    Time every SQL statement on an engine as "db.read" or "db.write"
+
+    Args:
+        engine: SQLAlchemy engine
+    """
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("idp_query_start", []).append(time.perf_counter())
+        if context is not None:
+            context._idp_query_started = True
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("idp_query_start")
+        if not starts:
+            return
+        if context is not None:
+            context._idp_query_started = False
+        verb = statement.lstrip()[:6].upper()
+        stage = "db.write" if verb in ("INSERT", "UPDATE", "DELETE") else "db.read"
+        observe_stage(stage, time.perf_counter() - starts.pop())
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        # A failed statement never reaches after_cursor_execute; drop its start so
+        # the list on a pooled connection does not grow and later timings pair up
+        context = exception_context.execution_context
+        conn = exception_context.connection
+        if context is None or conn is None or not getattr(context, "_idp_query_started", False):
+            return
+        context._idp_query_started = False
+        starts = conn.info.get("idp_query_start")
+        if starts:
+            starts.pop()
+
+
+def render_metrics() -> str:
+    """All metrics in Prometheus text format"""
+    return registry.render()
@@ -3,7 +3,7 @@ RAG Knowledge Vector model for IDP plugin
 Stores knowledge base embeddings (standards, test names, etc.)
 """
 
-from sqlalchemy import Column, String, Text, Integer, Float
+from sqlalchemy import Column, String, Text, Integer, Float, LargeBinary
 from sqlalchemy.dialects.postgresql import UUID, JSONB, ARRAY
 from idp_plugin.models.base import Base, TimestampMixin, generate_uuid
 
@@ -25,6 +25,10 @@ class RAGKnowledgeVector(Base, TimestampMixin):
     # Vector embedding (1536 dimensions for OpenAI embeddings)
     embedding = Column(ARRAY(Float), nullable=False)  # Vector of 1536 floats
     
+    # Optional int8-quantized copy of the embedding for fast candidate scans
+    embedding_int8 = Column(LargeBinary, nullable=True)  # 1536 bytes, embedding ~= int8 * scale
+    embedding_scale = Column(Float, nullable=True)  # Per-vector quantization scale
+    
     # Metadata for traceability
     source = Column(String(200), nullable=True)  # Source of knowledge (e.g., "ISO_17025", "internal_standards")
     source_version = Column(String(50), nullable=True)  # Version of source
@@ -3,7 +3,7 @@ RAG Schema Vector model for IDP plugin
 Stores schema descriptions and field definitions
 """
 
-from sqlalchemy import Column, String, Text, Float
+from sqlalchemy import Column, String, Text, Float, LargeBinary
 from sqlalchemy.dialects.postgresql import UUID, JSONB, ARRAY
 from idp_plugin.models.base import Base, TimestampMixin, generate_uuid
 
@@ -30,6 +30,10 @@ class RAGSchemaVector(Base, TimestampMixin):
     # Vector embedding (1536 dimensions for OpenAI embeddings)
     embedding = Column(ARRAY(Float), nullable=False)  # Vector of 1536 floats
     
+    # Optional int8-quantized copy of the embedding for fast candidate scans
+    embedding_int8 = Column(LargeBinary, nullable=True)  # 1536 bytes, embedding ~= int8 * scale
+    embedding_scale = Column(Float, nullable=True)  # Per-vector quantization scale
+    
     # Metadata for traceability
     schema_version = Column(String(50), nullable=True)  # Schema version
     is_required = Column(String(10), default="false", nullable=False)  # "true" or "false"
@@ -28,6 +28,12 @@ class ConfidenceSummaryResponse(BaseModel):
     fields_below_threshold: List[Dict[str, Any]]
 
 
+class FieldCorrectionRequest(BaseModel):
+    """Request schema for reviewer corrections"""
+    user_id: str
+    corrections: Dict[str, Dict[str, Any]]  # {field_path: {"old": value, "new": value}}
+
+
 
 
 
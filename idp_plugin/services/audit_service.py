@@ -9,6 +9,9 @@ from datetime import datetime
 import uuid
 
 from idp_plugin.models.audit_logs import AuditLog, AuditAction
+from idp_plugin.models.extractions import Extraction
+from idp_plugin.models.field_confidence import FieldConfidence
+from idp_plugin.services.confidence_service import ConfidenceService
 
 
 class AuditService:
@@ -82,7 +85,8 @@ class AuditService:
         old_value: Any,
         new_value: Any,
         user_id: str,
-        reason: Optional[str] = None
+        reason: Optional[str] = None,
+        rescore: bool = True
     ) -> AuditLog:
         """
         Log a field correction by user
@@ -94,11 +98,12 @@ class AuditService:
             new_value: Corrected value
             user_id: User who made the correction
             reason: Reason for correction (optional)
+            rescore: Recalculate the field's confidence (see rescore_corrections)
         
         Returns:
             Created AuditLog object
         """
-        return self.log_action(
+        audit_log = self.log_action(
             action=AuditAction.FIELD_CORRECTED,
             extraction_id=extraction_id,
             performed_by=user_id,
@@ -108,6 +113,9 @@ class AuditService:
             new_value=new_value,
             metadata={"reason": reason} if reason else {}
         )
+        if rescore:
+            self.rescore_corrections(extraction_id, {field_path: new_value})
+        return audit_log
     
     def log_user_correction(
         self,
@@ -136,12 +144,38 @@ class AuditService:
                 field_path=field_path,
                 old_value=values.get("old"),
                 new_value=values.get("new"),
-                user_id=user_id
+                user_id=user_id,
+                rescore=False
             )
             logs.append(log)
         
+        self.rescore_corrections(
+            extraction_id,
+            {field_path: values.get("new") for field_path, values in corrections.items()}
+        )
         return logs
     
+    def rescore_corrections(self, extraction_id: str, corrections: Dict[str, Any]) -> None:
+        """
+        Recalculate confidence for corrected fields only
+        
+        Nothing is done until the extraction has been scored once; the first
+        full calculation happens when its confidence is requested.
+        
+        Args:
+            extraction_id: Extraction ID
+            corrections: Dictionary of {field_path: new_value}
+        """
+        extraction = self.db.query(Extraction).filter(Extraction.id == extraction_id).first()
+        if extraction is None:
+            return
+        scored = self.db.query(FieldConfidence.id).filter(
+            FieldConfidence.extraction_id == extraction_id
+        ).first()
+        if scored is None:
+            return
+        ConfidenceService(self.db).recalculate_fields(extraction, corrections)
+    
     def get_audit_trail(
         self,
         document_id: Optional[str] = None,
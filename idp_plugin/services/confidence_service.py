@@ -5,6 +5,8 @@ Calculates field-level confidence scores
 
 from sqlalchemy.orm import Session
 from typing import Dict, Any, Optional, List
+from collections import OrderedDict
+import threading
 import uuid
 from datetime import datetime
 
@@ -12,6 +14,48 @@ from idp_plugin.models.extractions import Extraction
 from idp_plugin.models.field_confidence import FieldConfidence
 from idp_plugin.models.ocr_outputs import OCROutput
 from idp_plugin.services.rag_retrieval_service import RAGRetrievalService
+from idp_plugin.core.telemetry import traced, record_cache
+
+
+class SignalCache:
+    """
+    Process-wide OCR and RAG signals per extraction
+    
+    Each request gets a new ConfidenceService, so the signals live here and are
+    reused by every correction of an extraction. Entries hold plain values (no
+    ORM objects), are dropped when their document is re-extracted, and the least
+    recently used extractions are evicted beyond max_extractions.
+    """
+    
+    def __init__(self, max_extractions: int = 256):
+        self.max_extractions = max_extractions
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, extraction_id: str, document_id: str) -> Dict[str, Any]:
+        """Signal entry of an extraction: {"document_id", "ocr", "rag"}, created if missing"""
+        with self._lock:
+            entry = self._entries.get(extraction_id)
+            if entry is None:
+                entry = {"document_id": document_id, "ocr": None, "rag": {}}
+                self._entries[extraction_id] = entry
+                while len(self._entries) > self.max_extractions:
+                    self._entries.popitem(last=False)
+            else:
+                self._entries.move_to_end(extraction_id)
+            return entry
+    
+    def invalidate_document(self, document_id: str) -> None:
+        """Drop the signals of every extraction of a document (call on re-extraction)"""
+        with self._lock:
+            for extraction_id in [
+                key for key, entry in self._entries.items() if entry["document_id"] == document_id
+            ]:
+                del self._entries[extraction_id]
+
+
+# Shared by every ConfidenceService in the process
+SIGNAL_CACHE = SignalCache()
 
 
 class ConfidenceService:
@@ -20,21 +64,28 @@ class ConfidenceService:
     Formula: confidence = (OCR * 0.3) + (LLM * 0.4) + (RAG * 0.3)
     """
     
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, signal_cache: Optional[SignalCache] = None):
         """
         Initialize confidence service
         
         Args:
             db: Database session
+            signal_cache: OCR/RAG signal cache (default: the process-wide SIGNAL_CACHE)
         """
         self.db = db
-        self.rag_service = RAGRetrievalService(db)
+        # Vector-only retrieval: rag_confidence is a plain cosine similarity,
+        # which fused or exact-hit scores would inflate
+        self.rag_service = RAGRetrievalService(db, hybrid=False)
         
         # Weights for confidence calculation
         self.ocr_weight = 0.3
         self.llm_weight = 0.4
         self.rag_weight = 0.3
+        
+        # Signals reused across field recalculations, across requests
+        self.signal_cache = SIGNAL_CACHE if signal_cache is None else signal_cache
     
+    @traced("confidence")
     def calculate_confidence_for_extraction(self, extraction: Extraction) -> List[FieldConfidence]:
         """
         Calculate confidence scores for all fields in an extraction
@@ -45,13 +96,8 @@ class ConfidenceService:
         Returns:
             List of FieldConfidence objects
         """
-        # Get OCR outputs for document
-        ocr_outputs = self.db.query(OCROutput).filter(
-            OCROutput.document_id == extraction.document_id
-        ).all()
-        
-        # Calculate OCR quality signal (average confidence across all pages)
-        ocr_quality = self._calculate_ocr_quality(ocr_outputs)
+        # OCR outputs and quality signal (average confidence across all pages)
+        ocr_signals = self._get_ocr_signals(extraction)
         
         # Extract all fields from extraction data
         fields = self._extract_all_fields(extraction.extracted_data)
@@ -63,50 +109,14 @@ class ConfidenceService:
             if field_value is None:
                 continue  # Skip null values
             
-            # Calculate OCR confidence
-            ocr_confidence = self._calculate_ocr_confidence(
-                field_value=str(field_value),
-                ocr_outputs=ocr_outputs,
-                base_quality=ocr_quality
-            )
-            
-            # Calculate LLM confidence (extraction certainty)
-            llm_confidence = self._calculate_llm_confidence(
-                field_value=str(field_value),
-                extraction=extraction
-            )
-            
-            # Calculate RAG confidence (similarity score)
-            rag_confidence = self._calculate_rag_confidence(
-                field_value=str(field_value),
-                field_path=field_path,
-                document_type=extraction.document_type
-            )
-            
-            # Calculate overall confidence
-            overall_confidence = (
-                ocr_confidence * self.ocr_weight +
-                llm_confidence * self.llm_weight +
-                rag_confidence * self.rag_weight
-            )
-            
             # Create confidence record
             confidence_record = FieldConfidence(
                 id=str(uuid.uuid4()),
                 extraction_id=extraction.id,
                 field_path=field_path,
-                field_name=self._get_field_name(field_path),
-                ocr_confidence=ocr_confidence,
-                llm_confidence=llm_confidence,
-                rag_confidence=rag_confidence,
-                overall_confidence=overall_confidence,
-                confidence_metadata={
-                    "ocr_weight": self.ocr_weight,
-                    "llm_weight": self.llm_weight,
-                    "rag_weight": self.rag_weight,
-                    "calculation_method": "weighted_average"
-                }
+                field_name=self._get_field_name(field_path)
             )
+            self._score_field(confidence_record, str(field_value), extraction, ocr_signals)
             
             self.db.add(confidence_record)
             confidence_records.append(confidence_record)
@@ -114,6 +124,183 @@ class ConfidenceService:
         self.db.commit()
         return confidence_records
     
+    def recalculate_field_confidence(
+        self,
+        extraction: Extraction,
+        field_path: str,
+        new_value: Any
+    ) -> Optional[FieldConfidence]:
+        """
+        Recompute confidence for a single corrected field
+        
+        AuditService.log_field_correction calls this. Only the corrected field is
+        scored; its FieldConfidence row is updated in place and every other row is
+        left untouched. OCR signals and RAG similarities come from the process-wide
+        signal cache, so later corrections of the extraction reuse them. Summary
+        aggregates are derived from the rows by get_confidence_summary.
+        
+        Args:
+            extraction: Extraction object
+            field_path: JSON path of the corrected field (e.g. "customer.name")
+            new_value: Corrected value (None removes the field's confidence row)
+        
+        Returns:
+            Updated FieldConfidence object, or None if the value was cleared
+        """
+        record = self._rescore_field(extraction, field_path, new_value)
+        self.db.commit()
+        return record
+    
+    def recalculate_fields(
+        self,
+        extraction: Extraction,
+        corrections: Dict[str, Any]
+    ) -> List[FieldConfidence]:
+        """
+        Recompute confidence for several corrected fields with one commit
+        
+        Args:
+            extraction: Extraction object
+            corrections: Dictionary of {field_path: new_value}
+        
+        Returns:
+            List of updated FieldConfidence objects (cleared fields omitted)
+        """
+        records = []
+        for field_path, new_value in corrections.items():
+            record = self._rescore_field(extraction, field_path, new_value)
+            if record is not None:
+                records.append(record)
+        
+        self.db.commit()
+        return records
+    
+    def _rescore_field(
+        self,
+        extraction: Extraction,
+        field_path: str,
+        new_value: Any
+    ) -> Optional[FieldConfidence]:
+        """Score one field and update (or create/delete) its row without committing"""
+        record = self.db.query(FieldConfidence).filter(
+            FieldConfidence.extraction_id == extraction.id,
+            FieldConfidence.field_path == field_path
+        ).first()
+        
+        if new_value is None:
+            # Null values are not scored, same as the full calculation
+            if record is not None:
+                self.db.delete(record)
+            return None
+        
+        if record is None:
+            record = FieldConfidence(
+                id=str(uuid.uuid4()),
+                extraction_id=extraction.id,
+                field_path=field_path,
+                field_name=self._get_field_name(field_path)
+            )
+            self.db.add(record)
+        elif (record.confidence_metadata or {}).get("field_value") == str(new_value):
+            # Value unchanged (e.g. correction reverted) - scores are still valid
+            return record
+        
+        self._score_field(
+            record,
+            str(new_value),
+            extraction,
+            self._get_ocr_signals(extraction),
+            recalculated=True
+        )
+        return record
+    
+    def _score_field(
+        self,
+        record: FieldConfidence,
+        field_value: str,
+        extraction: Extraction,
+        ocr_signals: Dict[str, Any],
+        recalculated: bool = False
+    ) -> None:
+        """
+        Fill the confidence scores of a FieldConfidence row
+        
+        Args:
+            record: FieldConfidence row (new or existing)
+            field_value: Field value as string
+            extraction: Extraction object
+            ocr_signals: Cached OCR signals from _get_ocr_signals
+            recalculated: Whether this is an incremental update after a correction
+        """
+        # Calculate OCR confidence
+        ocr_confidence = self._calculate_ocr_confidence(
+            field_value=field_value,
+            ocr_outputs=None,
+            base_quality=ocr_signals["quality"],
+            ocr_texts=ocr_signals["texts"]
+        )
+        
+        # Calculate LLM confidence (extraction certainty)
+        llm_confidence = self._calculate_llm_confidence(
+            field_value=field_value,
+            extraction=extraction
+        )
+        
+        # Calculate RAG confidence (similarity score), cached per field value
+        rag_signals = self.signal_cache.get(extraction.id, extraction.document_id)["rag"]
+        rag_key = (record.field_path, field_value)
+        rag_confidence = rag_signals.get(rag_key)
+        record_cache("confidence_rag_signal", hit=rag_confidence is not None)
+        if rag_confidence is None:
+            rag_confidence = self._calculate_rag_confidence(
+                field_value=field_value,
+                field_path=record.field_path,
+                document_type=extraction.document_type
+            )
+            rag_signals[rag_key] = rag_confidence
+        
+        # Calculate overall confidence
+        record.ocr_confidence = ocr_confidence
+        record.llm_confidence = llm_confidence
+        record.rag_confidence = rag_confidence
+        record.overall_confidence = (
+            ocr_confidence * self.ocr_weight +
+            llm_confidence * self.llm_weight +
+            rag_confidence * self.rag_weight
+        )
+        
+        metadata = {
+            "ocr_weight": self.ocr_weight,
+            "llm_weight": self.llm_weight,
+            "rag_weight": self.rag_weight,
+            "calculation_method": "weighted_average",
+            "field_value": field_value
+        }
+        if recalculated:
+            metadata["recalculated_at"] = datetime.utcnow().isoformat()
+        record.confidence_metadata = metadata
+    
+    def _get_ocr_signals(self, extraction: Extraction) -> Dict[str, Any]:
+        """
+        Load the OCR outputs of an extraction's document once and cache the derived signals
+        
+        Returns:
+            Dictionary with "quality" and lowercased page "texts"
+        """
+        entry = self.signal_cache.get(extraction.id, extraction.document_id)
+        signals = entry["ocr"]
+        record_cache("confidence_ocr_signal", hit=signals is not None)
+        if signals is None:
+            ocr_outputs = self.db.query(OCROutput).filter(
+                OCROutput.document_id == extraction.document_id
+            ).all()
+            signals = {
+                "quality": self._calculate_ocr_quality(ocr_outputs),
+                "texts": [(ocr.text or "").lower() for ocr in ocr_outputs]
+            }
+            entry["ocr"] = signals
+        return signals
+    
     def _calculate_ocr_quality(self, ocr_outputs: List[OCROutput]) -> float:
         """
         Calculate overall OCR quality signal
@@ -142,41 +329,28 @@ class ConfidenceService:
     def _calculate_ocr_confidence(
         self,
         field_value: str,
-        ocr_outputs: List[OCROutput],
-        base_quality: float
+        ocr_outputs: Optional[List[OCROutput]],
+        base_quality: float,
+        ocr_texts: Optional[List[str]] = None
     ) -> float:
         """
         Calculate OCR confidence for a specific field value
         
         Args:
             field_value: Field value to check
-            ocr_outputs: List of OCR output objects
+            ocr_outputs: List of OCR output objects (unused when ocr_texts is given)
             base_quality: Base OCR quality signal
+            ocr_texts: Pre-lowercased page texts (avoids re-lowercasing per field)
         
         Returns:
             OCR confidence (0-1)
         """
+        if ocr_texts is None:
+            ocr_texts = [(ocr.text or "").lower() for ocr in ocr_outputs]
+        
         # Check if field value appears in OCR text
         field_lower = field_value.lower()
-        
-        found_in_ocr = False
-        max_similarity = 0.0
-        
-        for ocr in ocr_outputs:
-            ocr_text_lower = ocr.text.lower()
-            
-            # Exact match
-            if field_lower in ocr_text_lower:
-                found_in_ocr = True
-                max_similarity = max(max_similarity, 1.0)
-            
-            # Partial match (simple word overlap)
-            field_words = set(field_lower.split())
-            ocr_words = set(ocr_text_lower.split())
-            
-            if field_words and ocr_words:
-                overlap = len(field_words & ocr_words) / len(field_words)
-                max_similarity = max(max_similarity, overlap)
+        found_in_ocr = any(field_lower in ocr_text_lower for ocr_text_lower in ocr_texts)
         
         # Combine base quality with field-specific match
         if found_in_ocr:
@@ -251,11 +425,13 @@ class ConfidenceService:
         
         # Knowledge similarity
         for knowledge in rag_results["knowledge"]:
-            max_similarity = max(max_similarity, knowledge["similarity"])
+            if knowledge["similarity"] is not None:
+                max_similarity = max(max_similarity, knowledge["similarity"])
         
         # Schema similarity
         for schema in rag_results["schema"]:
-            max_similarity = max(max_similarity, schema["similarity"])
+            if schema["similarity"] is not None:
+                max_similarity = max(max_similarity, schema["similarity"])
         
         return max_similarity
     
@@ -16,7 +16,11 @@ from idp_plugin.models.documents import Document, DocumentStatus, DocumentType
 from idp_plugin.models.extractions import Extraction
 from idp_plugin.models.ocr_outputs import OCROutput
 from idp_plugin.models.audit_logs import AuditLog, AuditAction
+from idp_plugin.services.prompt_compaction_service import PromptCompactionService
+from idp_plugin.services.confidence_service import SIGNAL_CACHE
+from idp_plugin.core.config import IDPConfig
 from idp_plugin.core.exceptions import ExtractionError
+from idp_plugin.core.telemetry import span, traced, record_llm_usage
 
 
 class ExtractionService:
@@ -35,7 +39,10 @@ class ExtractionService:
         self.openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
         self.extraction_model = os.getenv("EXTRACTION_MODEL", "gpt-4.1")
         self.temperature = 0  # Deterministic extraction
+        self.prompt_compaction_enabled = IDPConfig.PROMPT_COMPACTION_ENABLED
+        self.prompt_compactor = PromptCompactionService(model=self.extraction_model)
     
+    @traced("extraction")
     def extract_from_document(
         self,
         document: Document,
@@ -72,30 +79,37 @@ class ExtractionService:
             if not ocr_outputs:
                 raise ExtractionError("No OCR results found for document")
             
-            # Combine OCR text
-            ocr_text_parts = [
-                f"\n\n--- Page {ocr.page_number} ---\n{ocr.text}"
-                for ocr in ocr_outputs
-            ]
-            combined_text = "\n".join(ocr_text_parts)
-            
             # Load schema
             schema = self._load_schema(doc_type)
             
             # Load prompt
             prompt = self._load_prompt(doc_type)
             
+            # Combine OCR text (pruned to schema-relevant content when compaction is enabled)
+            pages = [(ocr.page_number, ocr.text) for ocr in ocr_outputs]
+            compaction = None
+            schema_text = None
+            if self.prompt_compaction_enabled:
+                with span("extraction.prompt_compaction"):
+                    compaction = self.prompt_compactor.compact(pages=pages, schema=schema, prompt=prompt)
+                combined_text = compaction.ocr_text
+                schema_text = compaction.schema_text
+            else:
+                combined_text = PromptCompactionService.format_pages(pages)
+            
             # Perform extraction
             extracted_data = self._extract_with_llm(
                 ocr_text=combined_text,
                 document_type=doc_type,
                 schema=schema,
-                prompt=prompt
+                prompt=prompt,
+                schema_text=schema_text
             )
             
             # Validate against schema
             try:
-                jsonschema.validate(instance=extracted_data, schema=schema)
+                with span("extraction.validation"):
+                    jsonschema.validate(instance=extracted_data, schema=schema)
                 is_valid = "valid"
                 validation_errors = None
             except jsonschema.ValidationError as e:
@@ -114,7 +128,8 @@ class ExtractionService:
                 extraction_metadata={
                     "temperature": self.temperature,
                     "schema_version": "1.0",
-                    "ocr_pages": len(ocr_outputs)
+                    "ocr_pages": len(ocr_outputs),
+                    "prompt_compaction": compaction.to_metadata() if compaction else None
                 }
             )
             
@@ -131,6 +146,9 @@ class ExtractionService:
             self.db.commit()
             self.db.refresh(extraction)
             
+            # Confidence signals of earlier extractions of this document are stale
+            SIGNAL_CACHE.invalidate_document(document.id)
+            
             # Create audit log
             self._create_audit_log(
                 document_id=document.id,
@@ -165,7 +183,8 @@ class ExtractionService:
         ocr_text: str,
         document_type: DocumentType,
         schema: Dict[str, Any],
-        prompt: str
+        prompt: str,
+        schema_text: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Perform LLM extraction
@@ -175,10 +194,14 @@ class ExtractionService:
             document_type: Document type
             schema: JSON schema
             prompt: Extraction prompt
+            schema_text: Pre-serialized (minified) schema; defaults to indented JSON of schema
             
         Returns:
             Extracted data as dictionary
         """
+        if schema_text is None:
+            schema_text = json.dumps(schema, indent=2)
+        
         # Build system message
         system_message = f"""You are a document extraction system. Extract ONLY explicit values from the document text.
         
@@ -192,7 +215,7 @@ Rules:
 7. Preserve exact text values as they appear in the document
 
 Schema:
-{json.dumps(schema, indent=2)}
+{schema_text}
 """
         
         # Build user message
@@ -205,15 +228,17 @@ Extract the data and return ONLY valid JSON matching the schema. Use null for mi
         
         try:
             # Call OpenAI API
-            response = self.openai_client.chat.completions.create(
-                model=self.extraction_model,
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": user_message}
-                ],
-                temperature=self.temperature,
-                response_format={"type": "json_object"}  # Force JSON output
-            )
+            with span("llm.extraction", model=self.extraction_model):
+                response = self.openai_client.chat.completions.create(
+                    model=self.extraction_model,
+                    messages=[
+                        {"role": "system", "content": system_message},
+                        {"role": "user", "content": user_message}
+                    ],
+                    temperature=self.temperature,
+                    response_format={"type": "json_object"}  # Force JSON output
+                )
+            record_llm_usage(self.extraction_model, "extraction", getattr(response, "usage", None))
             
             # Parse response
             content = response.choices[0].message.content
@@ -12,6 +12,7 @@ from pathlib import Path
 from idp_plugin.models.extractions import Extraction
 from idp_plugin.models.audit_logs import AuditLog, AuditAction
 from idp_plugin.core.exceptions import MappingError
+from idp_plugin.core.telemetry import traced
 import uuid
 
 
@@ -31,6 +32,7 @@ class MappingService:
         self.db = db
         self.mapping_configs = self._load_mapping_configs()
     
+    @traced("mapping")
     def map_to_target(
         self,
         extraction: Extraction,
@@ -24,6 +24,7 @@ from idp_plugin.models.ocr_outputs import OCROutput
 from idp_plugin.models.audit_logs import AuditLog, AuditAction
 from idp_plugin.utils.storage import StorageService
 from idp_plugin.core.exceptions import OCRProcessingError
+from idp_plugin.core.telemetry import span, traced
 
 
 class OCRResult:
@@ -71,6 +72,7 @@ class OCRService:
             except Exception as e:
                 print(f"Warning: PaddleOCR initialization failed: {e}")
     
+    @traced("ocr")
     def process_document(self, document: Document) -> List[OCRResult]:
         """
         Process document through OCR
@@ -165,38 +167,40 @@ class OCRService:
                 total_pages = len(pdf.pages)
                 
                 for page_num, page in enumerate(pdf.pages, start=1):
-                    text = page.extract_text()
-                    
-                    if text and len(text.strip()) > 0:
-                        # Text-based PDF - use pdfplumber result
-                        word_count = len(text.split())
-                        char_count = len(text)
+                    with span("ocr.page", page=page_num) as page_span:
+                        text = page.extract_text()
                         
-                        results.append(OCRResult(
-                            page_number=page_num,
-                            text=text,
-                            ocr_engine="pdfplumber",
-                            confidence_score=1.0,  # Text-based PDFs have perfect confidence
-                            word_count=word_count,
-                            character_count=char_count,
-                            raw_data={"method": "pdfplumber_text_extraction"}
-                        ))
-                    else:
-                        # Scanned PDF - use PaddleOCR
-                        if self.paddleocr:
-                            result = self._ocr_page_with_paddleocr(page, page_num)
-                            results.append(result)
-                        else:
-                            # No OCR available - empty result
+                        if text and len(text.strip()) > 0:
+                            # Text-based PDF - use pdfplumber result
+                            word_count = len(text.split())
+                            char_count = len(text)
+                            
                             results.append(OCRResult(
                                 page_number=page_num,
-                                text="",
-                                ocr_engine="none",
-                                confidence_score=0.0,
-                                word_count=0,
-                                character_count=0,
-                                raw_data={"error": "No OCR engine available for scanned PDF"}
+                                text=text,
+                                ocr_engine="pdfplumber",
+                                confidence_score=1.0,  # Text-based PDFs have perfect confidence
+                                word_count=word_count,
+                                character_count=char_count,
+                                raw_data={"method": "pdfplumber_text_extraction"}
                             ))
+                        else:
+                            # Scanned PDF - use PaddleOCR
+                            if self.paddleocr:
+                                result = self._ocr_page_with_paddleocr(page, page_num)
+                                results.append(result)
+                            else:
+                                # No OCR available - empty result
+                                results.append(OCRResult(
+                                    page_number=page_num,
+                                    text="",
+                                    ocr_engine="none",
+                                    confidence_score=0.0,
+                                    word_count=0,
+                                    character_count=0,
+                                    raw_data={"error": "No OCR engine available for scanned PDF"}
+                                ))
+                        page_span.attributes["engine"] = results[-1].ocr_engine
         
         except Exception as e:
             # If pdfplumber fails, try PaddleOCR on entire PDF
@@ -207,6 +211,7 @@ class OCRService:
         
         return results
     
+    @traced("ocr.image")
     def _process_image(self, file_path: str, document: Document) -> List[OCRResult]:
         """
         Process image file using PaddleOCR
@@ -0,0 +1,389 @@
+"""
+Prompt compaction service for IDP plugin
+Prunes OCR text to the pages/paragraphs relevant to the extraction schema
+and minifies the schema before it is sent to the extraction LLM
+"""
+
+import json
+import re
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+    tiktoken = None
+
+from idp_plugin.core.config import IDPConfig
+from idp_plugin.utils.lexical_index import BM25Index, tokenize
+
+
+# Phrases that mark legal / terms-and-conditions boilerplate pages
+BOILERPLATE_PHRASES = [
+    "terms and conditions",
+    "terms & conditions",
+    "general conditions",
+    "liability",
+    "indemnif",
+    "governing law",
+    "jurisdiction",
+    "arbitration",
+    "force majeure",
+    "confidentiality",
+    "hereby",
+    "shall not",
+    "warranty",
+]
+
+# Schema keys that carry no information for the extraction model
+SCHEMA_KEYS_TO_DROP = {"$schema", "$id", "title"}
+
+# Process-wide tiktoken encoders by model name (None if it could not be loaded)
+_encoders: Dict[str, Any] = {}
+_encoders_lock = threading.Lock()
+
+
+class CompactedPrompt:
+    """Compaction result structure"""
+    def __init__(
+        self,
+        ocr_text: str,
+        schema_text: str,
+        tokens_before: int,
+        tokens_after: int,
+        pages_total: int,
+        pages_kept: List[int],
+        pages_dropped_as_boilerplate: List[int],
+        paragraphs_total: int,
+        paragraphs_kept: int,
+        header_footer_lines_removed: int,
+        token_counter: str = "approximate"
+    ):
+        self.ocr_text = ocr_text
+        self.schema_text = schema_text
+        self.tokens_before = tokens_before
+        self.tokens_after = tokens_after
+        self.pages_total = pages_total
+        self.pages_kept = pages_kept
+        self.pages_dropped_as_boilerplate = pages_dropped_as_boilerplate
+        self.paragraphs_total = paragraphs_total
+        self.paragraphs_kept = paragraphs_kept
+        self.header_footer_lines_removed = header_footer_lines_removed
+        self.token_counter = token_counter
+
+    def to_metadata(self) -> Dict[str, Any]:
+        """Summary stored in extraction metadata"""
+        return {
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "token_reduction": (
+                round(1 - self.tokens_after / self.tokens_before, 4)
+                if self.tokens_before else 0.0
+            ),
+            "token_counter": self.token_counter,
+            "pages_total": self.pages_total,
+            "pages_kept": self.pages_kept,
+            "pages_dropped_as_boilerplate": self.pages_dropped_as_boilerplate,
+            "paragraphs_total": self.paragraphs_total,
+            "paragraphs_kept": self.paragraphs_kept,
+            "header_footer_lines_removed": self.header_footer_lines_removed
+        }
+
+
+class PromptCompactionService:
+    """
+    Service for shrinking extraction prompts
+    Scores OCR pages and paragraphs against the schema field descriptions with a
+    local BM25 index, drops boilerplate and repeated headers/footers, and minifies the schema
+    """
+
+    def __init__(
+        self,
+        always_keep_pages: Optional[int] = None,
+        page_keep_ratio: Optional[float] = None,
+        paragraph_keep_ratio: Optional[float] = None,
+        model: Optional[str] = None
+    ):
+        """
+        Initialize prompt compaction service
+
+        Args:
+            always_keep_pages: Leading pages that are always kept in full
+            page_keep_ratio: Pages scoring at least this fraction of the best page are kept in full
+            paragraph_keep_ratio: On other pages, paragraphs scoring at least this
+                fraction of the best paragraph are kept
+            model: Model name used to pick the tokenizer
+        """
+        self.always_keep_pages = (
+            IDPConfig.PROMPT_ALWAYS_KEEP_PAGES if always_keep_pages is None else always_keep_pages
+        )
+        self.page_keep_ratio = (
+            IDPConfig.PROMPT_PAGE_KEEP_RATIO if page_keep_ratio is None else page_keep_ratio
+        )
+        self.paragraph_keep_ratio = (
+            IDPConfig.PROMPT_PARAGRAPH_KEEP_RATIO if paragraph_keep_ratio is None else paragraph_keep_ratio
+        )
+        self.model = model or IDPConfig.EXTRACTION_MODEL
+
+    def compact(
+        self,
+        pages: List[Tuple[int, str]],
+        schema: Dict[str, Any],
+        prompt: str = ""
+    ) -> CompactedPrompt:
+        """
+        Build compacted OCR text and schema text
+
+        Args:
+            pages: List of (page_number, text) tuples in page order
+            schema: JSON schema for the document type
+            prompt: Extraction prompt (counted in the token totals only)
+
+        Returns:
+            CompactedPrompt object
+        """
+        full_text = self.format_pages(pages)
+        full_schema = json.dumps(schema, indent=2)
+        tokens_before = self.count_tokens(prompt + full_text + full_schema)
+
+        # Strip repeated headers/footers before scoring so they don't inflate every page
+        cleaned_pages, removed_lines = self._strip_headers_footers(pages)
+
+        # Split pages into paragraphs and score them against the schema vocabulary
+        query = self._build_schema_query(schema)
+        page_paragraphs = [
+            (page_number, self._split_paragraphs(text))
+            for page_number, text in cleaned_pages
+        ]
+        flat_paragraphs = [
+            paragraph
+            for _, paragraphs in page_paragraphs
+            for paragraph in paragraphs
+        ]
+        scores = BM25Index(flat_paragraphs).score(query)
+
+        kept_pages = []
+        boilerplate_pages = []
+        kept_paragraph_count = 0
+        max_paragraph_score = max(scores) if scores else 0.0
+
+        page_scores = []
+        offset = 0
+        for page_number, paragraphs in page_paragraphs:
+            paragraph_scores = scores[offset:offset + len(paragraphs)]
+            offset += len(paragraphs)
+            page_scores.append((page_number, paragraphs, paragraph_scores))
+
+        max_page_score = max((sum(s) for _, _, s in page_scores), default=0.0)
+
+        for index, (page_number, paragraphs, paragraph_scores) in enumerate(page_scores):
+            if not paragraphs:
+                continue
+
+            page_text = "\n\n".join(paragraphs)
+            page_score = sum(paragraph_scores)
+
+            if index < self.always_keep_pages or max_page_score == 0:
+                kept_pages.append((page_number, page_text))
+                kept_paragraph_count += len(paragraphs)
+                continue
+
+            if self._is_boilerplate(page_text):
+                boilerplate_pages.append(page_number)
+                continue
+
+            if page_score >= self.page_keep_ratio * max_page_score:
+                kept_pages.append((page_number, page_text))
+                kept_paragraph_count += len(paragraphs)
+                continue
+
+            relevant = [
+                paragraph
+                for paragraph, score in zip(paragraphs, paragraph_scores)
+                if score > 0 and score >= self.paragraph_keep_ratio * max_paragraph_score
+            ]
+            if relevant:
+                kept_pages.append((page_number, "\n\n".join(relevant)))
+                kept_paragraph_count += len(relevant)
+
+        compact_text = self.format_pages(kept_pages)
+        compact_schema = self.minify_schema(schema)
+        tokens_after = self.count_tokens(prompt + compact_text + compact_schema)
+
+        return CompactedPrompt(
+            ocr_text=compact_text,
+            schema_text=compact_schema,
+            tokens_before=tokens_before,
+            tokens_after=tokens_after,
+            pages_total=len(pages),
+            pages_kept=[page_number for page_number, _ in kept_pages],
+            pages_dropped_as_boilerplate=boilerplate_pages,
+            paragraphs_total=len(flat_paragraphs),
+            paragraphs_kept=kept_paragraph_count,
+            header_footer_lines_removed=removed_lines,
+            token_counter="tiktoken" if self.encoder is not None else "approximate"
+        )
+
+    @staticmethod
+    def format_pages(pages: List[Tuple[int, str]]) -> str:
+        """Combine page texts the same way the extraction prompt always has"""
+        return "\n".join(
+            f"\n\n--- Page {page_number} ---\n{text}"
+            for page_number, text in pages
+        )
+
+    def minify_schema(self, schema: Dict[str, Any]) -> str:
+        """
+        Serialize schema without whitespace and without keys the model does not need
+
+        Args:
+            schema: JSON schema
+
+        Returns:
+            Compact JSON string
+        """
+        return json.dumps(self._strip_schema(schema), separators=(",", ":"), ensure_ascii=False)
+
+    def count_tokens(self, text: str) -> int:
+        """
+        Count tokens for the extraction model
+
+        Uses tiktoken when its encoder can be loaded, otherwise the ~4 characters
+        per token heuristic
+        """
+        if not text:
+            return 0
+        if self.encoder is not None:
+            return len(self.encoder.encode(text))
+        return (len(text) + 3) // 4
+
+    def _strip_schema(self, node: Any, top_level: bool = True) -> Any:
+        """Recursively drop metadata keys and empty "required" lists"""
+        if isinstance(node, dict):
+            stripped = {}
+            for key, value in node.items():
+                if top_level and key in SCHEMA_KEYS_TO_DROP:
+                    continue
+                if key == "required" and value == []:
+                    continue
+                # "properties" maps field names to sub-schemas; keep its keys as-is
+                stripped[key] = self._strip_schema(value, top_level=False)
+            return stripped
+        if isinstance(node, list):
+            return [self._strip_schema(item, top_level=False) for item in node]
+        return node
+
+    def _build_schema_query(self, schema: Dict[str, Any]) -> str:
+        """Collect field names and descriptions from the schema into one query text"""
+        terms = []
+
+        def walk(node: Any, name: Optional[str] = None):
+            if isinstance(node, dict):
+                if name:
+                    terms.append(name.replace("_", " "))
+                if isinstance(node.get("description"), str):
+                    terms.append(node["description"])
+                for child_name, child in (node.get("properties") or {}).items():
+                    walk(child, child_name)
+                if "items" in node:
+                    walk(node["items"])
+
+        walk(schema)
+        return " ".join(terms)
+
+    def _strip_headers_footers(
+        self,
+        pages: List[Tuple[int, str]],
+        edge_lines: int = 3
+    ) -> Tuple[List[Tuple[int, str]], int]:
+        """
+        Remove lines repeated at the top/bottom of most pages (letterheads, page footers)
+
+        Digits are ignored when comparing lines so "Page 1 of 5" and "Page 2 of 5" match.
+        Only the first/last edge_lines non-empty lines of a page are removed, so body
+        lines that happen to look like a footer stay. The first occurrence is kept so
+        the values on the letterhead are still available.
+        """
+        if len(pages) < 3:
+            return list(pages), 0
+
+        def signature(line: str) -> str:
+            return re.sub(r"\d+", "#", line.strip().lower())
+
+        edge_counts = Counter()
+        for _, text in pages:
+            lines = [line for line in text.splitlines() if line.strip()]
+            edges = lines[:edge_lines] + lines[-edge_lines:]
+            edge_counts.update({signature(line) for line in edges})
+
+        threshold = max(2, (len(pages) + 1) // 2)
+        repeated = {sig for sig, count in edge_counts.items() if count >= threshold and sig}
+
+        cleaned_pages = []
+        removed = 0
+        seen = set()
+        for page_number, text in pages:
+            lines = text.splitlines()
+            non_empty = [index for index, line in enumerate(lines) if line.strip()]
+            edge_indices = set(non_empty[:edge_lines] + non_empty[-edge_lines:])
+            kept_lines = []
+            for index, line in enumerate(lines):
+                sig = signature(line)
+                if index in edge_indices and sig in repeated:
+                    if sig in seen:
+                        removed += 1
+                        continue
+                    seen.add(sig)
+                kept_lines.append(line)
+            cleaned_pages.append((page_number, "\n".join(kept_lines)))
+
+        return cleaned_pages, removed
+
+    def _split_paragraphs(self, text: str, max_lines: int = 8) -> List[str]:
+        """
+        Split page text into paragraphs
+
+        pdfplumber output rarely has blank lines, so long blocks are cut into
+        groups of at most max_lines lines
+        """
+        paragraphs = []
+        for block in re.split(r"\n\s*\n", text):
+            lines = [line for line in block.splitlines() if line.strip()]
+            for start in range(0, len(lines), max_lines):
+                paragraphs.append("\n".join(lines[start:start + max_lines]))
+        return paragraphs
+
+    def _is_boilerplate(self, text: str) -> bool:
+        """Detect terms-and-conditions style legal pages"""
+        lowered = text.lower()
+        hits = sum(1 for phrase in BOILERPLATE_PHRASES if phrase in lowered)
+        word_count = len(tokenize(text, stopwords=set()))
+        return hits >= 3 and word_count >= 150
+
+    @property
+    def encoder(self):
+        """tiktoken encoder for the model, loaded on first use (None if unavailable)"""
+        with _encoders_lock:
+            if self.model not in _encoders:
+                _encoders[self.model] = self._load_encoder(self.model)
+            return _encoders[self.model]
+
+    def _load_encoder(self, model: str):
+        """
+        Load the tiktoken encoder for the model, if tiktoken is installed
+
+        tiktoken downloads the BPE files on first use; any failure (offline host,
+        unknown model without the fallback encoding) falls back to the estimate
+        """
+        if not TIKTOKEN_AVAILABLE:
+            return None
+        try:
+            try:
+                return tiktoken.encoding_for_model(model)
+            except KeyError:
+                return tiktoken.get_encoding("o200k_base")
+        except Exception:
+            return None
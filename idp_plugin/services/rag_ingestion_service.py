@@ -13,6 +13,8 @@ from openai import OpenAI
 from idp_plugin.models.rag_knowledge_vectors import RAGKnowledgeVector
 from idp_plugin.models.rag_schema_vectors import RAGSchemaVector
 from idp_plugin.core.database import SessionLocal
+from idp_plugin.utils.vector_quantization import quantize_int8
+from idp_plugin.core.telemetry import span, record_llm_usage
 
 
 class RAGIngestionService:
@@ -53,6 +55,7 @@ class RAGIngestionService:
         for item in knowledge_data:
             # Create embedding
             embedding = self._create_embedding(item["content_text"])
+            embedding_int8, embedding_scale = quantize_int8(embedding)
             
             # Create vector record
             vector = RAGKnowledgeVector(
@@ -60,6 +63,8 @@ class RAGIngestionService:
                 content_type=item["content_type"],
                 content_text=item["content_text"],
                 embedding=embedding,
+                embedding_int8=embedding_int8,
+                embedding_scale=embedding_scale,
                 source=item.get("source"),
                 source_version=item.get("source_version"),
                 category=item.get("category"),
@@ -99,6 +104,7 @@ class RAGIngestionService:
             
             # Create embedding
             embedding = self._create_embedding(description_text)
+            embedding_int8, embedding_scale = quantize_int8(embedding)
             
             # Create vector record
             vector = RAGSchemaVector(
@@ -109,6 +115,8 @@ class RAGIngestionService:
                 description=item["description"],
                 data_type=item.get("data_type"),
                 embedding=embedding,
+                embedding_int8=embedding_int8,
+                embedding_scale=embedding_scale,
                 schema_version=item.get("schema_version"),
                 is_required=item.get("is_required", "false"),
                 validation_rules=item.get("validation_rules"),
@@ -153,11 +161,13 @@ class RAGIngestionService:
             Embedding vector (list of floats)
         """
         try:
-            response = self.openai_client.embeddings.create(
-                model=self.embedding_model,
-                input=text,
-                dimensions=self.embedding_dimensions
-            )
+            with span("embedding", model=self.embedding_model):
+                response = self.openai_client.embeddings.create(
+                    model=self.embedding_model,
+                    input=text,
+                    dimensions=self.embedding_dimensions
+                )
+            record_llm_usage(self.embedding_model, "embedding", getattr(response, "usage", None))
             return response.data[0].embedding
         except Exception as e:
             raise Exception(f"Failed to create embedding: {str(e)}")
@@ -202,6 +212,34 @@ class RAGIngestionService:
         
         return " | ".join(parts)
     
+    def backfill_quantized_embeddings(self, batch_size: int = 500) -> int:
+        """
+        Populate int8 embeddings for rows ingested before quantization existed
+        
+        Args:
+            batch_size: Rows updated per commit
+        
+        Returns:
+            Number of rows updated
+        """
+        count = 0
+        
+        for model in (RAGKnowledgeVector, RAGSchemaVector):
+            while True:
+                rows = self.db.query(model).filter(
+                    model.embedding_int8.is_(None)
+                ).limit(batch_size).all()
+                if not rows:
+                    break
+                
+                for row in rows:
+                    row.embedding_int8, row.embedding_scale = quantize_int8(row.embedding)
+                
+                self.db.commit()
+                count += len(rows)
+        
+        return count
+    
     def clear_knowledge_base(self) -> None:
         """Clear all knowledge vectors"""
         self.db.query(RAGKnowledgeVector).delete()
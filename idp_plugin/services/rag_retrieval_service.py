@@ -3,42 +3,81 @@ RAG retrieval service for IDP plugin
 Retrieves relevant knowledge and schema chunks based on queries
 """
 
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, defer
 from typing import List, Dict, Any, Optional, Tuple
 from sqlalchemy import func
 import numpy as np
 from openai import OpenAI
 import os
+import re
+import threading
+import time
 
+from idp_plugin.core.config import IDPConfig
 from idp_plugin.models.rag_knowledge_vectors import RAGKnowledgeVector
 from idp_plugin.models.rag_schema_vectors import RAGSchemaVector
+from idp_plugin.utils.vector_quantization import (
+    int8_matrix,
+    approximate_cosine_scores,
+    exact_cosine_scores,
+    top_indices
+)
+from idp_plugin.utils.lexical_index import KnowledgeLexicalIndex
+from idp_plugin.core.telemetry import span, traced, record_cache, record_llm_usage
+
+# Process-wide lexical index over knowledge rows, rebuilt when the table changes
+# (checked at most every IDP_RAG_LEXICAL_CHECK_SECONDS)
+_lexical_index_cache: Dict[str, Any] = {"signature": None, "index": None, "checked_at": 0.0}
+_lexical_index_lock = threading.Lock()
 
 
 class RAGRetrievalService:
     """
     Service for retrieving relevant knowledge and schema using vector similarity
+    Knowledge retrieval is hybrid: exact standard-code/alias hits skip the embedding
+    call entirely, otherwise BM25 and vector scores are fused
+    
+    Results are (row, similarity, score) tuples: similarity is the plain cosine
+    (None for exact hits, which have no query embedding), score is what the
+    results are ranked by (fused score, 1.0 for exact hits, else the cosine)
     """
     
-    def __init__(self, db: Session):
+    def __init__(
+        self,
+        db: Session,
+        quantized_scan: Optional[bool] = None,
+        hybrid: Optional[bool] = None
+    ):
         """
         Initialize RAG retrieval service
         
         Args:
             db: Database session
+            quantized_scan: Scan int8 embeddings and re-rank the best candidates
+                with exact float32 cosine (default: IDP_RAG_QUANTIZED_SCAN)
+            hybrid: Use the lexical index for exact-code hits and score fusion
+                (default: IDP_RAG_HYBRID)
         """
         self.db = db
         self.openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
         self.embedding_model = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
         self.embedding_dimensions = 1536
         self.default_top_k = 5
+        self.quantized_scan = IDPConfig.RAG_QUANTIZED_SCAN if quantized_scan is None else quantized_scan
+        self.rerank_candidates = IDPConfig.RAG_RERANK_CANDIDATES
+        self.hybrid = IDPConfig.RAG_HYBRID_ENABLED if hybrid is None else hybrid
+        self.hybrid_vector_weight = IDPConfig.RAG_HYBRID_VECTOR_WEIGHT
+        self.fusion_candidates = IDPConfig.RAG_FUSION_CANDIDATES
+        self._embedding_cache: Dict[str, List[float]] = {}
     
     def retrieve_knowledge(
         self,
         query: str,
         content_type: Optional[str] = None,
         category: Optional[str] = None,
-        top_k: int = None
-    ) -> List[Tuple[RAGKnowledgeVector, float]]:
+        top_k: int = None,
+        lexical_query: Optional[str] = None
+    ) -> List[Tuple[RAGKnowledgeVector, float, float]]:
         """
         Retrieve relevant knowledge chunks
         
@@ -47,43 +86,83 @@ class RAGRetrievalService:
             content_type: Filter by content type (optional)
             category: Filter by category (optional)
             top_k: Number of results to return (default: 5)
+            lexical_query: Text used for BM25 scoring (default: query)
         
         Returns:
-            List of tuples (RAGKnowledgeVector, similarity_score)
+            List of tuples (RAGKnowledgeVector, similarity, score)
         """
         top_k = top_k or self.default_top_k
         
         # Create query embedding
         query_embedding = self._create_embedding(query)
         
-        # Build query
-        query_obj = self.db.query(RAGKnowledgeVector)
-        
-        # Apply filters
+        # Build filters
+        filters = []
         if content_type:
-            query_obj = query_obj.filter(RAGKnowledgeVector.content_type == content_type)
+            filters.append(RAGKnowledgeVector.content_type == content_type)
         if category:
-            query_obj = query_obj.filter(RAGKnowledgeVector.category == category)
+            filters.append(RAGKnowledgeVector.category == category)
         
-        # Get all candidates
-        candidates = query_obj.all()
+        if not self.hybrid:
+            return [
+                (row, similarity, similarity)
+                for row, similarity in self._rank_candidates(RAGKnowledgeVector, filters, query_embedding, top_k)
+            ]
         
-        # Calculate cosine similarity
-        results = []
-        for candidate in candidates:
-            similarity = self._cosine_similarity(query_embedding, candidate.embedding)
-            results.append((candidate, similarity))
+        # Hybrid: fuse vector and BM25 candidates
+        vector_results = self._rank_candidates(
+            RAGKnowledgeVector, filters, query_embedding, max(self.fusion_candidates, top_k)
+        )
+        lexical_results = self._get_lexical_index().search(
+            lexical_query or query,
+            top_k=max(self.fusion_candidates, top_k),
+            content_type=content_type,
+            category=category
+        )
+        return self._fuse_scores(vector_results, lexical_results, query_embedding, top_k)
+    
+    def find_exact_knowledge(
+        self,
+        value: str,
+        content_type: Optional[str] = None,
+        category: Optional[str] = None,
+        top_k: int = None
+    ) -> List[Tuple[RAGKnowledgeVector, Optional[float], float]]:
+        """
+        Look up knowledge rows by exact standard code or alias (no embedding call)
         
-        # Sort by similarity (descending) and return top_k
-        results.sort(key=lambda x: x[1], reverse=True)
-        return results[:top_k]
+        Args:
+            value: Field value, e.g. "IEC60068-2-14" or "IS 2071"
+            content_type: Filter by content type (optional)
+            category: Filter by category (optional)
+            top_k: Number of results to return (default: 5)
+        
+        Returns:
+            List of tuples (RAGKnowledgeVector, None, 1.0); empty if there is no exact hit
+        """
+        top_k = top_k or self.default_top_k
+        
+        entries = self._get_lexical_index().exact_matches(
+            value, content_type=content_type, category=category
+        )[:top_k]
+        if not entries:
+            return []
+        
+        ids = [entry["id"] for entry in entries]
+        rows = {
+            row.id: row
+            for row in self.db.query(RAGKnowledgeVector).options(
+                defer(RAGKnowledgeVector.embedding)
+            ).filter(RAGKnowledgeVector.id.in_(ids)).all()
+        }
+        return [(rows[row_id], None, 1.0) for row_id in ids if row_id in rows]
     
     def retrieve_schema(
         self,
         query: str,
         document_type: Optional[str] = None,
         top_k: int = None
-    ) -> List[Tuple[RAGSchemaVector, float]]:
+    ) -> List[Tuple[RAGSchemaVector, float, float]]:
         """
         Retrieve relevant schema field descriptions
         
@@ -93,22 +172,140 @@ class RAGRetrievalService:
             top_k: Number of results to return (default: 5)
         
         Returns:
-            List of tuples (RAGSchemaVector, similarity_score)
+            List of tuples (RAGSchemaVector, similarity, score)
         """
         top_k = top_k or self.default_top_k
         
         # Create query embedding
         query_embedding = self._create_embedding(query)
         
-        # Build query
-        query_obj = self.db.query(RAGSchemaVector)
-        
-        # Apply filters
+        # Build filters
+        filters = []
         if document_type:
-            query_obj = query_obj.filter(RAGSchemaVector.document_type == document_type)
+            filters.append(RAGSchemaVector.document_type == document_type)
+        
+        return [
+            (row, similarity, similarity)
+            for row, similarity in self._rank_candidates(RAGSchemaVector, filters, query_embedding, top_k)
+        ]
+    
+    def _fuse_scores(
+        self,
+        vector_results: List[Tuple[RAGKnowledgeVector, float]],
+        lexical_results: List[Tuple[Dict[str, Any], float]],
+        query_embedding: List[float],
+        top_k: int
+    ) -> List[Tuple[RAGKnowledgeVector, float, float]]:
+        """
+        Combine vector and BM25 results
+        
+        score = w * cosine + (1 - w) * bm25 / max_bm25, with w = hybrid_vector_weight.
+        Lexical-only candidates get their exact cosine computed so every fused
+        score has both components. Returns (row, cosine, score) tuples.
+        """
+        max_lexical = max((score for _, score in lexical_results), default=0.0)
+        lexical_scores = {
+            entry["id"]: score / max_lexical
+            for entry, score in lexical_results
+        } if max_lexical > 0 else {}
+        
+        rows = {row.id: row for row, _ in vector_results}
+        vector_scores = {row.id: similarity for row, similarity in vector_results}
+        
+        missing_ids = [row_id for row_id in lexical_scores if row_id not in rows]
+        if missing_ids:
+            extra_rows = self.db.query(RAGKnowledgeVector).filter(
+                RAGKnowledgeVector.id.in_(missing_ids)
+            ).all()
+            extra_scores = exact_cosine_scores(query_embedding, [row.embedding for row in extra_rows])
+            for row, similarity in zip(extra_rows, extra_scores):
+                rows[row.id] = row
+                vector_scores[row.id] = float(similarity)
+        
+        weight = self.hybrid_vector_weight
+        fused = [
+            (
+                rows[row_id],
+                vector_scores.get(row_id, 0.0),
+                weight * vector_scores.get(row_id, 0.0) + (1 - weight) * lexical_scores.get(row_id, 0.0)
+            )
+            for row_id in rows
+        ]
+        fused.sort(key=lambda x: x[2], reverse=True)
+        return fused[:top_k]
+    
+    def _get_lexical_index(self) -> KnowledgeLexicalIndex:
+        """
+        Get the process-wide lexical index, rebuilding it if the knowledge table changed
+        
+        The table is checked for changes (row count, latest updated_at) at most
+        every IDPConfig.RAG_LEXICAL_CHECK_SECONDS, not on every retrieval.
+        
+        Returns:
+            KnowledgeLexicalIndex over all knowledge rows
+        """
+        with _lexical_index_lock:
+            index = _lexical_index_cache["index"]
+            if index is not None and time.monotonic() - _lexical_index_cache["checked_at"] < IDPConfig.RAG_LEXICAL_CHECK_SECONDS:
+                record_cache("lexical_index", hit=True)
+                return index
+        
+        signature = tuple(self.db.query(
+            func.count(RAGKnowledgeVector.id),
+            func.max(RAGKnowledgeVector.updated_at)
+        ).one())
+        
+        with _lexical_index_lock:
+            rebuild = _lexical_index_cache["index"] is None or _lexical_index_cache["signature"] != signature
+            record_cache("lexical_index", hit=not rebuild)
+            if rebuild:
+                rows = self.db.query(
+                    RAGKnowledgeVector.id,
+                    RAGKnowledgeVector.content_text,
+                    RAGKnowledgeVector.content_type,
+                    RAGKnowledgeVector.category,
+                    RAGKnowledgeVector.knowledge_metadata
+                ).all()
+                entries = []
+                for row_id, content_text, content_type, category, metadata in rows:
+                    metadata = metadata or {}
+                    entries.append({
+                        "id": row_id,
+                        "text": content_text,
+                        "content_type": content_type,
+                        "category": category,
+                        "aliases": list(metadata.get("aliases") or []) + list(metadata.get("synonyms") or [])
+                    })
+                _lexical_index_cache["index"] = KnowledgeLexicalIndex(entries)
+                _lexical_index_cache["signature"] = signature
+            _lexical_index_cache["checked_at"] = time.monotonic()
+            
+            return _lexical_index_cache["index"]
+    
+    def _rank_candidates(
+        self,
+        model,
+        filters: List[Any],
+        query_embedding: List[float],
+        top_k: int
+    ) -> List[Tuple[Any, float]]:
+        """
+        Rank vector rows by cosine similarity to the query embedding
+        
+        Args:
+            model: RAGKnowledgeVector or RAGSchemaVector
+            filters: SQLAlchemy filter expressions
+            query_embedding: Query embedding
+            top_k: Number of results to return
+        
+        Returns:
+            List of tuples (row, similarity_score)
+        """
+        if self.quantized_scan:
+            return self._rank_candidates_quantized(model, filters, query_embedding, top_k)
         
         # Get all candidates
-        candidates = query_obj.all()
+        candidates = self.db.query(model).filter(*filters).all()
         
         # Calculate cosine similarity
         results = []
@@ -120,6 +317,53 @@ class RAGRetrievalService:
         results.sort(key=lambda x: x[1], reverse=True)
         return results[:top_k]
     
+    def _rank_candidates_quantized(
+        self,
+        model,
+        filters: List[Any],
+        query_embedding: List[float],
+        top_k: int
+    ) -> List[Tuple[Any, float]]:
+        """
+        Two-stage ranking: int8 candidate scan, then exact float32 re-ranking
+        
+        Only the id and int8 columns are loaded for the scan; full rows (with the
+        float embedding) are loaded for the best rerank_candidates only. Rows that
+        have not been quantized yet always go to the re-ranking stage.
+        """
+        # Stage 1: approximate scan over int8 embeddings
+        scan_rows = self.db.query(model.id, model.embedding_int8).filter(*filters).all()
+        
+        quantized_ids = []
+        quantized_bytes = []
+        rerank_ids = []
+        for row_id, embedding_int8 in scan_rows:
+            if embedding_int8 is None:
+                rerank_ids.append(row_id)
+            else:
+                quantized_ids.append(row_id)
+                quantized_bytes.append(bytes(embedding_int8))
+        
+        approximate_scores = approximate_cosine_scores(query_embedding, int8_matrix(quantized_bytes))
+        for index in top_indices(approximate_scores, max(self.rerank_candidates, top_k)):
+            rerank_ids.append(quantized_ids[index])
+        
+        if not rerank_ids:
+            return []
+        
+        # Stage 2: exact float32 cosine over the shortlisted rows
+        candidates = self.db.query(model).filter(model.id.in_(rerank_ids)).all()
+        exact_scores = exact_cosine_scores(
+            query_embedding,
+            [candidate.embedding for candidate in candidates]
+        )
+        
+        return [
+            (candidates[index], float(exact_scores[index]))
+            for index in top_indices(exact_scores, top_k)
+        ]
+    
+    @traced("rag.retrieval")
     def retrieve_for_field(
         self,
         field_value: str,
@@ -137,7 +381,8 @@ class RAGRetrievalService:
             query_intent: "normalize", "map", or "validate"
         
         Returns:
-            Dictionary with knowledge and schema results
+            Dictionary with knowledge and schema results; "similarity" is the plain
+            cosine (None for exact hits), "score" the ranking score
         """
         # Build query based on intent
         if query_intent == "normalize":
@@ -149,18 +394,30 @@ class RAGRetrievalService:
         else:
             query = f"{field_value} {field_path}"
         
+        knowledge_results = []
+        schema_results = []
+        
+        # Fast path: exact standard code / alias hit needs no embedding
+        if self.hybrid:
+            knowledge_results = self.find_exact_knowledge(field_value, top_k=3)
+            if knowledge_results:
+                schema_results = self._find_schema_by_path(field_path, document_type, top_k=3)
+        
         # Retrieve knowledge
-        knowledge_results = self.retrieve_knowledge(
-            query=query,
-            top_k=3
-        )
+        if not knowledge_results:
+            knowledge_results = self.retrieve_knowledge(
+                query=query,
+                top_k=3,
+                lexical_query=field_value
+            )
         
         # Retrieve schema
-        schema_results = self.retrieve_schema(
-            query=query,
-            document_type=document_type,
-            top_k=3
-        )
+        if not schema_results:
+            schema_results = self.retrieve_schema(
+                query=query,
+                document_type=document_type,
+                top_k=3
+            )
         
         return {
             "knowledge": [
@@ -168,6 +425,7 @@ class RAGRetrievalService:
                     "content": result[0].content_text,
                     "content_type": result[0].content_type,
                     "similarity": result[1],
+                    "score": result[2],
                     "source": result[0].source,
                     "metadata": result[0].knowledge_metadata
                 }
@@ -179,6 +437,7 @@ class RAGRetrievalService:
                     "field_name": result[0].field_name,
                     "description": result[0].description,
                     "similarity": result[1],
+                    "score": result[2],
                     "data_type": result[0].data_type,
                     "validation_rules": result[0].validation_rules,
                     "metadata": result[0].schema_metadata
@@ -187,9 +446,30 @@ class RAGRetrievalService:
             ]
         }
     
+    def _find_schema_by_path(
+        self,
+        field_path: str,
+        document_type: str,
+        top_k: int
+    ) -> List[Tuple[RAGSchemaVector, Optional[float], float]]:
+        """
+        Look up schema rows for a field path directly (array indices ignored)
+        
+        Returns:
+            List of tuples (RAGSchemaVector, None, 1.0)
+        """
+        paths = {field_path, re.sub(r"\[\d+\]", "", field_path)}
+        rows = self.db.query(RAGSchemaVector).options(
+            defer(RAGSchemaVector.embedding)
+        ).filter(
+            RAGSchemaVector.document_type == document_type,
+            RAGSchemaVector.field_path.in_(paths)
+        ).limit(top_k).all()
+        return [(row, None, 1.0) for row in rows]
+    
     def _create_embedding(self, text: str) -> List[float]:
         """
-        Create embedding for text
+        Create embedding for text (memoized per service instance)
         
         Args:
             text: Text to embed
@@ -197,13 +477,22 @@ class RAGRetrievalService:
         Returns:
             Embedding vector (list of floats)
         """
+        cached = text in self._embedding_cache
+        record_cache("query_embedding", hit=cached)
+        if cached:
+            return self._embedding_cache[text]
+        
         try:
-            response = self.openai_client.embeddings.create(
-                model=self.embedding_model,
-                input=text,
-                dimensions=self.embedding_dimensions
-            )
-            return response.data[0].embedding
+            with span("embedding", model=self.embedding_model):
+                response = self.openai_client.embeddings.create(
+                    model=self.embedding_model,
+                    input=text,
+                    dimensions=self.embedding_dimensions
+                )
+            record_llm_usage(self.embedding_model, "embedding", getattr(response, "usage", None))
+            embedding = response.data[0].embedding
+            self._embedding_cache[text] = embedding
+            return embedding
         except Exception as e:
             raise Exception(f"Failed to create embedding: {str(e)}")
     
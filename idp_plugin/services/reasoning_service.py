@@ -11,6 +11,7 @@ from openai import OpenAI
 
 from idp_plugin.services.rag_retrieval_service import RAGRetrievalService
 from idp_plugin.models.extractions import Extraction
+from idp_plugin.core.telemetry import span, record_llm_usage
 
 
 class ReasoningService:
@@ -386,15 +387,17 @@ Rules:
 4. Return valid JSON only"""
         
         try:
-            response = self.openai_client.chat.completions.create(
-                model=self.reasoning_model,
-                messages=[
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,  # Slightly higher than extraction for reasoning
-                response_format={"type": "json_object"}
-            )
+            with span("llm.reasoning", model=self.reasoning_model, task=task):
+                response = self.openai_client.chat.completions.create(
+                    model=self.reasoning_model,
+                    messages=[
+                        {"role": "system", "content": system_message},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.3,  # Slightly higher than extraction for reasoning
+                    response_format={"type": "json_object"}
+                )
+            record_llm_usage(self.reasoning_model, "reasoning", getattr(response, "usage", None))
             
             content = response.choices[0].message.content
             return json.loads(content)
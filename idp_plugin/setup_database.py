@@ -102,6 +102,23 @@ def setup_database():
     Base.metadata.create_all(bind=engine)
     print("✓ All tables created")
     
+    # Add quantized embedding columns to tables created before they existed
+    if "postgresql" in database_url.lower():
+        print("\nChecking quantized embedding columns...")
+        try:
+            with engine.connect() as conn:
+                for table_name in ("idp_rag_knowledge_vectors", "idp_rag_schema_vectors"):
+                    conn.execute(text(f"""
+                        ALTER TABLE {table_name}
+                        ADD COLUMN IF NOT EXISTS embedding_int8 BYTEA,
+                        ADD COLUMN IF NOT EXISTS embedding_scale DOUBLE PRECISION
+                    """))
+                conn.commit()
+            print("✓ Quantized embedding columns present")
+            print("  Backfill existing rows with RAGIngestionService().backfill_quantized_embeddings()")
+        except Exception as e:
+            print(f"⚠ Warning: Could not add quantized embedding columns: {e}")
+    
     # Create vector indexes (if using PostgreSQL with pgvector)
     if "postgresql" in database_url.lower():
         print("\nCreating vector indexes...")
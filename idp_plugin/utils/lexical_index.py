@@ -0,0 +1,267 @@
+"""
+Lexical (BM25) index utilities for IDP plugin
+Local, dependency-free keyword scoring used for prompt compaction and retrieval
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Very common English words that carry no signal for field matching
+STOPWORDS: Set[str] = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "if",
+    "in", "is", "it", "of", "on", "or", "the", "this", "to", "was", "with"
+}
+
+
+def tokenize(text: Optional[str], stopwords: Optional[Set[str]] = None) -> List[str]:
+    """
+    Split text into lowercase alphanumeric tokens
+
+    Args:
+        text: Text to tokenize
+        stopwords: Tokens to drop (default: STOPWORDS)
+
+    Returns:
+        List of tokens
+    """
+    if not text:
+        return []
+    stopwords = STOPWORDS if stopwords is None else stopwords
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in stopwords]
+
+
+class BM25Index:
+    """
+    In-memory Okapi BM25 index over a list of short documents
+    """
+
+    def __init__(self, documents: Iterable[str], k1: float = 1.5, b: float = 0.75):
+        """
+        Build the index
+
+        Args:
+            documents: Document texts (position in the list is the document id)
+            k1: Term frequency saturation parameter
+            b: Length normalization parameter
+        """
+        self.k1 = k1
+        self.b = b
+        self.doc_term_freqs: List[Counter] = []
+        self.doc_lengths: List[int] = []
+        self.postings: Dict[str, List[int]] = {}
+
+        for doc_id, text in enumerate(documents):
+            term_freqs = Counter(tokenize(text))
+            self.doc_term_freqs.append(term_freqs)
+            self.doc_lengths.append(sum(term_freqs.values()))
+            for term in term_freqs:
+                self.postings.setdefault(term, []).append(doc_id)
+
+        self.doc_count = len(self.doc_term_freqs)
+        self.avg_doc_length = (
+            sum(self.doc_lengths) / self.doc_count if self.doc_count else 0.0
+        )
+        self.idf: Dict[str, float] = {
+            term: math.log(1 + (self.doc_count - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            for term, doc_ids in self.postings.items()
+        }
+
+    def score(self, query: str) -> List[float]:
+        """
+        Score every document against a query
+
+        Args:
+            query: Query text
+
+        Returns:
+            List of BM25 scores aligned with the indexed documents
+        """
+        scores = [0.0] * self.doc_count
+        if not self.doc_count:
+            return scores
+
+        for term in set(tokenize(query)):
+            doc_ids = self.postings.get(term)
+            if not doc_ids:
+                continue
+            idf = self.idf[term]
+            for doc_id in doc_ids:
+                tf = self.doc_term_freqs[doc_id][term]
+                length_norm = 1 - self.b + self.b * self.doc_lengths[doc_id] / (self.avg_doc_length or 1.0)
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + self.k1 * length_norm)
+
+        return scores
+
+    def top_k(self, query: str, k: int) -> List[tuple]:
+        """
+        Return the best matching documents
+
+        Args:
+            query: Query text
+            k: Number of results
+
+        Returns:
+            List of (document_id, score) tuples with score > 0, best first
+        """
+        scores = self.score(query)
+        ranked = sorted(
+            ((doc_id, score) for doc_id, score in enumerate(scores) if score > 0),
+            key=lambda item: item[1],
+            reverse=True
+        )
+        return ranked[:k]
+
+
+# Standard codes such as "IEC 60068-2-14", "IS 2071", "CISPR 22", "EN 55032:2015"
+STANDARD_CODE_PATTERN = re.compile(
+    r"\b(IEC|IS|ISO|EN|CISPR|ASTM|BS|UL|IEEE|ANSI|DIN|JIS|CSA|AS|NZS|GB|SAE|MIL[\s-]?STD)"
+    r"\s*[-:]?\s*"
+    r"(\d+(?:\s*[-.]\s*\d+)*)",
+    re.IGNORECASE
+)
+
+# Bodies that are also common words; only accepted when written in upper case
+AMBIGUOUS_BODIES = {"IS", "AS", "EN", "UL", "GB", "BS"}
+
+
+def extract_standard_codes(text: Optional[str]) -> List[str]:
+    """
+    Extract canonical standard codes from free text
+
+    "iec60068 - 2-14:2007" and "IEC 60068-2-14" both become "IEC 60068-2-14";
+    a year after ":" is not part of the code.
+
+    Args:
+        text: Text to scan
+
+    Returns:
+        List of canonical codes in order of appearance (no duplicates)
+    """
+    if not text:
+        return []
+
+    codes = []
+    for match in STANDARD_CODE_PATTERN.finditer(text):
+        body = re.sub(r"[\s-]+", "-", match.group(1).upper())
+        # "is 2", "as 5" in running text are English words, not standard bodies
+        if body in AMBIGUOUS_BODIES and match.group(1) != body:
+            continue
+        number = re.sub(r"\s*[-.]\s*", "-", match.group(2).strip())
+        code = f"{body} {number}"
+        if code not in codes:
+            codes.append(code)
+    return codes
+
+
+def normalize_alias(text: Optional[str]) -> str:
+    """Lowercase and collapse punctuation/whitespace for exact alias comparison"""
+    return " ".join(tokenize(text, stopwords=set()))
+
+
+class KnowledgeLexicalIndex:
+    """
+    In-process lexical index over knowledge entries
+
+    Provides exact standard-code / alias lookup and BM25 scoring. Entries are
+    dictionaries with "id", "text", "content_type", "category" and "aliases".
+    """
+
+    def __init__(self, entries: List[Dict[str, Any]]):
+        """
+        Build the index
+
+        Args:
+            entries: Knowledge entries (id, text, content_type, category, aliases)
+        """
+        self.entries = entries
+        self.code_map: Dict[str, List[int]] = {}
+        self.alias_map: Dict[str, List[int]] = {}
+
+        documents = []
+        for position, entry in enumerate(entries):
+            aliases = [alias for alias in entry.get("aliases") or [] if isinstance(alias, str)]
+            documents.append(" ".join([entry["text"]] + aliases))
+
+            for alias in [entry["text"]] + aliases:
+                key = normalize_alias(alias)
+                if key:
+                    self.alias_map.setdefault(key, []).append(position)
+                for code in extract_standard_codes(alias):
+                    positions = self.code_map.setdefault(code, [])
+                    if position not in positions:
+                        positions.append(position)
+
+        self.bm25 = BM25Index(documents)
+
+    def exact_matches(
+        self,
+        value: str,
+        content_type: Optional[str] = None,
+        category: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Find entries whose alias equals the value or that carry the same standard code
+
+        Args:
+            value: Field value (e.g. "IEC60068-2-14")
+            content_type: Filter by content type (optional)
+            category: Filter by category (optional)
+
+        Returns:
+            Matching entries, alias hits first
+        """
+        positions = list(self.alias_map.get(normalize_alias(value), []))
+        for code in extract_standard_codes(value):
+            for position in self.code_map.get(code, []):
+                if position not in positions:
+                    positions.append(position)
+
+        return [
+            self.entries[position]
+            for position in positions
+            if self._matches_filters(self.entries[position], content_type, category)
+        ]
+
+    def search(
+        self,
+        query: str,
+        top_k: int,
+        content_type: Optional[str] = None,
+        category: Optional[str] = None
+    ) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        BM25 search
+
+        Args:
+            query: Query text
+            top_k: Number of results
+            content_type: Filter by content type (optional)
+            category: Filter by category (optional)
+
+        Returns:
+            List of (entry, bm25_score) tuples, best first
+        """
+        scores = self.bm25.score(query)
+        ranked = sorted(
+            (
+                (self.entries[position], score)
+                for position, score in enumerate(scores)
+                if score > 0 and self._matches_filters(self.entries[position], content_type, category)
+            ),
+            key=lambda item: item[1],
+            reverse=True
+        )
+        return ranked[:top_k]
+
+    @staticmethod
+    def _matches_filters(entry: Dict[str, Any], content_type: Optional[str], category: Optional[str]) -> bool:
+        if content_type and entry.get("content_type") != content_type:
+            return False
+        if category and entry.get("category") != category:
+            return False
+        return True
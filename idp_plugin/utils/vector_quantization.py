@@ -0,0 +1,116 @@
+"""
+Embedding quantization utilities for IDP plugin
+Compact int8 representation of RAG embeddings for fast candidate scans
+"""
+
+from typing import List, Sequence, Tuple
+import numpy as np
+
+
+def quantize_int8(embedding: Sequence[float]) -> Tuple[bytes, float]:
+    """
+    Symmetric per-vector int8 quantization
+
+    Args:
+        embedding: Float embedding vector
+
+    Returns:
+        Tuple of (int8 bytes, scale) where embedding ~= int8_values * scale
+    """
+    vector = np.asarray(embedding, dtype=np.float32)
+    max_abs = float(np.max(np.abs(vector))) if vector.size else 0.0
+    scale = max_abs / 127.0 if max_abs > 0 else 1.0
+    quantized = np.clip(np.rint(vector / scale), -127, 127).astype(np.int8)
+    return quantized.tobytes(), scale
+
+
+def dequantize_int8(data: bytes, scale: float) -> np.ndarray:
+    """
+    Restore an approximate float32 vector from int8 bytes
+
+    Args:
+        data: int8 bytes produced by quantize_int8
+        scale: Scale produced by quantize_int8
+
+    Returns:
+        float32 numpy array
+    """
+    return np.frombuffer(data, dtype=np.int8).astype(np.float32) * np.float32(scale)
+
+
+def int8_matrix(rows: List[bytes]) -> np.ndarray:
+    """
+    Stack int8 byte rows (all of the same length) into an (n, dimensions) int8 matrix
+
+    Args:
+        rows: int8 bytes per candidate
+
+    Returns:
+        int8 numpy matrix
+    """
+    if not rows:
+        return np.empty((0, 0), dtype=np.int8)
+    return np.frombuffer(b"".join(rows), dtype=np.int8).reshape(len(rows), -1)
+
+
+def approximate_cosine_scores(query: Sequence[float], matrix: np.ndarray) -> np.ndarray:
+    """
+    Cosine similarity of a query against an int8 matrix
+
+    The per-row scale cancels out in the cosine, so scores are computed directly
+    on the int8 values (accumulated in float32).
+
+    Args:
+        query: Query embedding
+        matrix: int8 matrix from int8_matrix
+
+    Returns:
+        float32 array of approximate cosine similarities
+    """
+    if matrix.shape[0] == 0:
+        return np.empty(0, dtype=np.float32)
+    query_vector = np.asarray(query, dtype=np.float32)
+    query_norm = np.linalg.norm(query_vector)
+    rows = matrix.astype(np.float32)
+    row_norms = np.linalg.norm(rows, axis=1)
+    denominator = row_norms * query_norm
+    scores = rows @ query_vector
+    return np.divide(scores, denominator, out=np.zeros_like(scores), where=denominator > 0)
+
+
+def exact_cosine_scores(query: Sequence[float], embeddings: List[Sequence[float]]) -> np.ndarray:
+    """
+    Exact float32 cosine similarity of a query against a list of embeddings
+
+    Args:
+        query: Query embedding
+        embeddings: Candidate embeddings
+
+    Returns:
+        float32 array of cosine similarities
+    """
+    if not embeddings:
+        return np.empty(0, dtype=np.float32)
+    query_vector = np.asarray(query, dtype=np.float32)
+    rows = np.asarray(embeddings, dtype=np.float32)
+    denominator = np.linalg.norm(rows, axis=1) * np.linalg.norm(query_vector)
+    scores = rows @ query_vector
+    return np.divide(scores, denominator, out=np.zeros_like(scores), where=denominator > 0)
+
+
+def top_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores, best first
+
+    Args:
+        scores: Score array
+        k: Number of indices
+
+    Returns:
+        Array of indices
+    """
+    if scores.size == 0 or k <= 0:
+        return np.empty(0, dtype=np.int64)
+    k = min(k, scores.size)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
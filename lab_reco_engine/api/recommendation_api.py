@@ -3,47 +3,131 @@ REST API for Lab Recommendation Engine
 Provides endpoints for finding labs based on test requirements
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, make_response, stream_with_context
 from flask_cors import CORS
-import psycopg2
-from psycopg2.extras import RealDictCursor
+from functools import wraps
+import json
+from urllib.parse import urlencode
+import os
 import sys
 from pathlib import Path
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from scripts.entity_resolution import canonical_standard
+from scripts.standard_aliases import get_alias_graph
+from scripts.recommender import MatrixService
+from scripts.lab_queries import LabQueries, create_pool
+from scripts.response_cache import ResponseCache
+from scripts.lab_search import LabSearch
+from scripts.snapshot import SnapshotQueries
+
+# Standard alias classes (config/standard_aliases.yaml), built once at startup
+ALIAS_GRAPH = get_alias_graph()
+
+# Search modes (QUERIES.search_modes): "like" (substring, LOWER(col) LIKE '%term%') or
+# "similarity" (pg_trgm word similarity, ranked). Both use the trigram GIN indexes of
+# db/trigram.sql; Postgres serves "similarity" only when pg_trgm is installed, and a
+# snapshot backend serves "like" only.
+DEFAULT_SIMILARITY_THRESHOLD = 0.3
+
+# /api/labs/search page size bounds; format=ndjson streams any number of rows
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
+# Upper bound on requirements per batch recommendation (a TRF lists 10-40 tests)
+MAX_REQUIREMENTS = 200
+
+# /api/stats build history bounds
+DEFAULT_STATS_HISTORY = 10
+MAX_STATS_HISTORY = 100
+
 app = Flask(__name__)
 CORS(app)  # Enable CORS for web interface
 
-# Database configuration
-DB_CONFIG = {
-    'dbname': 'lab_reco_engine',
-    'user': 'postgres',
-    'password': '2003',
-    'host': 'localhost',
-    'port': 5432
-}
+if os.environ.get('LAB_RECO_SNAPSHOT'):
+    # Serve from a read-only snapshot file (scripts/snapshot.py), no Postgres:
+    # published by the pipeline, picked up here as soon as it is replaced
+    DB_POOL = None
+    QUERIES = SnapshotQueries(os.environ['LAB_RECO_SNAPSHOT'], ALIAS_GRAPH)
+    MATRIX_SERVICE = QUERIES.matrix_service
+else:
+    # Connection pool (scripts/db_pool.py) with the shared prepared statements
+    # (scripts/lab_queries.py): one per worker process, sized by
+    # LAB_RECO_API_THREADS / LAB_RECO_DB_POOL_SIZE
+    DB_POOL = create_pool()
+
+    # In-memory capability matrices for /api/labs/recommend (scripts/recommender.py).
+    # Loaded on first use and reloaded whenever the pipeline publishes a new build.
+    MATRIX_SERVICE = MatrixService(DB_POOL.connection, ALIAS_GRAPH)
+
+    # Queries shared with the Streamlit UI
+    QUERIES = LabQueries(DB_POOL, ALIAS_GRAPH, MATRIX_SERVICE)
 
-def get_db_connection():
-    """Get database connection."""
-    return psycopg2.connect(**DB_CONFIG)
+# Reference responses cached per build (scripts/response_cache.py); set
+# LAB_RECO_CACHE_DIR to share a disk tier between worker processes
+RESPONSE_CACHE = ResponseCache(disk_dir=os.environ.get('LAB_RECO_CACHE_DIR'))
+
+def get_search_mode(args):
+    """Read the mode (like|similarity) and threshold (0-1) parameters."""
+    mode = args.get('mode', 'like').strip().lower()
+    if mode not in QUERIES.search_modes:
+        raise ValueError(f"mode must be one of: {', '.join(QUERIES.search_modes)}")
+    threshold = float(args.get('threshold', DEFAULT_SIMILARITY_THRESHOLD))
+    if not 0.0 <= threshold <= 1.0:
+        raise ValueError('threshold must be between 0 and 1')
+    return mode, threshold
+
+def cached_response(view):
+    """
+    Serve a GET endpoint from the build-versioned response cache.
+    
+    The ETag is derived from the build id and the request, so If-None-Match
+    gets a 304 until the pipeline publishes a new build. Only 200 responses
+    are cached.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        build_id = QUERIES.build_id()
+        key = request.path + '?' + urlencode(sorted(request.args.items(multi=True)))
+        etag = RESPONSE_CACHE.etag(build_id, key)
+        
+        if request.if_none_match.contains(etag):
+            response = make_response('', 304)
+            cache_status = 'revalidated'
+        else:
+            body = RESPONSE_CACHE.get(build_id, key)
+            if body is not None:
+                response = make_response(body, 200)
+                response.mimetype = 'application/json'
+                cache_status = 'hit'
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                RESPONSE_CACHE.put(build_id, key, response.get_data())
+                cache_status = 'miss'
+        
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Build-Id'] = str(build_id)
+        response.headers['X-Cache'] = cache_status
+        return response
+    return wrapper
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT COUNT(*) FROM labs WHERE deleted_at IS NULL")
-        lab_count = cur.fetchone()[0]
-        cur.close()
-        conn.close()
-        return jsonify({
+        status = {
             'status': 'healthy',
-            'database': 'connected',
-            'active_labs': lab_count
-        }), 200
+            'active_labs': QUERIES.active_lab_count(),
+            'recommender': MATRIX_SERVICE.start().status(),
+            'cache': RESPONSE_CACHE.stats()
+        }
+        status.update(QUERIES.backend_status())
+        return jsonify(status), 200
     except Exception as e:
         return jsonify({
             'status': 'unhealthy',
@@ -54,72 +138,70 @@ def health_check():
 def search_labs():
     """
     Search for labs by test name, standard, or domain.
+    Rows are paged with a keyset cursor in (lab_name, test_name, lab_id) order
+    (see scripts/lab_search.py), so deep pages cost the same as the first.
     
     Query Parameters:
     - test_name: Test name to search for (optional)
-    - standard: Standard code to search for (optional)
+    - standard: Standard code to search for, aliases included (optional)
+    - lab_name: Lab name to search for (optional)
     - domain: Domain name (optional)
-    - limit: Maximum results (default: 50)
+    - mode: "like" (substring, default) or "similarity" (fuzzy, ranked by similarity)
+    - threshold: Minimum word similarity for mode=similarity (default: 0.3)
+    - limit: Page size (default: 50, max: 1000); with format=ndjson, total rows (default: all)
+    - cursor: next_cursor of the previous page (optional)
+    - format: "json" (default) or "ndjson" (stream rows, one JSON object per line)
     """
     try:
         test_name = request.args.get('test_name', '').strip()
-        standard = request.args.get('standard', '').strip()
+        standard = canonical_standard(request.args.get('standard', ''))
+        lab_name = request.args.get('lab_name', '').strip()
         domain = request.args.get('domain', '').strip()
-        limit = int(request.args.get('limit', 50))
-        
-        if not any([test_name, standard, domain]):
+        cursor = request.args.get('cursor', '').strip() or None
+        output = request.args.get('format', 'json').strip().lower()
+        try:
+            mode, threshold = get_search_mode(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if not any([test_name, standard, lab_name, domain]):
             return jsonify({
-                'error': 'At least one search parameter (test_name, standard, or domain) is required'
+                'error': 'At least one search parameter (test_name, standard, lab_name, or domain) is required'
             }), 400
-        
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        # Build dynamic query
-        conditions = ["l.deleted_at IS NULL"]
-        params = []
-        
-        if test_name:
-            conditions.append("LOWER(t.test_name) LIKE LOWER(%s)")
-            params.append(f'%{test_name}%')
-        
-        if standard:
-            conditions.append("LOWER(s.standard_code) LIKE LOWER(%s)")
-            params.append(f'%{standard}%')
-        
-        if domain:
-            conditions.append("d.domain_name = %s")
-            params.append(domain)
-        
-        query = f"""
-            SELECT DISTINCT
-                l.lab_id,
-                l.lab_name,
-                t.test_name,
-                s.standard_code,
-                s.full_code,
-                s.standard_body,
-                d.domain_name
-            FROM labs l
-            JOIN lab_capabilities lc ON lc.lab_id = l.lab_id
-            JOIN tests t ON t.test_id = lc.test_id
-            JOIN standards s ON s.standard_id = lc.standard_id
-            JOIN domains d ON d.domain_id = lc.domain_id
-            WHERE {' AND '.join(conditions)}
-            ORDER BY l.lab_name, t.test_name
-            LIMIT %s
-        """
-        params.append(limit)
-        
-        cur.execute(query, params)
-        results = cur.fetchall()
-        
-        cur.close()
-        conn.close()
+        if output not in ('json', 'ndjson'):
+            return jsonify({'error': 'format must be one of: json, ndjson'}), 400
+        
+        search = LabSearch(
+            test_name=test_name, standard=standard, lab_name=lab_name, domain=domain,
+            mode=mode, threshold=threshold, class_key=ALIAS_GRAPH.class_key(standard)
+        )
+        try:
+            if cursor:
+                search.decode_cursor(cursor)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        if output == 'ndjson':
+            limit = int(request.args['limit']) if request.args.get('limit') else None
+            
+            def generate():
+                for row in QUERIES.iter_search_rows(search, cursor, limit):
+                    yield json.dumps(row, default=str) + '\n'
+            
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            return jsonify({'error': f'limit must be between 1 and {MAX_PAGE_SIZE}'}), 400
+        
+        page = QUERIES.search_labs(search, cursor, limit)
         
         return jsonify({
-            'count': len(results),
-            'results': [dict(row) for row in results]
+            'count': len(page['results']),
+            'results': page['results'],
+            'next_cursor': page['next_cursor'],
+            'total_estimate': page['total_estimate'],
+            'total_estimate_source': page['total_estimate_source']
         }), 200
         
     except Exception as e:
@@ -129,20 +211,23 @@ def search_labs():
 def recommend_labs():
     """
     Get ranked lab recommendations based on multiple criteria.
+    Scored in memory by the capability matrix of the latest build (IDF-weighted);
+    until it is loaded, or with "engine": "sql", the summary views are queried.
     
     Request Body (JSON):
     {
         "test_name": "Voltage Test",
         "standard": "IEC 60068",
         "domain": "Electrical",
-        "limit": 20
+        "limit": 20,
+        "engine": "matrix"
     }
     """
     try:
         data = request.get_json() or {}
         
         test_name = data.get('test_name', '').strip()
-        standard = data.get('standard', '').strip()
+        standard = canonical_standard(data.get('standard', ''))
         domain = data.get('domain', '').strip()
         limit = int(data.get('limit', 20))
         
@@ -151,247 +236,190 @@ def recommend_labs():
                 'error': 'At least one search parameter is required'
             }), 400
         
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        # Build conditions
-        conditions = ["l.deleted_at IS NULL"]
-        params = []
-        
-        if test_name:
-            conditions.append("LOWER(t.test_name) LIKE LOWER(%s)")
-            params.append(f'%{test_name}%')
-        
-        if standard:
-            conditions.append("LOWER(s.standard_code) LIKE LOWER(%s)")
-            params.append(f'%{standard}%')
-        
-        if domain:
-            conditions.append("d.domain_name = %s")
-            params.append(domain)
-        
-        # Calculate scores
-        query = f"""
-            WITH lab_scores AS (
-                SELECT 
-                    l.lab_id,
-                    l.lab_name,
-                    COUNT(DISTINCT lc.test_id) AS matching_tests,
-                    COUNT(DISTINCT lc.standard_id) AS matching_standards,
-                    COUNT(DISTINCT lc.domain_id) AS matching_domains,
-                    COUNT(*) AS total_matches,
-                    array_agg(DISTINCT t.test_name) AS test_names,
-                    array_agg(DISTINCT s.standard_code) AS standard_codes
-                FROM labs l
-                JOIN lab_capabilities lc ON lc.lab_id = l.lab_id
-                JOIN tests t ON t.test_id = lc.test_id
-                JOIN standards s ON s.standard_id = lc.standard_id
-                JOIN domains d ON d.domain_id = lc.domain_id
-                WHERE {' AND '.join(conditions)}
-                GROUP BY l.lab_id, l.lab_name
-            )
-            SELECT 
-                lab_id,
-                lab_name,
-                matching_tests,
-                matching_standards,
-                matching_domains,
-                total_matches,
-                test_names[1:5] AS sample_tests,
-                standard_codes[1:5] AS sample_standards,
-                (matching_tests * 10 + matching_standards * 5 + matching_domains * 1) AS relevance_score
-            FROM lab_scores
-            WHERE total_matches > 0
-            ORDER BY relevance_score DESC, matching_tests DESC, matching_standards DESC
-            LIMIT %s
-        """
-        params.append(limit)
-        
-        cur.execute(query, params)
-        results = cur.fetchall()
-        
-        cur.close()
-        conn.close()
+        result = QUERIES.recommend(test_name, standard, domain, limit, data.get('engine', 'matrix'))
+        return jsonify({'count': len(result['results']), **result}), 200
         
-        return jsonify({
-            'count': len(results),
-            'results': [dict(row) for row in results]
-        }), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/labs/recommend/batch', methods=['POST'])
+def recommend_labs_batch():
+    """
+    Recommend labs for a whole requirement list (e.g. every test of a TRF).
+    Labs are ranked by how many requirements they cover; "cover" is a small set
+    of labs that together covers every requirement any lab can do.
+    
+    Request Body (JSON):
+    {
+        "requirements": [
+            {"test_name": "Insulation Resistance", "standard": "IS 302"},
+            {"test_name": "Salt Spray"},
+            "Dielectric Strength"
+        ],
+        "limit": 20
+    }
+    """
+    try:
+        data = request.get_json() or {}
+        items = data.get('requirements')
+        limit = int(data.get('limit', 20))
+        
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'requirements must be a non-empty list'}), 400
+        if len(items) > MAX_REQUIREMENTS:
+            return jsonify({'error': f'At most {MAX_REQUIREMENTS} requirements per request'}), 400
+        
+        requirements = []
+        for index, item in enumerate(items):
+            if isinstance(item, str):
+                item = {'test_name': item}
+            if not isinstance(item, dict):
+                return jsonify({'error': f'Requirement {index} must be an object or a test name'}), 400
+            requirement = {
+                'test_name': (item.get('test_name') or '').strip(),
+                'standard': canonical_standard(item.get('standard') or ''),
+                'domain': (item.get('domain') or '').strip(),
+            }
+            if not any(requirement.values()):
+                return jsonify({
+                    'error': f'Requirement {index} needs a test_name, standard or domain'
+                }), 400
+            requirements.append(requirement)
+        
+        matrix = MATRIX_SERVICE.start().matrix
+        if matrix is None:
+            return jsonify({'error': 'Recommender is loading, retry shortly'}), 503
+        
+        result = matrix.cover(requirements, limit)
+        result['build_id'] = matrix.build_id
+        return jsonify(result), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/labs/<int:lab_id>', methods=['GET'])
+@cached_response
 def get_lab_details(lab_id):
-    """Get detailed information about a specific lab."""
+    """
+    Get detailed information about a specific lab.
+    
+    Query parameters:
+        view: "flat" (default) - one row per capability plus a domain summary
+              "grouped" - capabilities nested domain -> standard -> tests,
+              built in a single query (scripts/lab_details.py)
+    """
+    view = request.args.get('view', 'flat')
+    if view not in ('flat', 'grouped'):
+        return jsonify({'error': 'view must be "flat" or "grouped"'}), 400
+    
     try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        # Get lab info
-        cur.execute("""
-            SELECT lab_id, lab_name, created_at, updated_at
-            FROM labs
-            WHERE lab_id = %s AND deleted_at IS NULL
-        """, (lab_id,))
-        lab = cur.fetchone()
-        
-        if not lab:
+        if view == 'grouped':
+            detail = QUERIES.lab_detail_json(lab_id)
+            if detail is None:
+                return jsonify({'error': 'Lab not found'}), 404
+            response = make_response(detail, 200)
+            response.mimetype = 'application/json'
+            return response
+        
+        detail = QUERIES.lab_detail_flat(lab_id)
+        if detail is None:
             return jsonify({'error': 'Lab not found'}), 404
-        
-        # Get capabilities
-        cur.execute("""
-            SELECT 
-                t.test_name,
-                s.standard_code,
-                s.full_code,
-                s.standard_body,
-                d.domain_name
-            FROM lab_capabilities lc
-            JOIN tests t ON t.test_id = lc.test_id
-            JOIN standards s ON s.standard_id = lc.standard_id
-            JOIN domains d ON d.domain_id = lc.domain_id
-            WHERE lc.lab_id = %s
-            ORDER BY d.domain_name, t.test_name
-        """, (lab_id,))
-        capabilities = cur.fetchall()
-        
-        # Get domain summary
-        cur.execute("""
-            SELECT 
-                d.domain_name,
-                COUNT(*) AS capability_count
-            FROM lab_capabilities lc
-            JOIN domains d ON d.domain_id = lc.domain_id
-            WHERE lc.lab_id = %s
-            GROUP BY d.domain_id, d.domain_name
-            ORDER BY capability_count DESC
-        """, (lab_id,))
-        domain_summary = cur.fetchall()
-        
-        cur.close()
-        conn.close()
-        
-        return jsonify({
-            'lab': dict(lab),
-            'capabilities': [dict(c) for c in capabilities],
-            'domain_summary': [dict(d) for d in domain_summary],
-            'total_capabilities': len(capabilities)
-        }), 200
+        return jsonify(detail), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/domains', methods=['GET'])
+@cached_response
 def get_domains():
     """Get list of all available domains."""
     try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cur.execute("""
-            SELECT 
-                d.domain_id,
-                d.domain_name,
-                COUNT(*) AS total_capabilities,
-                COUNT(DISTINCT lc.lab_id) AS lab_count
-            FROM domains d
-            LEFT JOIN lab_capabilities lc ON lc.domain_id = d.domain_id
-            GROUP BY d.domain_id, d.domain_name
-            ORDER BY total_capabilities DESC
-        """)
-        domains = cur.fetchall()
-        
-        cur.close()
-        conn.close()
+        domains = QUERIES.domains()
         
         return jsonify({
             'count': len(domains),
-            'domains': [dict(d) for d in domains]
+            'domains': domains
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/stats', methods=['GET'])
+@cached_response
+def get_stats():
+    """
+    Database statistics of the latest build, read from its snapshot
+    (scripts/build_statistics.py), with deltas against the previous build.
+    
+    Query Parameters:
+    - history: Number of recent builds whose counts are listed (default: 10, max: 100, 0: none)
+    """
+    try:
+        history = int(request.args.get('history', DEFAULT_STATS_HISTORY))
+        if not 0 <= history <= MAX_STATS_HISTORY:
+            return jsonify({'error': f'history must be between 0 and {MAX_STATS_HISTORY}'}), 400
+        
+        return jsonify(QUERIES.statistics(history)), 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/tests/search', methods=['GET'])
+@cached_response
 def search_tests():
-    """Search for tests by name."""
+    """
+    Search for tests by name.
+    
+    mode=similarity ranks tests by pg_trgm word similarity to q (typo tolerant);
+    threshold sets the minimum similarity (default: 0.3).
+    """
     try:
         query = request.args.get('q', '').strip()
         limit = int(request.args.get('limit', 20))
+        try:
+            mode, threshold = get_search_mode(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         if not query:
             return jsonify({'error': 'Search query is required'}), 400
         
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cur.execute("""
-            SELECT DISTINCT
-                t.test_id,
-                t.test_name,
-                COUNT(DISTINCT lc.lab_id) AS lab_count
-            FROM tests t
-            JOIN lab_capabilities lc ON lc.test_id = t.test_id
-            JOIN labs l ON l.lab_id = lc.lab_id
-            WHERE LOWER(t.test_name) LIKE LOWER(%s)
-              AND l.deleted_at IS NULL
-            GROUP BY t.test_id, t.test_name
-            ORDER BY lab_count DESC, t.test_name
-            LIMIT %s
-        """, (f'%{query}%', limit))
-        
-        results = cur.fetchall()
-        
-        cur.close()
-        conn.close()
+        results = QUERIES.search_tests(query, limit, mode, threshold)
         
         return jsonify({
             'count': len(results),
-            'results': [dict(r) for r in results]
+            'results': results
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/standards/search', methods=['GET'])
+@cached_response
 def search_standards():
-    """Search for standards by code."""
+    """
+    Search for standards by code (the query is canonicalized, e.g. "iec60068" -> "IEC 60068").
+    Standards equivalent through config/standard_aliases.yaml are included.
+    
+    mode=similarity instead ranks standards by pg_trgm word similarity of q to
+    standard_code/full_code; threshold sets the minimum similarity (default: 0.3).
+    """
     try:
-        query = request.args.get('q', '').strip()
+        query = canonical_standard(request.args.get('q', ''))
         limit = int(request.args.get('limit', 20))
+        try:
+            mode, threshold = get_search_mode(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
         if not query:
             return jsonify({'error': 'Search query is required'}), 400
         
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cur.execute("""
-            SELECT DISTINCT
-                s.standard_id,
-                s.standard_code,
-                s.full_code,
-                s.standard_body,
-                COUNT(DISTINCT lc.lab_id) AS lab_count
-            FROM standards s
-            JOIN lab_capabilities lc ON lc.standard_id = s.standard_id
-            JOIN labs l ON l.lab_id = lc.lab_id
-            WHERE LOWER(s.standard_code) LIKE LOWER(%s)
-              AND l.deleted_at IS NULL
-            GROUP BY s.standard_id, s.standard_code, s.full_code, s.standard_body
-            ORDER BY lab_count DESC, s.standard_code
-            LIMIT %s
-        """, (f'%{query}%', limit))
-        
-        results = cur.fetchall()
-        
-        cur.close()
-        conn.close()
+        results = QUERIES.search_standards(query, limit, mode, threshold)
         
         return jsonify({
             'count': len(results),
-            'results': [dict(r) for r in results]
+            'results': results
         }), 200
         
     except Exception as e:
@@ -405,12 +433,14 @@ if __name__ == '__main__':
     print("API will be available at: http://localhost:5000")
     print("\nAvailable endpoints:")
     print("  GET  /api/health - Health check")
-    print("  GET  /api/labs/search?test_name=...&standard=...&domain=...")
+    print("  GET  /api/labs/search?test_name=...&standard=...&lab_name=...&domain=...&mode=like|similarity")
     print("  POST /api/labs/recommend - Get ranked recommendations")
-    print("  GET  /api/labs/<lab_id> - Get lab details")
+    print("  POST /api/labs/recommend/batch - Rank labs by coverage of a requirement list")
+    print("  GET  /api/labs/<lab_id> - Get lab details (view=grouped: nested by domain/standard)")
     print("  GET  /api/domains - List all domains")
-    print("  GET  /api/tests/search?q=... - Search tests")
-    print("  GET  /api/standards/search?q=... - Search standards")
+    print("  GET  /api/stats?history=10 - Database statistics of the latest build")
+    print("  GET  /api/tests/search?q=...&mode=like|similarity&threshold=0.3 - Search tests")
+    print("  GET  /api/standards/search?q=...&mode=like|similarity&threshold=0.3 - Search standards")
     print("\n" + "=" * 80)
     app.run(debug=True, host='0.0.0.0', port=5000)
 
@@ -0,0 +1,296 @@
+"""
+Trigram search benchmark
+Builds a synthetic database with 1M+ capability rows (schema.sql + indexes.sql
++ trigram.sql), then runs the API search queries under EXPLAIN (ANALYZE, BUFFERS):
+- LIKE '%term%' with the pg_trgm GIN indexes
+- the same LIKE with the trigram index dropped (inside a rolled back transaction)
+- similarity mode (word_similarity / <% operator)
+
+Without pg_trgm on the server only the LIKE queries run, without trigram indexes
+(the plans search serves when db/trigram.sql was skipped).
+
+Usage:
+    python db/benchmark_trigram_search.py --capabilities 1200000
+    python db/benchmark_trigram_search.py --dbname lab_reco_bench --show-plans
+"""
+
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+import psycopg2
+
+from setup_database import DB_CONFIG, create_database, pg_trgm_available, run_sql_file
+
+BENCH_DATABASE = 'lab_reco_bench'
+
+WORDS = [
+    'insulation', 'resistance', 'voltage', 'withstand', 'temperature', 'rise', 'humidity',
+    'damp', 'heat', 'cold', 'salt', 'spray', 'vibration', 'shock', 'impulse', 'partial',
+    'discharge', 'tensile', 'strength', 'elongation', 'flame', 'glow', 'wire', 'leakage',
+    'current', 'earth', 'continuity', 'dielectric', 'dimension', 'thickness', 'marking',
+    'endurance', 'ageing', 'protection', 'emission', 'immunity', 'surge', 'radiated',
+    'conducted', 'bending', 'abrasion', 'torque', 'mass', 'power', 'factor', 'efficiency',
+]
+BODIES = ['IEC', 'IS', 'ISO', 'CISPR', 'ASTM', 'EN']
+
+# (label, index dropped for the baseline, SQL, params) - mirrors api/recommendation_api.py
+QUERIES = [
+    (
+        "tests LIKE",
+        "idx_tests_name_trgm",
+        """
+        SELECT t.test_id, t.test_name, COUNT(DISTINCT lc.lab_id) AS lab_count
+        FROM tests t
+        JOIN lab_capabilities lc ON lc.test_id = t.test_id
+        JOIN labs l ON l.lab_id = lc.lab_id
+        WHERE LOWER(t.test_name) LIKE LOWER(%s) AND l.deleted_at IS NULL
+        GROUP BY t.test_id, t.test_name
+        ORDER BY lab_count DESC, t.test_name
+        LIMIT 20
+        """,
+        ('%dielectric strength%',),
+    ),
+    (
+        "tests similarity",
+        None,
+        """
+        WITH matches AS (
+            SELECT t.test_id, t.test_name, word_similarity(LOWER(%s), LOWER(t.test_name)) AS similarity
+            FROM tests t
+            WHERE LOWER(%s) <%% LOWER(t.test_name)
+        )
+        SELECT m.test_id, m.test_name, m.similarity, COUNT(DISTINCT lc.lab_id) AS lab_count
+        FROM matches m
+        JOIN lab_capabilities lc ON lc.test_id = m.test_id
+        JOIN labs l ON l.lab_id = lc.lab_id
+        WHERE l.deleted_at IS NULL
+        GROUP BY m.test_id, m.test_name, m.similarity
+        ORDER BY m.similarity DESC, lab_count DESC, m.test_name
+        LIMIT 20
+        """,
+        ('dielectrc strenght', 'dielectrc strenght'),
+    ),
+    (
+        "standards LIKE",
+        "idx_standards_code_trgm",
+        """
+        SELECT s.standard_id, s.standard_code, COUNT(DISTINCT lc.lab_id) AS lab_count
+        FROM standards s
+        JOIN lab_capabilities lc ON lc.standard_id = s.standard_id
+        JOIN labs l ON l.lab_id = lc.lab_id
+        WHERE LOWER(s.standard_code) LIKE LOWER(%s) AND l.deleted_at IS NULL
+        GROUP BY s.standard_id, s.standard_code
+        ORDER BY lab_count DESC, s.standard_code
+        LIMIT 20
+        """,
+        ('%60068-8%',),
+    ),
+    (
+        "labs LIKE",
+        "idx_labs_name_trgm",
+        """
+        SELECT l.lab_id, l.lab_name
+        FROM labs l
+        WHERE LOWER(l.lab_name) LIKE LOWER(%s) AND l.deleted_at IS NULL
+        ORDER BY l.lab_name
+        LIMIT 50
+        """,
+        ('%surge test%',),
+    ),
+]
+
+
+def connect(args):
+    return psycopg2.connect(
+        host=args.host, port=args.port, user=args.user,
+        password=args.password, database=args.dbname
+    )
+
+
+def populate(conn, args):
+    """Generate synthetic labs/tests/standards/capabilities if the database is empty."""
+    cur = conn.cursor()
+    cur.execute("SELECT COUNT(*) FROM lab_capabilities")
+    existing = cur.fetchone()[0]
+    if existing >= args.capabilities:
+        print(f"✓ Reusing {existing:,} capability rows")
+        cur.close()
+        return
+
+    started = time.perf_counter()
+    cur.execute(
+        "INSERT INTO domains (domain_name) SELECT unnest(%s::text[]) ON CONFLICT DO NOTHING",
+        (['Chemical', 'EMC', 'Electrical', 'Environmental', 'High_Voltage', 'Mechanical', 'Safety', 'Thermal'],)
+    )
+    cur.execute(
+        """
+        INSERT INTO labs (lab_name)
+        SELECT format('%%s %%s TEST LABORATORY %%s',
+                      upper(w[1 + (g * 7) %% array_length(w, 1)]),
+                      upper(w[1 + (g * 13) %% array_length(w, 1)]), g)
+        FROM generate_series(1, %s) AS g, (SELECT %s::text[] AS w) AS v
+        """,
+        (args.labs, WORDS)
+    )
+    cur.execute(
+        """
+        INSERT INTO tests (test_name, family_id)
+        SELECT format('%%s %%s %%s test %%s',
+                      initcap(w[1 + floor(random() * array_length(w, 1))::int]),
+                      w[1 + floor(random() * array_length(w, 1))::int],
+                      w[1 + floor(random() * array_length(w, 1))::int], g),
+               NULL
+        FROM generate_series(1, %s) AS g, (SELECT %s::text[] AS w) AS v
+        """,
+        (args.tests, WORDS)
+    )
+    cur.execute(
+        """
+        INSERT INTO standards (standard_body, standard_code, year, full_code)
+        SELECT body,
+               format('%%s %%s-%%s-%%s', body, 60000 + g %% 3000, g %% 10, g %% 90),
+               (1980 + g %% 45)::text,
+               format('%%s %%s-%%s-%%s:%%s (rev %%s)', body, 60000 + g %% 3000, g %% 10, g %% 90, 1980 + g %% 45, g)
+        FROM (
+            SELECT g, (%s::text[])[1 + g %% %s] AS body FROM generate_series(1, %s) AS g
+        ) AS v
+        """,
+        (BODIES, len(BODIES), args.standards)
+    )
+    cur.execute(
+        """
+        INSERT INTO lab_capabilities (lab_id, domain_id, test_id, standard_id)
+        SELECT l.min_id + floor(random() * l.n)::int,
+               d.min_id + floor(random() * d.n)::int,
+               t.min_id + floor(random() * t.n)::int,
+               s.min_id + floor(random() * s.n)::int
+        FROM generate_series(1, %s) AS g,
+             (SELECT MIN(lab_id) AS min_id, COUNT(*) AS n FROM labs) AS l,
+             (SELECT MIN(domain_id) AS min_id, COUNT(*) AS n FROM domains) AS d,
+             (SELECT MIN(test_id) AS min_id, COUNT(*) AS n FROM tests) AS t,
+             (SELECT MIN(standard_id) AS min_id, COUNT(*) AS n FROM standards) AS s
+        ON CONFLICT DO NOTHING
+        """,
+        (int(args.capabilities * 1.02),)
+    )
+    conn.commit()
+
+    cur.execute("ANALYZE")
+    cur.execute("SELECT COUNT(*) FROM lab_capabilities")
+    print(f"✓ Generated {cur.fetchone()[0]:,} capability rows in {time.perf_counter() - started:.1f}s")
+    cur.close()
+
+
+def explain(cur, sql, params, repeat):
+    """Run EXPLAIN ANALYZE repeat times; returns (plan lines of the last run, median execution ms)."""
+    timings = []
+    plan = []
+    for _ in range(repeat):
+        cur.execute("EXPLAIN (ANALYZE, BUFFERS) " + sql, params)
+        plan = [row[0] for row in cur.fetchall()]
+        for line in plan:
+            if line.startswith("Execution Time:"):
+                timings.append(float(line.split()[2]))
+    return plan, statistics.median(timings)
+
+
+def scan_nodes(plan):
+    """Scan nodes of a plan, e.g. 'Bitmap Index Scan on idx_tests_name_trgm'."""
+    nodes = []
+    for line in plan:
+        text = line.strip().lstrip("-> ").strip()
+        if "Scan" in text and " on " in text:
+            nodes.append(text.split("  (")[0])
+    return nodes
+
+
+def run_benchmark(conn, args, trigram=True):
+    cur = conn.cursor()
+    if trigram:
+        cur.execute("SELECT set_config('pg_trgm.word_similarity_threshold', %s, false)", (str(args.threshold),))
+    results = []
+
+    for label, index_name, sql, params in QUERIES:
+        if not trigram:
+            if not index_name:
+                print(f"\n{label}: skipped (needs pg_trgm)")
+                continue
+            variants = [("no trigram index", False)]
+        else:
+            variants = [("trigram index", False)]
+            if index_name:
+                variants.append(("no trigram index", True))
+
+        for variant, drop_index in variants:
+            if drop_index:
+                # Baseline: drop the index in a transaction that is rolled back afterwards
+                cur.execute(f"DROP INDEX {index_name}")
+            plan, median_ms = explain(cur, sql, params, args.repeat)
+            conn.rollback() if drop_index else conn.commit()
+
+            results.append((label, variant, median_ms))
+            print(f"\n{label} ({variant}): {median_ms:.2f} ms median")
+            for node in scan_nodes(plan):
+                print(f"    {node}")
+            if args.show_plans:
+                print("\n".join("      " + line for line in plan))
+
+    cur.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN benchmark for pg_trgm search")
+    parser.add_argument("--dbname", default=BENCH_DATABASE)
+    parser.add_argument("--host", default=DB_CONFIG['host'])
+    parser.add_argument("--port", type=int, default=DB_CONFIG['port'])
+    parser.add_argument("--user", default=DB_CONFIG['user'])
+    parser.add_argument("--password", default=DB_CONFIG['password'])
+    parser.add_argument("--capabilities", type=int, default=1200000)
+    parser.add_argument("--labs", type=int, default=5000)
+    parser.add_argument("--tests", type=int, default=200000)
+    parser.add_argument("--standards", type=int, default=60000)
+    parser.add_argument("--threshold", type=float, default=0.3)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--show-plans", action="store_true", help="print full EXPLAIN output")
+    args = parser.parse_args()
+
+    config = {'host': args.host, 'port': args.port, 'user': args.user, 'password': args.password}
+    if not create_database(config, args.dbname):
+        return
+
+    conn = connect(args)
+    trigram = pg_trgm_available(conn)
+    if not trigram:
+        print("⚠ pg_trgm is not available on this server (install postgresql-contrib)")
+        print("  Running the LIKE queries without trigram indexes only")
+    cur = conn.cursor()
+    cur.execute("SELECT to_regclass('lab_capabilities')")
+    has_schema = cur.fetchone()[0] is not None
+    cur.close()
+
+    db_dir = Path(__file__).parent
+    if not has_schema and not run_sql_file(conn, db_dir / 'schema.sql'):
+        conn.close()
+        return
+    if not run_sql_file(conn, db_dir / 'indexes.sql'):
+        conn.close()
+        return
+    if trigram and not run_sql_file(conn, db_dir / 'trigram.sql'):
+        conn.close()
+        return
+
+    populate(conn, args)
+    results = run_benchmark(conn, args, trigram)
+    conn.close()
+
+    print("\n" + "=" * 60)
+    print(f"{'query':<20} {'variant':<20} {'median ms':>12}")
+    for label, variant, median_ms in results:
+        print(f"{label:<20} {variant:<20} {median_ms:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
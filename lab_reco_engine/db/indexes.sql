@@ -100,6 +100,11 @@ ON standards(LOWER(standard_code));
 CREATE INDEX IF NOT EXISTS idx_standards_full_code_lower
 ON standards(LOWER(full_code));
 
+-- Standard Equivalence: All standards of an alias class
+CREATE INDEX IF NOT EXISTS idx_standard_equivalence_class_key
+ON standard_equivalence(class_key)
+INCLUDE (standard_id);
+
 -- Domains: Name lookup (case-insensitive)
 CREATE INDEX IF NOT EXISTS idx_domains_name_lower
 ON domains(LOWER(domain_name));
@@ -164,22 +169,6 @@ WHERE deleted_at IS NULL;
 -- JOIN labs l ON l.lab_id = lc.lab_id
 -- WHERE l.deleted_at IS NULL;
 
--- ============================================================================
--- FULL TEXT SEARCH (Optional but recommended for search features)
--- ============================================================================
-
--- GIN indexes for full-text search on test names and standards
--- Uncomment if you need advanced text search capabilities
-
--- CREATE INDEX IF NOT EXISTS idx_tests_name_gin
--- ON tests USING gin(to_tsvector('english', test_name));
-
--- CREATE INDEX IF NOT EXISTS idx_standards_full_code_gin
--- ON standards USING gin(to_tsvector('english', full_code));
-
--- CREATE INDEX IF NOT EXISTS idx_labs_name_gin
--- ON labs USING gin(to_tsvector('english', lab_name));
-
 -- ============================================================================
 -- UNIQUE INDEXES NOTE
 -- ============================================================================
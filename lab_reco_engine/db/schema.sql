@@ -135,6 +135,39 @@ CREATE TABLE lab_domain_confidence (
     CONSTRAINT chk_confidence_range CHECK (confidence >= 0.00 AND confidence <= 1.00)
 );
 
+-- ============================================================================
+-- STANDARD EQUIVALENCE (ALIAS CLASSES)
+-- ============================================================================
+
+-- Standard Equivalence: Alias class of every standard (config/standard_aliases.yaml)
+-- Rebuilt by the capability build stage (refresh_standard_equivalence)
+CREATE TABLE IF NOT EXISTS standard_equivalence (
+    standard_id INT PRIMARY KEY REFERENCES standards(standard_id) ON DELETE CASCADE ON UPDATE CASCADE,
+    class_key TEXT NOT NULL,  -- Canonical code of the alias class
+    
+    CONSTRAINT chk_standard_equivalence_class_not_empty CHECK (LENGTH(TRIM(class_key)) > 0)
+);
+
+-- ============================================================================
+-- BUILD VERSIONS
+-- ============================================================================
+
+-- Build Versions: One row per published pipeline build (refresh_summaries)
+-- API processes poll the latest build_id to reload their in-memory data
+CREATE TABLE IF NOT EXISTS build_versions (
+    build_id BIGSERIAL PRIMARY KEY,
+    capability_count INT NOT NULL,  -- Active capabilities in the build
+    published_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
+
+-- Build Statistics: Counts, domain distribution, top labs and standard bodies
+-- of each build (scripts/build_statistics.py), written with its build_versions row
+CREATE TABLE IF NOT EXISTS build_statistics (
+    build_id BIGINT PRIMARY KEY REFERENCES build_versions(build_id) ON DELETE CASCADE,
+    statistics JSONB NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP NOT NULL
+);
+
 -- ============================================================================
 -- AUDIT TRIGGERS (Auto-update updated_at)
 -- ============================================================================
@@ -196,6 +229,9 @@ COMMENT ON TABLE standards IS 'Test standards (IEC, IS, ISO, CISPR, etc.)';
 COMMENT ON TABLE labs IS 'Testing laboratories';
 COMMENT ON TABLE lab_capabilities IS 'Junction table: Which labs can perform which tests under which standards';
 COMMENT ON TABLE lab_domain_confidence IS 'Confidence scores for lab-domain relationships';
+COMMENT ON TABLE standard_equivalence IS 'Alias class (canonical code) of each standard, from standard_aliases.yaml';
+COMMENT ON TABLE build_versions IS 'Published pipeline builds; the API reloads its capability matrices on a new build_id';
+COMMENT ON TABLE build_statistics IS 'Statistics snapshot of each published build, for /api/stats and the UI statistics page';
 
 COMMENT ON COLUMN labs.deleted_at IS 'Soft delete timestamp. NULL = active, NOT NULL = deleted';
 COMMENT ON COLUMN lab_domain_confidence.confidence IS 'Confidence score between 0.00 and 1.00';
@@ -1,6 +1,6 @@
 """
 Automated Database Setup Script
-Creates database and runs schema + indexes
+Creates database and runs schema + indexes (+ optional trigram indexes) + summary views
 """
 
 import psycopg2
@@ -90,6 +90,14 @@ def run_sql_file(conn, filepath):
         conn.rollback()
         return False
 
+def pg_trgm_available(conn):
+    """Whether the server can install the pg_trgm extension."""
+    cur = conn.cursor()
+    cur.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+    available = cur.fetchone() is not None
+    cur.close()
+    return available
+
 def setup_schema(config, db_name):
     """Run schema and indexes."""
     try:
@@ -128,6 +136,26 @@ def setup_schema(config, db_name):
             conn.close()
             return False
         
+        # Run trigram search indexes (optional: needs pg_trgm)
+        trigram_file = db_dir / 'trigram.sql'
+        print(f"\nRunning trigram indexes from: {trigram_file}")
+        if not pg_trgm_available(conn):
+            print("⚠ pg_trgm is not available on this server (install postgresql-contrib)")
+            print("  Skipping trigram indexes: search serves mode=like only")
+        elif not run_sql_file(conn, trigram_file):
+            print("⚠ Trigram indexes not created: search serves mode=like only")
+        
+        # Run summary views (refreshed by the pipeline)
+        summaries_file = db_dir / 'summaries.sql'
+        if not summaries_file.exists():
+            print(f"✗ Summaries file not found: {summaries_file}")
+            return False
+        
+        print(f"\nRunning summary views from: {summaries_file}")
+        if not run_sql_file(conn, summaries_file):
+            conn.close()
+            return False
+        
         conn.close()
         return True
         
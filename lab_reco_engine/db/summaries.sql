@@ -0,0 +1,140 @@
+-- ============================================================================
+-- Lab Recommendation Engine - Summary Layer
+-- PostgreSQL 14+
+-- ============================================================================
+
+-- Pre-aggregated, denormalized views of the capability graph for the API.
+-- Only active labs (deleted_at IS NULL) are included.
+--
+-- Refreshed by the capability build stage (refresh_summaries() at the end of
+-- run_capabilities), or on demand without blocking readers:
+--   python -m scripts.build_capabilities --refresh-summaries --concurrently
+--
+-- Every view has a unique index, which REFRESH ... CONCURRENTLY requires.
+-- The file is idempotent and runs on every refresh, so new indexes reach
+-- existing databases.
+
+-- ============================================================================
+-- CAPABILITY SEARCH (DENORMALIZED)
+-- ============================================================================
+
+-- One row per active capability with lab, domain, test and standard names,
+-- so filtered recommendations aggregate without joining five tables
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_capability_search AS
+SELECT
+    lc.lab_id,
+    l.lab_name,
+    lc.domain_id,
+    d.domain_name,
+    lc.test_id,
+    t.test_name,
+    lc.standard_id,
+    s.standard_code,
+    s.full_code
+FROM lab_capabilities lc
+JOIN labs l ON l.lab_id = lc.lab_id
+JOIN domains d ON d.domain_id = lc.domain_id
+JOIN tests t ON t.test_id = lc.test_id
+JOIN standards s ON s.standard_id = lc.standard_id
+WHERE l.deleted_at IS NULL;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_capability_search_pk
+ON mv_capability_search(lab_id, test_id, standard_id);
+
+CREATE INDEX IF NOT EXISTS idx_mv_capability_search_test
+ON mv_capability_search(test_id);
+
+CREATE INDEX IF NOT EXISTS idx_mv_capability_search_standard
+ON mv_capability_search(standard_id);
+
+-- Keyset pagination of /api/labs/search (scripts/lab_search.py): rows in
+-- (lab_name, test_name, lab_id) order, made unique by (test_id, standard_id)
+CREATE INDEX IF NOT EXISTS idx_mv_capability_search_keyset
+ON mv_capability_search(lab_name, test_name, lab_id, test_id, standard_id);
+
+-- Same order within a domain (also serves domain filters of recommendations)
+CREATE INDEX IF NOT EXISTS idx_mv_capability_search_domain_keyset
+ON mv_capability_search(domain_name, lab_name, test_name, lab_id, test_id, standard_id);
+
+-- Replaced by idx_mv_capability_search_domain_keyset
+DROP INDEX IF EXISTS idx_mv_capability_search_domain;
+
+-- ============================================================================
+-- PER-LAB AGGREGATES
+-- ============================================================================
+
+-- Lab Domain Summary: counts and sorted name lists per (lab, domain)
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_lab_domain_summary AS
+SELECT
+    lc.lab_id,
+    l.lab_name,
+    lc.domain_id,
+    d.domain_name,
+    COUNT(*) AS capability_count,
+    COUNT(DISTINCT lc.test_id) AS test_count,
+    COUNT(DISTINCT lc.standard_id) AS standard_count,
+    array_agg(DISTINCT t.test_name) AS test_names,
+    array_agg(DISTINCT s.standard_code) AS standard_codes
+FROM lab_capabilities lc
+JOIN labs l ON l.lab_id = lc.lab_id
+JOIN domains d ON d.domain_id = lc.domain_id
+JOIN tests t ON t.test_id = lc.test_id
+JOIN standards s ON s.standard_id = lc.standard_id
+WHERE l.deleted_at IS NULL
+GROUP BY lc.lab_id, l.lab_name, lc.domain_id, d.domain_name;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_lab_domain_summary_pk
+ON mv_lab_domain_summary(lab_id, domain_id);
+
+-- Domain-only recommendations: read one domain's labs already in ranking order
+CREATE INDEX IF NOT EXISTS idx_mv_lab_domain_summary_rank
+ON mv_lab_domain_summary(domain_name, (test_count * 10 + standard_count * 5) DESC, test_count DESC, standard_count DESC);
+
+-- ============================================================================
+-- PER-DOMAIN AND PER-STANDARD AGGREGATES
+-- ============================================================================
+
+-- Domain Summary: every domain, including domains without active capabilities
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_domain_summary AS
+SELECT
+    d.domain_id,
+    d.domain_name,
+    COUNT(lc.lab_id) AS total_capabilities,
+    COUNT(DISTINCT lc.lab_id) AS lab_count,
+    COUNT(DISTINCT lc.test_id) AS test_count,
+    COUNT(DISTINCT lc.standard_id) AS standard_count
+FROM domains d
+LEFT JOIN (
+    SELECT lc.*
+    FROM lab_capabilities lc
+    JOIN labs l ON l.lab_id = lc.lab_id
+    WHERE l.deleted_at IS NULL
+) lc ON lc.domain_id = d.domain_id
+GROUP BY d.domain_id, d.domain_name;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_domain_summary_pk
+ON mv_domain_summary(domain_id);
+
+-- Standard Summary: labs and tests per standard (standards with active capabilities)
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_standard_summary AS
+SELECT
+    lc.standard_id,
+    COUNT(DISTINCT lc.lab_id) AS lab_count,
+    COUNT(DISTINCT lc.test_id) AS test_count,
+    COUNT(*) AS capability_count
+FROM lab_capabilities lc
+JOIN labs l ON l.lab_id = lc.lab_id
+WHERE l.deleted_at IS NULL
+GROUP BY lc.standard_id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_standard_summary_pk
+ON mv_standard_summary(standard_id);
+
+-- ============================================================================
+-- COMMENTS FOR DOCUMENTATION
+-- ============================================================================
+
+COMMENT ON MATERIALIZED VIEW mv_capability_search IS 'Denormalized active capabilities (lab, domain, test and standard names)';
+COMMENT ON MATERIALIZED VIEW mv_lab_domain_summary IS 'Capability counts and sorted test/standard names per lab and domain';
+COMMENT ON MATERIALIZED VIEW mv_domain_summary IS 'Capability, lab, test and standard counts per domain';
+COMMENT ON MATERIALIZED VIEW mv_standard_summary IS 'Lab, test and capability counts per standard';
@@ -0,0 +1,26 @@
+-- ============================================================================
+-- TRIGRAM SEARCH (pg_trgm) - OPTIONAL
+-- ============================================================================
+-- Needs the pg_trgm extension (postgresql-contrib). setup_database.py runs this
+-- file after indexes.sql and skips it with a warning when the extension is not
+-- available; search then serves mode=like only, without these indexes.
+--
+-- Trigram GIN indexes serve LOWER(col) LIKE LOWER('%term%') filters (a leading
+-- wildcard cannot use the btree indexes in indexes.sql) and the similarity
+-- search mode of the API (word_similarity / <% operator).
+-- Benchmark: python db/benchmark_trigram_search.py
+-- ============================================================================
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_tests_name_trgm
+ON tests USING gin (LOWER(test_name) gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_standards_code_trgm
+ON standards USING gin (LOWER(standard_code) gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_standards_full_code_trgm
+ON standards USING gin (LOWER(full_code) gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_labs_name_trgm
+ON labs USING gin (LOWER(lab_name) gin_trgm_ops);
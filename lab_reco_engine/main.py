@@ -1,9 +1,10 @@
-from scripts.profile_labs import run_profile_labs
-from scripts.normalize_rows import run_normalization
-from scripts.build_capabilities import run_capabilities, run_cleanup, run_validation
+import argparse
 
+from scripts.main import run_pipeline
+from scripts.build_capabilities import run_cleanup, run_validation
 
-def main():
+
+def main(full=False):
     print("Pipeline started")
     
     # Check if database has existing data
@@ -17,29 +18,27 @@ def main():
     
     # Run cleanup only if there's existing data
     if has_data:
-    print("\n" + "="*60)
-    print("PHASE 1: Database Cleanup")
-    print("="*60)
-    run_cleanup()
-    
-    # Run validation to verify cleanup
-    print("\n" + "="*60)
-    print("PHASE 2: Validation")
-    print("="*60)
-    run_validation()
+        print("\n" + "="*60)
+        print("PHASE 1: Database Cleanup")
+        print("="*60)
+        run_cleanup()
+        
+        # Run validation to verify cleanup
+        print("\n" + "="*60)
+        print("PHASE 2: Validation")
+        print("="*60)
+        run_validation()
     else:
         print("\n" + "="*60)
         print("PHASE 1: Fresh Database - Skipping Cleanup")
         print("="*60)
         print("No existing data found. Starting fresh ingestion...")
     
-    # Run normal pipeline
+    # Run normal pipeline (incremental unless --full)
     print("\n" + "="*60)
     print("PHASE 3: Data Pipeline")
     print("="*60)
-    run_profile_labs()
-    run_normalization()
-    run_capabilities()
+    run_pipeline(full=full)
     
     # Final validation
     print("\n" + "="*60)
@@ -51,4 +50,9 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Run cleanup, the data pipeline and validation")
+    parser.add_argument(
+        "--full", action="store_true",
+        help="ignore data/manifest.json and reprocess every raw CSV"
+    )
+    main(full=parser.parse_args().full)
@@ -0,0 +1,130 @@
+"""
+Golden-output check and throughput benchmark for domain inference.
+
+Runs infer_domain_legacy and the compiled classifier over every (test, standard)
+pair in the raw lab CSVs plus a set of edge cases, fails on any difference in
+label or confidence, and reports pairs/sec for:
+- legacy row-at-a-time inference
+- compiled classifier with a cold memo (every distinct pair classified once)
+- compiled column classification as used by the capability build
+
+Usage (from lab_reco_engine/):
+    python -m scripts.benchmark_domain_inference --limit 200
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from .domain_inference import rules, STANDARD_DOMAIN_MAP, DOMAIN_KEYWORDS, infer_domain_legacy
+from .domain_classifier import DomainClassifier
+from .normalize_rows import normalize_columns
+
+EDGE_CASES = [
+    ("", "IEC 60335"),
+    ("Leakage current", ""),
+    (None, "IS 302"),
+    ("Leakage current", "   "),
+    ("   ", "IEC 60335-1"),
+    ("Water ingress", "IP65"),
+    ("Degree of protection ip67", "Customer spec"),
+    ("ip_65 check", "Customer spec"),
+    ("High voltage withstand", "IEC60060-1:2010"),
+    ("Partial discharge", "IS/IEC 60270"),
+    ("Mass", "ISO 8124-1"),
+    ("Relay operation", "ASTM D149"),
+    ("Ship shock", "MIL-STD-810"),
+    ("Pd test", "Customer spec"),
+    ("Cable_voltage", "ulxx"),
+    ("Température", "EN 60068-2-1"),
+    ("Flame test", "CISPR 14-1"),
+    (float("nan"), "IEC 61000-4-2"),
+    (1, 1.0),
+    (1.0, 1),
+    ("Random test", "Manufacturer's spec"),
+]
+
+
+def load_pairs(raw_dir, limit=None):
+    """(test, standard) string pairs as the capability build sees them."""
+    pairs = []
+    files = sorted(Path(raw_dir).glob("*.csv"))[:limit]
+    for file in files:
+        try:
+            df = pd.read_csv(file, header=None)
+            df.columns = df.iloc[1]
+            df = normalize_columns(df.iloc[2:].reset_index(drop=True))
+        except Exception:
+            continue
+        if "test_name" not in df.columns or "test_standard" not in df.columns:
+            continue
+        if not isinstance(df["test_name"], pd.Series) or not isinstance(df["test_standard"], pd.Series):
+            continue
+        for test, standard in zip(df["test_name"].map(str), df["test_standard"].map(str)):
+            test, standard = test.strip(), standard.strip()
+            if test and test.lower() != "nan" and standard and standard.lower() != "nan":
+                pairs.append((test, standard))
+    return pairs
+
+
+def timed(label, func, count):
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"  {label:<32} {elapsed:8.3f}s  {rate:>12,.0f} pairs/sec")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and benchmark the compiled domain classifier")
+    parser.add_argument("--raw-dir", default="data/raw_csvs")
+    parser.add_argument("--limit", type=int, default=None, help="only read the first N lab files")
+    args = parser.parse_args()
+
+    pairs = load_pairs(args.raw_dir, args.limit)
+    distinct = len(set(pairs))
+    print(f"Loaded {len(pairs)} pairs ({distinct} distinct) from {args.raw_dir}")
+
+    started = time.perf_counter()
+    classifier = DomainClassifier(rules, STANDARD_DOMAIN_MAP, DOMAIN_KEYWORDS)
+    print(f"  Classifier compiled in {time.perf_counter() - started:.4f}s")
+
+    # Golden check: every distinct pair plus the edge cases
+    mismatches = []
+    for test, standard in list(dict.fromkeys(pairs)) + EDGE_CASES:
+        expected = infer_domain_legacy(test, standard)
+        actual = classifier.classify(test, standard)
+        if expected != actual:
+            mismatches.append((test, standard, expected, actual))
+
+    if mismatches:
+        print(f"[ERROR] {len(mismatches)} pairs differ from infer_domain_legacy:")
+        for test, standard, expected, actual in mismatches[:20]:
+            print(f"  {test!r} / {standard!r}: legacy={expected} compiled={actual}")
+        sys.exit(1)
+    print(f"[OK] Compiled classifier matches legacy on {distinct + len(EDGE_CASES)} distinct inputs")
+
+    print("Throughput:")
+    tests = [pair[0] for pair in pairs]
+    standards = [pair[1] for pair in pairs]
+    legacy = timed("legacy infer_domain", lambda: [infer_domain_legacy(t, s) for t, s in pairs], len(pairs))
+
+    cold = DomainClassifier(rules, STANDARD_DOMAIN_MAP, DOMAIN_KEYWORDS)
+    column = timed("compiled classify_column (cold)", lambda: cold.classify_column(tests, standards), len(pairs))
+    timed("compiled classify_column (warm)", lambda: cold.classify_column(tests, standards), len(pairs))
+
+    uncached = DomainClassifier(rules, STANDARD_DOMAIN_MAP, DOMAIN_KEYWORDS)
+    timed("compiled, no memo", lambda: [uncached._classify(t, s) for t, s in pairs], len(pairs))
+
+    if legacy != column:
+        print("[ERROR] Column results differ from legacy")
+        sys.exit(1)
+    print(f"  Memo: {cold.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
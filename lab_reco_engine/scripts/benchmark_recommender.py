@@ -0,0 +1,171 @@
+"""
+Consistency check and latency benchmark for the in-memory recommender.
+
+Loads the capability matrix of the latest build and compares recommendations
+with the SQL aggregation over lab_capabilities: the same labs must be returned,
+with the same match counts and total_matches. Queries are single criteria (one
+test name, standard or domain) and their combinations, which must match on the
+same capability row. Then reports p50/p95 latency of both.
+
+Usage (from lab_reco_engine/):
+    python -m scripts.benchmark_recommender
+    python -m scripts.benchmark_recommender --test voltage --test "salt spray" --standard "IEC 60068"
+    python -m scripts.benchmark_recommender --test humidity --standard "IEC 60068" --domain Environmental
+"""
+
+import argparse
+import statistics
+import sys
+import time
+
+from .build_capabilities import get_db_connection
+from .entity_resolution import canonical_standard
+from .recommender import load_capability_matrix
+from .standard_aliases import get_alias_graph
+
+DEFAULT_TESTS = ["voltage", "insulation", "humidity", "salt spray", "vibration", "dielectric", "ip"]
+DEFAULT_STANDARDS = ["IEC 60068", "IS 302", "iec60068 2 1", "CISPR 22", "IS 2071", "ASTM"]
+# Domains combined with the test names and standards in multi-criterion queries
+DEFAULT_DOMAINS = ["Electrical", "Environmental"]
+
+SQL_RECOMMEND = """
+    SELECT
+        l.lab_id,
+        COUNT(DISTINCT lc.test_id) AS matching_tests,
+        COUNT(DISTINCT lc.standard_id) AS matching_standards,
+        COUNT(DISTINCT lc.domain_id) AS matching_domains,
+        COUNT(*) AS total_matches
+    FROM labs l
+    JOIN lab_capabilities lc ON lc.lab_id = l.lab_id
+    JOIN tests t ON t.test_id = lc.test_id
+    JOIN standards s ON s.standard_id = lc.standard_id
+    JOIN domains d ON d.domain_id = lc.domain_id
+    WHERE l.deleted_at IS NULL AND {condition}
+    GROUP BY l.lab_id
+"""
+
+CONDITIONS = {
+    "test_name": ("LOWER(t.test_name) LIKE LOWER(%s)", lambda value, graph: [f"%{value}%"]),
+    "standard": (
+        "(LOWER(s.standard_code) LIKE LOWER(%s) OR s.standard_id IN "
+        "(SELECT standard_id FROM standard_equivalence WHERE class_key = %s))",
+        lambda value, graph: [f"%{value}%", graph.class_key(value)],
+    ),
+    "domain": ("d.domain_name = %s", lambda value, graph: [value]),
+}
+
+FIELDS = ["matching_tests", "matching_standards", "matching_domains", "total_matches"]
+
+
+def compared_fields(query):
+    """
+    Fields that must equal the SQL result: the matrix only counts the tests
+    and standards a query asks for (all of them for a domain-only query).
+    """
+    domain_only = "test_name" not in query and "standard" not in query
+    fields = []
+    if "test_name" in query or domain_only:
+        fields.append("matching_tests")
+    if "standard" in query or domain_only:
+        fields.append("matching_standards")
+    return fields + ["matching_domains", "total_matches"]
+
+
+def describe(query):
+    return ", ".join(f"{criterion}={value!r}" for criterion, value in query.items())
+
+
+def percentiles(timings):
+    timings = sorted(timings)
+    return statistics.median(timings), timings[max(0, int(len(timings) * 0.95) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and benchmark the in-memory recommender")
+    parser.add_argument("--test", action="append", help="test name query (repeatable)")
+    parser.add_argument("--standard", action="append", help="standard query (repeatable)")
+    parser.add_argument("--domain", action="append", help="domain combined with the other queries (repeatable)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    graph = get_alias_graph()
+    conn = get_db_connection()
+
+    started = time.perf_counter()
+    matrix = load_capability_matrix(conn, graph)
+    stats = matrix.stats()
+    print(
+        f"Loaded build {stats['build_id']} in {time.perf_counter() - started:.2f}s: "
+        f"{stats['labs']} labs x {stats['tests']} tests / {stats['standards']} standards / "
+        f"{stats['domains']} domains ({stats['capabilities']} capabilities)"
+    )
+
+    tests = args.test or DEFAULT_TESTS
+    standards = [canonical_standard(value) for value in (args.standard or DEFAULT_STANDARDS)]
+    domains = [name for name in (args.domain or DEFAULT_DOMAINS) if name in matrix.domain_names]
+
+    queries = [{"test_name": value} for value in tests]
+    queries += [{"standard": value} for value in standards]
+    queries += [{"domain": name} for name in matrix.domain_names]
+    single = len(queries)
+    pairs = [{"test_name": test, "standard": standard} for test in tests for standard in standards]
+    queries += pairs
+    for domain in domains:
+        queries += [{"test_name": value, "domain": domain} for value in tests]
+        queries += [{"standard": value, "domain": domain} for value in standards]
+        queries += [{**pair, "domain": domain} for pair in pairs]
+
+    cur = conn.cursor()
+    mismatches = 0
+    sql_timings = []
+    for query in queries:
+        conditions = []
+        params = []
+        for criterion, value in query.items():
+            condition, condition_params = CONDITIONS[criterion]
+            conditions.append(condition)
+            params += condition_params(value, graph)
+        sql = SQL_RECOMMEND.format(condition=" AND ".join(conditions))
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            cur.execute(sql, params)
+            rows = cur.fetchall()
+            sql_timings.append((time.perf_counter() - started) * 1000)
+        expected = {row[0]: dict(zip(FIELDS, row[1:])) for row in rows}
+
+        actual = {result["lab_id"]: result for result in matrix.recommend(limit=stats["labs"], **query)}
+        if set(expected) != set(actual):
+            mismatches += 1
+            print(f"[ERROR] {describe(query)}: SQL returned {len(expected)} labs, matrix {len(actual)}")
+            continue
+        for lab_id, row in expected.items():
+            diff = [field for field in compared_fields(query) if row[field] != actual[lab_id][field]]
+            if diff:
+                mismatches += 1
+                print(f"[ERROR] {describe(query)}, lab {lab_id}: {diff} differ")
+                break
+    cur.close()
+    conn.close()
+
+    if mismatches:
+        sys.exit(1)
+    print(
+        f"[OK] Matrix matches SQL on {single} single-criterion and "
+        f"{len(queries) - single} multi-criterion queries"
+    )
+
+    matrix_timings = []
+    for _ in range(args.repeat):
+        for query in queries:
+            started = time.perf_counter()
+            matrix.recommend(limit=20, **query)
+            matrix_timings.append((time.perf_counter() - started) * 1000)
+
+    print("Latency (ms):")
+    for label, timings in (("SQL aggregation", sql_timings), ("matrix recommend", matrix_timings)):
+        p50, p95 = percentiles(timings)
+        print(f"  {label:<18} p50 {p50:8.3f}   p95 {p95:8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,10 @@
+import time
+from pathlib import Path
+
+# Cleaned dataset written by the normalization stage (scripts/cleaned_dataset.py)
+CLEANED_DIR = Path("data/cleaned")
+
+
 def get_db_connection():
     """Get database connection with shared credentials."""
     import psycopg2
@@ -189,43 +196,368 @@ def run_validation():
         conn.close()
 
 
-def run_capabilities():
-    print("Running capability building stage")
+def read_capability_rows(partition):
+    """
+    [(test, standard), ...] of one partition of the cleaned dataset, reading
+    only the test and standard columns. Rows with an empty test or standard
+    are dropped.
+    """
+    from .cleaned_dataset import read_values
 
-    import pandas as pd
-    from pathlib import Path
+    tests, standards = read_values(partition, ["test_name", "test_standard"])
 
-    from .domain_inference import infer_domain
-    from .entity_resolution import get_or_create, get_or_create_standard
+    rows = []
+    for test, standard in zip(tests, standards):
+        if test is None or standard is None:
+            continue
+        test = test.strip()
+        standard = standard.strip()
+
+        if not test or test.lower() == "nan":
+            continue
+        if not standard or standard.lower() == "nan":
+            continue
+
+        rows.append((test, standard))
+    return rows
+
+
+def _iter_lab_files(cleaned_dir, files=None):
+    """
+    Yield (source file name, lab_name, [(test, standard), ...]) for each
+    partition of the cleaned dataset (or only for the given partition
+    directories). lab_name is the lab the partition is loaded as: its own
+    name, or the canonical name it was merged into (data/lab_merges.json,
+    scripts/lab_resolution.py).
+    """
+    from .cleaned_dataset import iter_partitions, partition_metadata
+    from .lab_resolution import load_lab_merges
+
+    if files is None:
+        files = iter_partitions(cleaned_dir)
+    merges = load_lab_merges()
+
+    for partition in sorted(Path(f) for f in files):
+        info = partition_metadata(partition)
+        print(f"Processing: {info['source_file']}")
+
+        REQUIRED = {"test_name", "test_standard"}
+        if not REQUIRED.issubset(info["columns"]):
+            print(f"[ERROR] Missing columns in {info['source_file']}, skipping")
+            continue
+
+        lab_name = info["lab_name"].strip()
+        if lab_name in merges:
+            print(f"  Merged into lab: {merges[lab_name]}")
+            lab_name = merges[lab_name]
+
+        yield info["source_file"], lab_name, read_capability_rows(partition)
+
+
+def _report_throughput(rows, started):
+    elapsed = time.perf_counter() - started
+    rate = rows / elapsed if elapsed > 0 else 0.0
+    print(f"[OK] {rows} capability rows in {elapsed:.1f}s ({rate:,.0f} rows/sec)")
+
+
+def run_capabilities(mode="bulk", batch_size=50000, files=None):
+    """
+    Build lab capabilities from the cleaned dataset data/cleaned (or only from
+    the given partition directories).
+
+    mode="bulk" resolves dimensions per batch and COPYs capability rows
+    (see scripts/bulk_loader.py); mode="row" is the original row-by-row path.
+    Both report rows/sec. Returns {file_name: {"lab_name", "rows"}}.
+    """
+    print(f"Running capability building stage ({mode} mode)")
+
+    if mode == "row":
+        processed = _run_capabilities_rowwise(files)
+    elif mode == "bulk":
+        processed = _run_capabilities_bulk(batch_size, files)
+    else:
+        raise ValueError(f"Unknown capability build mode: {mode}")
+
+    refresh_standard_equivalence()
+    refresh_summaries()
+
+    print("[OK] Capability build completed")
+    return processed
+
+
+def reset_labs(lab_names):
+    """
+    Drop the capabilities of labs that are about to be reloaded from changed files,
+    and clear their soft delete. Labs are matched case-insensitively.
+    """
+    if not lab_names:
+        return
 
     conn = get_db_connection()
     cur = conn.cursor()
+    try:
+        keys = [name.lower() for name in lab_names]
+        cur.execute(
+            "SELECT lab_id FROM labs WHERE LOWER(lab_name) = ANY(%s)",
+            (keys,)
+        )
+        lab_ids = [row[0] for row in cur.fetchall()]
+        if lab_ids:
+            cur.execute("DELETE FROM lab_capabilities WHERE lab_id = ANY(%s)", (lab_ids,))
+            deleted = cur.rowcount
+            cur.execute(
+                "UPDATE labs SET deleted_at = NULL WHERE lab_id = ANY(%s) AND deleted_at IS NOT NULL",
+                (lab_ids,)
+            )
+            print(f"  Reset {len(lab_ids)} changed labs ({deleted} old capabilities removed)")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
 
-    cleaned_dir = Path("data/cleaned")
 
-    for file in cleaned_dir.glob("*.csv"):
-        print(f"Processing: {file.name}")
-        df = pd.read_csv(file)
+def retire_labs(lab_names):
+    """
+    Retire labs whose source CSV was removed, or that were merged into another
+    lab: delete their capabilities and domain confidence, and soft-delete the
+    lab row (labs.deleted_at). Returns the number of labs retired.
+    """
+    if not lab_names:
+        return 0
 
-        REQUIRED = {"test_name", "test_standard", "lab_name"}
-        if not REQUIRED.issubset(df.columns):
-            print(f"[ERROR] Missing columns in {file.name}, skipping")
-            continue
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        keys = [name.lower() for name in lab_names]
+        cur.execute(
+            "SELECT lab_id FROM labs WHERE LOWER(lab_name) = ANY(%s) AND deleted_at IS NULL",
+            (keys,)
+        )
+        lab_ids = [row[0] for row in cur.fetchall()]
+        if lab_ids:
+            cur.execute("DELETE FROM lab_capabilities WHERE lab_id = ANY(%s)", (lab_ids,))
+            deleted = cur.rowcount
+            cur.execute("DELETE FROM lab_domain_confidence WHERE lab_id = ANY(%s)", (lab_ids,))
+            cur.execute(
+                "UPDATE labs SET deleted_at = CURRENT_TIMESTAMP WHERE lab_id = ANY(%s)",
+                (lab_ids,)
+            )
+            print(f"[OK] Retired {len(lab_ids)} labs ({deleted} capabilities removed)")
+        conn.commit()
+        return len(lab_ids)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
 
-        lab_name = df["lab_name"].iloc[0].strip()
-        lab_id = get_or_create(cur, "labs", "lab_name", lab_name)
 
-        inserted = 0
+def retire_other_labs(lab_names):
+    """
+    Retire every active lab not in lab_names (matched case-insensitively), for
+    full rebuilds, which have no manifest to tell which files were removed.
+    Returns the number of labs retired.
+    """
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "SELECT lab_name FROM labs WHERE deleted_at IS NULL AND NOT (LOWER(lab_name) = ANY(%s))",
+            ([name.lower() for name in lab_names],)
+        )
+        others = [row[0] for row in cur.fetchall()]
+    finally:
+        cur.close()
+        conn.close()
+    return retire_labs(others)
 
-        for _, row in df.iterrows():
-            test = str(row["test_name"]).strip()
-            standard = str(row["test_standard"]).strip()
 
-            if not test or test.lower() == "nan":
-                continue
-            if not standard or standard.lower() == "nan":
-                continue
+def refresh_standard_equivalence():
+    """
+    Write each standard's alias class (scripts/standard_aliases.py) to
+    standard_equivalence, so equivalent standards are one indexed lookup away.
+    Only rows whose class changed are written.
+    """
+    from .standard_aliases import get_alias_graph
+
+    graph = get_alias_graph()
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS standard_equivalence (
+                standard_id INT PRIMARY KEY REFERENCES standards(standard_id) ON DELETE CASCADE ON UPDATE CASCADE,
+                class_key TEXT NOT NULL,
+                CONSTRAINT chk_standard_equivalence_class_not_empty CHECK (LENGTH(TRIM(class_key)) > 0)
+            )
+            """
+        )
+        cur.execute(
+            "CREATE INDEX IF NOT EXISTS idx_standard_equivalence_class_key "
+            "ON standard_equivalence(class_key) INCLUDE (standard_id)"
+        )
 
+        cur.execute("SELECT standard_id, standard_code FROM standards")
+        standard_ids = []
+        class_keys = []
+        for standard_id, standard_code in cur.fetchall():
+            class_key = graph.class_key(standard_code) or standard_code.strip().upper()
+            standard_ids.append(standard_id)
+            class_keys.append(class_key)
+
+        cur.execute(
+            """
+            INSERT INTO standard_equivalence (standard_id, class_key)
+            SELECT * FROM unnest(%s::int[], %s::text[])
+            ON CONFLICT (standard_id)
+            DO UPDATE SET class_key = EXCLUDED.class_key
+            WHERE standard_equivalence.class_key <> EXCLUDED.class_key
+            """,
+            (standard_ids, class_keys)
+        )
+        changed = cur.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+    stats = graph.stats()
+    print(
+        f"[OK] Standard equivalence refreshed: {len(standard_ids)} standards, "
+        f"{changed} changed ({stats['classes']} alias classes, largest {stats['largest_class']}, "
+        f"{stats['split_components']} chained components split)"
+    )
+
+
+SUMMARIES_SQL = Path(__file__).parent.parent / "db" / "summaries.sql"
+SUMMARY_VIEWS = [
+    "mv_capability_search",
+    "mv_lab_domain_summary",
+    "mv_domain_summary",
+    "mv_standard_summary",
+]
+
+
+def refresh_summaries(concurrently=False):
+    """
+    Refresh the summary materialized views (db/summaries.sql) the API reads,
+    then publish a new build version (build_versions) so API processes reload
+    their in-memory capability matrices, with its statistics snapshot
+    (build_statistics, scripts/build_statistics.py). The SQL file runs first (it
+    is idempotent): missing views are created and populated, missing indexes added.
+
+    concurrently=True rebuilds without blocking API reads (slower); a view
+    that was never populated is always refreshed normally.
+    """
+    from .build_statistics import write_snapshot
+
+    started = time.perf_counter()
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "SELECT matviewname, ispopulated FROM pg_matviews WHERE matviewname = ANY(%s)",
+            (SUMMARY_VIEWS,)
+        )
+        populated = dict(cur.fetchall())
+
+        cur.execute(SUMMARIES_SQL.read_text(encoding="utf-8"))
+        created = set(SUMMARY_VIEWS) - set(populated)
+        populated.update({view: True for view in created})
+
+        for view in SUMMARY_VIEWS:
+            if view not in created:
+                if concurrently and populated[view]:
+                    cur.execute(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}")
+                else:
+                    cur.execute(f"REFRESH MATERIALIZED VIEW {view}")
+            cur.execute(f"ANALYZE {view}")
+
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS build_versions (
+                build_id BIGSERIAL PRIMARY KEY,
+                capability_count INT NOT NULL,
+                published_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP NOT NULL
+            )
+            """
+        )
+        cur.execute(
+            "INSERT INTO build_versions (capability_count) "
+            "SELECT COUNT(*) FROM mv_capability_search RETURNING build_id"
+        )
+        build_id = cur.fetchone()[0]
+        write_snapshot(cur, build_id)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+    mode = " concurrently" if concurrently else ""
+    print(f"[OK] Summary views refreshed{mode} in {time.perf_counter() - started:.1f}s (build {build_id})")
+
+
+def _run_capabilities_bulk(batch_size, files=None):
+    from .domain_inference import infer_domains
+    from .bulk_loader import CapabilityBulkLoader
+
+    started = time.perf_counter()
+    conn = get_db_connection()
+    loader = CapabilityBulkLoader(conn, batch_size=batch_size)
+    processed = {}
+
+    try:
+        for source_file, lab_name, rows in _iter_lab_files(CLEANED_DIR, files):
+            loader.add_lab(lab_name)
+            domains = infer_domains([row[0] for row in rows], [row[1] for row in rows])
+            for (test, standard), (domain, confidence) in zip(rows, domains):
+                loader.add(lab_name, domain, test, standard)
+            processed[source_file] = {"lab_name": lab_name, "rows": len(rows)}
+            print(f"[OK] {len(rows)} rows processed for {lab_name}")
+
+        loader.close()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    print(
+        f"  Batches: {loader.stats['flushes']}, "
+        f"new capabilities: {loader.stats['capabilities_inserted']}"
+    )
+    _report_throughput(loader.stats["rows"], started)
+    return processed
+
+
+def _run_capabilities_rowwise(files=None):
+    from .domain_inference import infer_domain
+    from .entity_resolution import get_or_create, get_or_create_standard
+
+    started = time.perf_counter()
+    conn = get_db_connection()
+    cur = conn.cursor()
+
+    total = 0
+    processed = {}
+
+    for source_file, lab_name, rows in _iter_lab_files(CLEANED_DIR, files):
+        lab_id = get_or_create(cur, "labs", "lab_name", lab_name)
+
+        inserted = 0
+
+        for test, standard in rows:
             domain, confidence = infer_domain(test, standard)
 
             domain_id = get_or_create(cur, "domains", "domain_name", domain)
@@ -248,8 +580,33 @@ def run_capabilities():
             inserted += 1
 
         conn.commit()
+        total += inserted
+        processed[source_file] = {"lab_name": lab_name, "rows": inserted}
         print(f"[OK] {inserted} rows processed for {lab_name}")
 
     cur.close()
     conn.close()
-    print("[OK] Capability build completed")
+    _report_throughput(total, started)
+    return processed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build lab capabilities from data/cleaned")
+    parser.add_argument("--mode", choices=["bulk", "row"], default="bulk")
+    parser.add_argument("--batch-size", type=int, default=50000)
+    parser.add_argument(
+        "--refresh-summaries", action="store_true",
+        help="only refresh the summary views (db/summaries.sql)"
+    )
+    parser.add_argument(
+        "--concurrently", action="store_true",
+        help="with --refresh-summaries, refresh without blocking API reads"
+    )
+    args = parser.parse_args()
+
+    if args.refresh_summaries:
+        refresh_summaries(concurrently=args.concurrently)
+    else:
+        run_capabilities(mode=args.mode, batch_size=args.batch_size)
@@ -0,0 +1,189 @@
+"""
+Statistics snapshot of every published build, read by the UI statistics page
+and /api/stats.
+
+refresh_summaries() writes one build_statistics row per build, in the same
+transaction as its build_versions row, from the freshly refreshed summary
+views:
+
+{
+    "counts": {"labs", "retired_labs", "capabilities", "tests", "standards", "domains"},
+    "domains": [{"domain_name", "capability_count", "lab_count", "test_count", "standard_count"}],
+    "top_labs": [{"lab_id", "lab_name", "total_capabilities", "unique_tests",
+                  "unique_standards", "unique_domains"}],
+    "standard_bodies": [{"standard_body", "standard_count", "capability_count", "lab_count"}]
+}
+
+Readers then get everything with a primary-key lookup instead of full-table
+counts and aggregations. Snapshots are kept, so each build can be compared
+with the previous one (statistics_deltas).
+"""
+
+# Labs kept in the top_labs list of a snapshot
+TOP_LABS = 20
+
+STATISTICS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS build_statistics (
+        build_id BIGINT PRIMARY KEY REFERENCES build_versions(build_id) ON DELETE CASCADE,
+        statistics JSONB NOT NULL,
+        created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP NOT NULL
+    )
+"""
+
+# Capabilities are active ones (mv_capability_search); tests and standards are all rows
+STATISTICS_SQL = """
+    SELECT json_build_object(
+        'counts', json_build_object(
+            'labs', (SELECT COUNT(*) FROM labs WHERE deleted_at IS NULL),
+            'retired_labs', (SELECT COUNT(*) FROM labs WHERE deleted_at IS NOT NULL),
+            'capabilities', (SELECT COUNT(*) FROM mv_capability_search),
+            'tests', (SELECT COUNT(*) FROM tests),
+            'standards', (SELECT COUNT(*) FROM standards),
+            'domains', (SELECT COUNT(*) FROM domains)
+        ),
+        'domains', (
+            SELECT COALESCE(json_agg(
+                json_build_object(
+                    'domain_name', domain_name,
+                    'capability_count', total_capabilities,
+                    'lab_count', lab_count,
+                    'test_count', test_count,
+                    'standard_count', standard_count
+                ) ORDER BY total_capabilities DESC, domain_name
+            ), '[]'::json)
+            FROM mv_domain_summary
+        ),
+        'top_labs', (
+            SELECT COALESCE(json_agg(top ORDER BY top.total_capabilities DESC, top.lab_id), '[]'::json)
+            FROM (
+                SELECT
+                    lab_id,
+                    lab_name,
+                    COUNT(*) AS total_capabilities,
+                    COUNT(DISTINCT test_id) AS unique_tests,
+                    COUNT(DISTINCT standard_id) AS unique_standards,
+                    COUNT(DISTINCT domain_id) AS unique_domains
+                FROM mv_capability_search
+                GROUP BY lab_id, lab_name
+                ORDER BY total_capabilities DESC, lab_id
+                LIMIT %(top_labs)s
+            ) top
+        ),
+        'standard_bodies', (
+            SELECT COALESCE(json_agg(body ORDER BY body.capability_count DESC, body.standard_body), '[]'::json)
+            FROM (
+                SELECT
+                    COALESCE(s.standard_body, 'UNKNOWN') AS standard_body,
+                    COUNT(DISTINCT cs.standard_id) AS standard_count,
+                    COUNT(*) AS capability_count,
+                    COUNT(DISTINCT cs.lab_id) AS lab_count
+                FROM mv_capability_search cs
+                JOIN standards s ON s.standard_id = cs.standard_id
+                GROUP BY COALESCE(s.standard_body, 'UNKNOWN')
+            ) body
+        )
+    )
+"""
+
+
+def write_snapshot(cur, build_id):
+    """Store the statistics of build build_id (summary views already refreshed)."""
+    cur.execute(STATISTICS_TABLE_SQL)
+    cur.execute(
+        f"INSERT INTO build_statistics (build_id, statistics) SELECT %(build_id)s, ({STATISTICS_SQL})::jsonb",
+        {"build_id": build_id, "top_labs": TOP_LABS}
+    )
+
+
+def compute_statistics(cur):
+    """Statistics of the current summary views, without storing them."""
+    cur.execute(STATISTICS_SQL, {"top_labs": TOP_LABS})
+    return cur.fetchone()[0]
+
+
+def statistics_deltas(current, previous):
+    """Changes from the previous snapshot: counts and capabilities per domain."""
+    counts = {
+        name: value - previous["counts"].get(name, 0)
+        for name, value in current["counts"].items()
+    }
+    before = {d["domain_name"]: d["capability_count"] for d in previous["domains"]}
+    domains = {
+        d["domain_name"]: d["capability_count"] - before.get(d["domain_name"], 0)
+        for d in current["domains"]
+    }
+    return {"counts": counts, "domains": domains}
+
+
+def read_statistics(cur, history=0):
+    """
+    Latest snapshot with deltas against the previous one, and the counts of
+    the last history snapshots (newest first); None before the first snapshot.
+    cur must be a plain (tuple) cursor.
+    """
+    cur.execute("SELECT to_regclass('build_statistics') IS NOT NULL")
+    if not cur.fetchone()[0]:
+        return None
+
+    cur.execute(
+        """
+        SELECT bs.build_id, bv.published_at, bs.statistics
+        FROM build_statistics bs
+        JOIN build_versions bv ON bv.build_id = bs.build_id
+        ORDER BY bs.build_id DESC
+        LIMIT 2
+        """
+    )
+    rows = cur.fetchall()
+    if not rows:
+        return None
+
+    build_id, published_at, statistics = rows[0]
+    result = {
+        "build_id": build_id,
+        "built_at": published_at.isoformat(),
+        "source": "snapshot",
+        "statistics": statistics,
+        "previous_build_id": None,
+        "deltas": None,
+    }
+    if len(rows) > 1:
+        result["previous_build_id"] = rows[1][0]
+        result["deltas"] = statistics_deltas(statistics, rows[1][2])
+
+    if history:
+        cur.execute(
+            """
+            SELECT bs.build_id, bv.published_at, bs.statistics -> 'counts'
+            FROM build_statistics bs
+            JOIN build_versions bv ON bv.build_id = bs.build_id
+            ORDER BY bs.build_id DESC
+            LIMIT %s
+            """,
+            (history,)
+        )
+        result["history"] = [
+            {"build_id": row[0], "built_at": row[1].isoformat(), "counts": row[2]}
+            for row in cur.fetchall()
+        ]
+    return result
+
+
+def current_statistics(cur, history=0):
+    """
+    read_statistics(), or before the first snapshot has been written the same
+    payload computed from the summary views (source "live").
+    """
+    result = read_statistics(cur, history)
+    if result is None:
+        result = {
+            "build_id": None,
+            "built_at": None,
+            "source": "live",
+            "statistics": compute_statistics(cur),
+            "previous_build_id": None,
+            "deltas": None,
+        }
+        if history:
+            result["history"] = []
+    return result
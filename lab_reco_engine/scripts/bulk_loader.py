@@ -0,0 +1,305 @@
+"""
+Set-based loading helpers for the capability build stage.
+
+Dimension values (labs, domains, tests, standards) are resolved per batch with
+in-memory caches and multi-row statements; capability rows are COPY'd into a
+staging table and merged with a single INSERT ... SELECT ... ON CONFLICT DO NOTHING.
+"""
+
+import io
+import csv
+
+from .entity_resolution import parse_standard, parse_standards
+
+
+class DimensionCache:
+    """
+    In-memory LOWER(name) -> id map for a dimension table.
+    Mirrors get_or_create: case-insensitive lookup, first spelling seen is inserted.
+    """
+
+    def __init__(self, table, column):
+        self.table = table
+        self.column = column
+        self.id_col = f"{table[:-1]}_id"
+        self.ids = {}
+
+    def load(self, cur):
+        """Preload all existing rows."""
+        cur.execute(f"SELECT {self.id_col}, {self.column} FROM {self.table}")
+        for row_id, name in cur.fetchall():
+            self.ids.setdefault(name.lower(), row_id)
+
+    def resolve(self, cur, values):
+        """
+        Make sure every value has an id, inserting missing ones in one statement.
+        Returns the number of inserted rows.
+        """
+        missing = {}
+        for value in values:
+            key = value.lower()
+            if key not in self.ids and key not in missing:
+                missing[key] = value
+
+        if not missing:
+            return 0
+
+        names = list(missing.values())
+        if self.table == "tests":
+            # family_id is NULL initially (handled by COALESCE in the unique index)
+            cur.execute(
+                f"""
+                INSERT INTO {self.table} ({self.column}, family_id)
+                SELECT v, NULL FROM unnest(%s::text[]) AS v
+                ON CONFLICT DO NOTHING
+                RETURNING {self.id_col}, {self.column}
+                """,
+                (names,)
+            )
+        else:
+            cur.execute(
+                f"""
+                INSERT INTO {self.table} ({self.column})
+                SELECT v FROM unnest(%s::text[]) AS v
+                ON CONFLICT DO NOTHING
+                RETURNING {self.id_col}, {self.column}
+                """,
+                (names,)
+            )
+        inserted = cur.fetchall()
+        for row_id, name in inserted:
+            self.ids[name.lower()] = row_id
+
+        # Rows inserted concurrently by another loader
+        unresolved = [key for key in missing if key not in self.ids]
+        if unresolved:
+            cur.execute(
+                f"SELECT {self.id_col}, LOWER({self.column}) FROM {self.table} WHERE LOWER({self.column}) = ANY(%s)",
+                (unresolved,)
+            )
+            for row_id, key in cur.fetchall():
+                self.ids.setdefault(key, row_id)
+
+        return len(inserted)
+
+    def get(self, value):
+        return self.ids[value.lower()]
+
+
+class StandardCache:
+    """
+    In-memory LOWER(full_code) -> (standard_id, body, code) map for standards.
+    Mirrors get_or_create_standard, including the body/code refresh of existing rows.
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.parsed = {}
+
+    def load(self, cur):
+        """Preload all existing standards."""
+        cur.execute("SELECT standard_id, full_code, standard_body, standard_code FROM standards")
+        for standard_id, full_code, body, code in cur.fetchall():
+            self.ids.setdefault(full_code.lower(), (standard_id, body, code))
+
+    def key(self, raw):
+        """Cache key (LOWER(full_code)) of a raw standard string."""
+        if raw not in self.parsed:
+            self.parsed[raw] = parse_standard(raw)
+        return self.parsed[raw][3].lower()
+
+    def resolve(self, cur, raw_values):
+        """
+        Insert new standards and update changed body/code in set-based statements.
+        raw_values are in row order (repeats included) so the final state matches
+        applying get_or_create_standard row by row.
+        Returns (inserted, updated) counts.
+        """
+        unparsed = [raw for raw in dict.fromkeys(raw_values) if raw not in self.parsed]
+        self.parsed.update(zip(unparsed, parse_standards(unparsed)))
+
+        # key -> [body, code, year, full_code], replayed in memory
+        wanted = {}
+        for raw in raw_values:
+            body, code, year, full_code = self.parsed[raw]
+            key = full_code.lower()
+
+            state = wanted.get(key)
+            if state is None:
+                if key in self.ids:
+                    standard_id, existing_body, existing_code = self.ids[key]
+                    state = [existing_body, existing_code, None, full_code]
+                else:
+                    wanted[key] = [body, code, year, full_code]
+                    continue
+                wanted[key] = state
+
+            if (state[0], state[1]) != (body, code):
+                # UPDATE ... SET body, code, year = COALESCE(year, new year)
+                state[0], state[1] = body, code
+                state[2] = state[2] or year
+
+        new_rows = [values for key, values in wanted.items() if key not in self.ids]
+        changed = [
+            (self.ids[key][0], values)
+            for key, values in wanted.items()
+            if key in self.ids and (self.ids[key][1], self.ids[key][2]) != (values[0], values[1])
+        ]
+
+        inserted = 0
+        if new_rows:
+            cur.execute(
+                """
+                INSERT INTO standards (standard_body, standard_code, year, full_code)
+                SELECT * FROM unnest(%s::text[], %s::text[], %s::text[], %s::text[])
+                ON CONFLICT DO NOTHING
+                RETURNING standard_id, full_code, standard_body, standard_code
+                """,
+                (
+                    [row[0] for row in new_rows],
+                    [row[1] for row in new_rows],
+                    [row[2] for row in new_rows],
+                    [row[3] for row in new_rows],
+                )
+            )
+            returned = cur.fetchall()
+            inserted = len(returned)
+            for standard_id, full_code, body, code in returned:
+                self.ids[full_code.lower()] = (standard_id, body, code)
+
+            unresolved = [row[3].lower() for row in new_rows if row[3].lower() not in self.ids]
+            if unresolved:
+                cur.execute(
+                    """
+                    SELECT standard_id, full_code, standard_body, standard_code
+                    FROM standards WHERE LOWER(full_code) = ANY(%s)
+                    """,
+                    (unresolved,)
+                )
+                for standard_id, full_code, body, code in cur.fetchall():
+                    self.ids.setdefault(full_code.lower(), (standard_id, body, code))
+
+        if changed:
+            cur.execute(
+                """
+                UPDATE standards s
+                SET standard_body = v.body,
+                    standard_code = v.code,
+                    year = COALESCE(s.year, v.year)
+                FROM unnest(%s::int[], %s::text[], %s::text[], %s::text[]) AS v(standard_id, body, code, year)
+                WHERE s.standard_id = v.standard_id
+                """,
+                (
+                    [standard_id for standard_id, _ in changed],
+                    [values[0] for _, values in changed],
+                    [values[1] for _, values in changed],
+                    [values[2] for _, values in changed],
+                )
+            )
+            for standard_id, values in changed:
+                self.ids[values[3].lower()] = (standard_id, values[0], values[1])
+
+        return inserted, len(changed)
+
+    def get(self, raw):
+        return self.ids[self.key(raw)][0]
+
+
+class CapabilityBulkLoader:
+    """
+    Batches capability rows and writes them with COPY + one merge statement per batch.
+    Rows are (lab_name, domain, test, standard) tuples; the first occurrence of a
+    (lab, test, standard) triple decides its domain, like the row-by-row path.
+    """
+
+    def __init__(self, conn, batch_size=50000):
+        self.conn = conn
+        self.cur = conn.cursor()
+        self.batch_size = batch_size
+        self.rows = []
+        self.lab_names = []
+        self.stats = {"flushes": 0, "rows": 0, "capabilities_inserted": 0}
+
+        self.labs = DimensionCache("labs", "lab_name")
+        self.domains = DimensionCache("domains", "domain_name")
+        self.tests = DimensionCache("tests", "test_name")
+        self.standards = StandardCache()
+
+        for cache in (self.labs, self.domains, self.tests, self.standards):
+            cache.load(self.cur)
+
+        self.cur.execute(
+            """
+            CREATE TEMP TABLE IF NOT EXISTS lab_capabilities_staging (
+                seq BIGINT,
+                lab_id INT,
+                domain_id INT,
+                test_id INT,
+                standard_id INT
+            ) ON COMMIT DELETE ROWS
+            """
+        )
+
+    def add_lab(self, lab_name):
+        """Register a lab even if none of its rows are loadable."""
+        self.lab_names.append(lab_name)
+
+    def add(self, lab_name, domain, test, standard):
+        self.rows.append((lab_name, domain, test, standard))
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Resolve the batch's dimension values, COPY it to staging and merge it."""
+        cur = self.cur
+        if self.lab_names:
+            self.labs.resolve(cur, self.lab_names)
+            self.lab_names = []
+
+        if not self.rows:
+            self.conn.commit()
+            return
+
+        self.labs.resolve(cur, (row[0] for row in self.rows))
+        self.domains.resolve(cur, (row[1] for row in self.rows))
+        self.tests.resolve(cur, (row[2] for row in self.rows))
+        self.standards.resolve(cur, [row[3] for row in self.rows])
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for seq, (lab_name, domain, test, standard) in enumerate(self.rows):
+            writer.writerow((
+                seq,
+                self.labs.get(lab_name),
+                self.domains.get(domain),
+                self.tests.get(test),
+                self.standards.get(standard),
+            ))
+        buffer.seek(0)
+        cur.copy_expert(
+            "COPY lab_capabilities_staging (seq, lab_id, domain_id, test_id, standard_id) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+
+        cur.execute(
+            """
+            INSERT INTO lab_capabilities
+            (lab_id, domain_id, discipline_id, family_id, test_id, standard_id)
+            SELECT DISTINCT ON (lab_id, test_id, standard_id)
+                lab_id, domain_id, NULL, NULL, test_id, standard_id
+            FROM lab_capabilities_staging
+            ORDER BY lab_id, test_id, standard_id, seq
+            ON CONFLICT (lab_id, test_id, standard_id)
+            DO NOTHING
+            """
+        )
+        self.stats["capabilities_inserted"] += cur.rowcount
+        self.stats["rows"] += len(self.rows)
+        self.stats["flushes"] += 1
+
+        self.conn.commit()
+        self.rows = []
+
+    def close(self):
+        self.flush()
+        self.cur.close()
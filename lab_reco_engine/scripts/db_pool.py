@@ -0,0 +1,225 @@
+"""
+Thread-safe PostgreSQL connection pool for the API.
+
+Connections are opened once and reused across requests instead of paying the
+TCP + authentication handshake per request. A request that finds every
+connection checked out waits (up to timeout seconds) for one to be returned;
+waiting requests are served in arrival order.
+
+Size the pool to the WSGI worker model: each worker process has its own pool
+(created lazily, so it is never shared across a fork), with one connection per
+request thread plus one for the recommender reload thread:
+    LAB_RECO_API_THREADS   request threads per process (default: 8)
+    LAB_RECO_DB_POOL_SIZE  overrides the pool size
+
+Fixed queries can be registered as server-side prepared statements
+(name -> SQL with $1, $2 ... parameters). Each connection prepares a statement
+the first time it executes it and reuses the plan afterwards.
+"""
+
+import os
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+
+DEFAULT_API_THREADS = 8
+DEFAULT_TIMEOUT = 10.0
+
+# Checkouts kept for the wait/checkout time percentiles in stats()
+SAMPLE_WINDOW = 1000
+
+
+def default_pool_size():
+    """One connection per request thread plus one for the recommender reload thread."""
+    if os.environ.get("LAB_RECO_DB_POOL_SIZE"):
+        return max(1, int(os.environ["LAB_RECO_DB_POOL_SIZE"]))
+    return max(1, int(os.environ.get("LAB_RECO_API_THREADS", DEFAULT_API_THREADS))) + 1
+
+
+class PreparedConnection(psycopg2.extensions.connection):
+    """Connection that remembers which statements it has prepared."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the pool timeout."""
+
+
+def _summary(samples):
+    if not samples:
+        return {"avg": 0.0, "p95": 0.0, "max": 0.0}
+    ordered = sorted(samples)
+    return {
+        "avg": round(statistics.fmean(ordered), 3),
+        "p95": round(ordered[max(0, int(len(ordered) * 0.95) - 1)], 3),
+        "max": round(ordered[-1], 3),
+    }
+
+
+class ConnectionPool:
+    """
+    Bounded pool of PreparedConnections.
+
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        pool.execute(cur, "domains")
+
+    Connections are opened on demand up to size and then kept open (idle ones
+    are reused most recently returned first). They are rolled back when
+    returned, so transaction-local settings (set_config(..., true)) never leak
+    into the next request; broken ones are closed and replaced on demand.
+    """
+
+    def __init__(self, config, size=None, timeout=DEFAULT_TIMEOUT, statements=None):
+        self.config = config
+        self.size = size or default_pool_size()
+        self.timeout = timeout
+        self.statements = dict(statements or {})
+
+        self._lock = threading.Lock()
+        self._pid = None
+        self._free = 0
+        self._waiters = deque()
+        self._idle = []
+        self._open = 0
+        self._in_use = 0
+        self._checkouts = 0
+        self._waited = 0
+        self._timeouts = 0
+        self._discarded = 0
+        self._wait_ms = deque(maxlen=SAMPLE_WINDOW)
+        self._checkout_ms = deque(maxlen=SAMPLE_WINDOW)
+
+    def _ensure(self):
+        """Set up the pool in this process (again after a fork: sockets are not shared)."""
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._free = self.size
+                self._waiters = deque()
+                self._idle = []
+                self._open = 0
+                self._in_use = 0
+
+    def _acquire(self):
+        """Take a slot, queueing behind earlier waiters. Returns whether it had to wait."""
+        with self._lock:
+            if self._free and not self._waiters:
+                self._free -= 1
+                return False
+            ready = threading.Event()
+            self._waiters.append(ready)
+
+        if not ready.wait(self.timeout):
+            with self._lock:
+                if ready in self._waiters:
+                    self._waiters.remove(ready)
+                    self._timeouts += 1
+                    raise PoolTimeout(
+                        f"No database connection free within {self.timeout}s (pool size {self.size})"
+                    )
+            # A slot was handed over just as the wait timed out
+        return True
+
+    def _release(self):
+        """Hand the slot to the longest waiting request, or mark it free."""
+        with self._lock:
+            if self._waiters:
+                self._waiters.popleft().set()
+            else:
+                self._free += 1
+
+    def _checkout(self):
+        """An idle connection, or a new one (the caller holds a slot)."""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                conn = self._idle.pop()
+            if not conn.closed:
+                return conn
+            with self._lock:
+                self._open -= 1
+                self._discarded += 1
+
+        conn = psycopg2.connect(connection_factory=PreparedConnection, **self.config)
+        with self._lock:
+            self._open += 1
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the duration of the with block."""
+        self._ensure()
+
+        started = time.perf_counter()
+        waited = self._acquire()
+        wait_ms = (time.perf_counter() - started) * 1000
+
+        try:
+            conn = self._checkout()
+        except Exception:
+            self._release()
+            raise
+
+        with self._lock:
+            self._in_use += 1
+            self._checkouts += 1
+            self._waited += waited
+            self._wait_ms.append(wait_ms)
+
+        checked_out = time.perf_counter()
+        try:
+            yield conn
+        finally:
+            broken = bool(conn.closed)
+            if not broken:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    broken = True
+            if broken:
+                conn.close()
+            with self._lock:
+                if broken:
+                    self._open -= 1
+                    self._discarded += 1
+                else:
+                    self._idle.append(conn)
+                self._in_use -= 1
+                self._checkout_ms.append((time.perf_counter() - checked_out) * 1000)
+            self._release()
+
+    def execute(self, cur, name, params=()):
+        """Execute registered statement name, preparing it on this connection first if needed."""
+        conn = cur.connection
+        if name not in conn.prepared:
+            cur.execute(f"PREPARE {name} AS {self.statements[name]}")
+            conn.prepared.add(name)
+        if params:
+            cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+        else:
+            cur.execute(f"EXECUTE {name}")
+
+    def stats(self):
+        """Pool usage: wait_ms is time spent waiting for a free connection, checkout_ms how long requests held one."""
+        with self._lock:
+            return {
+                "size": self.size,
+                "open": self._open,
+                "in_use": self._in_use,
+                "checkouts": self._checkouts,
+                "waited": self._waited,
+                "timeouts": self._timeouts,
+                "discarded": self._discarded,
+                "wait_ms": _summary(self._wait_ms),
+                "checkout_ms": _summary(self._checkout_ms),
+            }
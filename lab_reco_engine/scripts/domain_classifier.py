@@ -0,0 +1,302 @@
+"""
+Precompiled domain classifier.
+
+Builds, once, everything infer_domain used to rebuild per row:
+- one Aho-Corasick automaton over every keyword list (rule keywords, extended
+  keywords, indicator words and the fallback chains), reporting a bitmask of the
+  keyword groups present in the text
+- a prefix index (trie) over STANDARD_DOMAIN_MAP for the substring scan of the
+  standard code
+- the rule standards with their base codes pre-extracted
+
+Labels and confidences are identical to domain_inference.infer_domain_legacy;
+scripts/benchmark_domain_inference.py checks this against the cleaned data.
+"""
+
+import re
+from functools import lru_cache
+
+STD_BASE_RE = re.compile(r'([a-z]+)\s*(\d+)')
+IP_RATING_RE = re.compile(r'\bip\d+\b')
+
+# STEP 3 indicators (whole words), in the order infer_domain applies them
+INDICATOR_KEYWORDS = [
+    ('Safety', ['creepage', 'clearance', 'marking', 'terminals', 'wiring', 'connections', 'leakage', 'earthing'], 0.4),
+    ('Electrical', ['voltage', 'current', 'resistance', 'insulation', 'dielectric', 'power'], 0.3),
+    ('Environmental', ['temperature', 'humidity', 'damp', 'heat', 'cold', 'water'], 0.3),
+    ('Mechanical', ['dimension', 'thickness', 'diameter', 'length', 'mass', 'tensile', 'elongation'], 0.3),
+]
+
+STANDARD_BODIES = ['iec', 'is ', 'iso', 'en ', 'bs ', 'ansi', 'astm', 'ul', 'csa']
+
+# STEP 4 chain (substring match, standard body present): first group that hits wins
+FALLBACK_KEYWORDS = [
+    ('Safety', ['safety', 'leakage', 'earthing', 'fire', 'flame', 'glow', 'touch', 'creepage', 'clearance']),
+    ('Electrical', ['voltage', 'current', 'power', 'electrical', 'insulation', 'dielectric', 'resistance']),
+    ('EMC', ['emc', 'emi', 'emission', 'immunity', 'esd', 'conducted', 'radiated']),
+    ('Environmental', ['temperature', 'humidity', 'ip', 'damp', 'heat', 'cold', 'water', 'moisture', 'environmental']),
+    ('Mechanical', ['mechanical', 'tensile', 'elongation', 'compression', 'bend', 'flexibility', 'dimension', 'thickness']),
+    ('Thermal', ['thermal', 'heat', 'ageing', 'aging', 'rise']),
+    ('High_Voltage', ['high voltage', 'hv', 'impulse', 'lightning', 'partial discharge']),
+    ('Chemical', ['rohs', 'cadmium', 'lead', 'mercury', 'chemical', 'halogen']),
+]
+
+# STEP 5 chain (substring match, no standard body)
+LAST_RESORT_KEYWORDS = [
+    ('Safety', ['safety', 'leakage', 'earthing', 'fire', 'flame']),
+    ('Electrical', ['voltage', 'current', 'power', 'electrical']),
+    ('EMC', ['emc', 'emi', 'emission']),
+    ('Environmental', ['temperature', 'humidity', 'environmental']),
+    ('Mechanical', ['mechanical', 'tensile', 'elongation']),
+]
+
+
+def _is_word(char):
+    # Same character class as \w / \b in str regexes
+    return char.isalnum() or char == "_"
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over lowercase patterns.
+    Each pattern carries a bitmask of the groups it belongs to, split into
+    whole-word groups (regex \\b semantics) and plain substring groups.
+    """
+
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.outputs = [[]]  # state -> [(length, word_mask, substring_mask)]
+        self._patterns = {}
+
+    def add(self, pattern, bit, whole_word):
+        masks = self._patterns.setdefault(pattern, [0, 0])
+        masks[0 if whole_word else 1] |= bit
+
+    def build(self):
+        for pattern, (word_mask, substring_mask) in self._patterns.items():
+            state = 0
+            for char in pattern:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.outputs.append([])
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.outputs[state].append((len(pattern), word_mask, substring_mask))
+
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.outputs[child] = self.outputs[child] + self.outputs[self.fail[child]]
+        return self
+
+    def scan(self, text):
+        """Bitmask of groups with a match in text (whole-word groups need word boundaries)."""
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        mask = 0
+        state = 0
+        size = len(text)
+        for end in range(size):
+            char = text[end]
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for length, word_mask, substring_mask in outputs[state]:
+                mask |= substring_mask
+                if word_mask:
+                    first = end - length + 1
+                    before = first > 0 and _is_word(text[first - 1])
+                    after = end + 1 < size and _is_word(text[end + 1])
+                    # \b on both sides (patterns start and end with word characters)
+                    if before != _is_word(text[first]) and after != _is_word(text[end]):
+                        mask |= word_mask
+        return mask
+
+
+class PrefixIndex:
+    """
+    Trie over substring patterns that remembers each pattern's position in the
+    source mapping, so the first pattern (in mapping order) found anywhere in a
+    text can be returned like a linear `for pattern in mapping: if pattern in text`.
+    """
+
+    def __init__(self, mapping):
+        self.values = list(mapping.values())
+        self.root = {}
+        for order, pattern in enumerate(mapping):
+            node = self.root
+            for char in pattern:
+                node = node.setdefault(char, {})
+            node.setdefault(None, order)
+        self.first_chars = set(self.root)
+
+    def first_match(self, text):
+        best = None
+        for i, char in enumerate(text):
+            if char not in self.first_chars:
+                continue
+            node = self.root
+            for c in text[i:]:
+                node = node.get(c)
+                if node is None:
+                    break
+                order = node.get(None)
+                if order is not None and (best is None or order < best):
+                    best = order
+        return None if best is None else self.values[best]
+
+
+class DomainClassifier:
+    """Compiled equivalent of infer_domain, with a (test, standard) memo."""
+
+    def __init__(self, rules, standard_map, domain_keywords, cache_size=500000):
+        self.standard_map = dict(standard_map)
+        self.standard_index = PrefixIndex(self.standard_map)
+        # typed: 1 and 1.0 stringify differently, so they must not share an entry
+        self._memo = lru_cache(maxsize=cache_size, typed=True)(self._classify)
+
+        self.automaton = KeywordAutomaton()
+        self._next_bit = 1
+
+        # STEP 2 rules, in yaml order
+        self.rules = []
+        for domain, rule in rules.items():
+            standards = []
+            for std in rule.get("standards", []):
+                std_lower = std.lower().strip()
+                std_match = STD_BASE_RE.search(std_lower)
+                std_base = f"{std_match.group(1)} {std_match.group(2)}" if std_match else None
+                standards.append((std_lower, std_base))
+            self.rules.append((
+                domain,
+                rule.get("confidence", 0.85),
+                standards,
+                self._group(rule.get("keywords", []), whole_word=True),
+                self._group(domain_keywords.get(domain, []), whole_word=True) if domain in domain_keywords else None,
+            ))
+
+        self.indicators = [
+            (domain, self._group(keywords, whole_word=True), boost)
+            for domain, keywords, boost in INDICATOR_KEYWORDS
+        ]
+        self.environmental_indicator = next(bit for domain, bit, _ in self.indicators if domain == 'Environmental')
+        self.fallback = [
+            (domain, self._group(keywords, whole_word=False))
+            for domain, keywords in FALLBACK_KEYWORDS
+        ]
+        self.last_resort = [
+            (domain, self._group(keywords, whole_word=False))
+            for domain, keywords in LAST_RESORT_KEYWORDS
+        ]
+        self.automaton.build()
+
+    def _group(self, keywords, whole_word):
+        bit = self._next_bit
+        self._next_bit <<= 1
+        for keyword in keywords:
+            keyword = keyword.lower()
+            if whole_word and not (_is_word(keyword[0]) and _is_word(keyword[-1])):
+                raise ValueError(f"Keyword must start and end with a word character: {keyword!r}")
+            self.automaton.add(keyword, bit, whole_word)
+        return bit
+
+    def classify(self, test_name, standard):
+        """Return (domain, confidence) exactly like infer_domain_legacy."""
+        try:
+            return self._memo(test_name, standard)
+        except TypeError:
+            return self._classify(test_name, standard)  # unhashable input
+
+    def classify_column(self, tests, standards):
+        """
+        Classify aligned sequences (lists or DataFrame columns) of test names and
+        standards. Repeated pairs are served from the memo.
+        Returns a list of (domain, confidence).
+        """
+        tests = list(tests)
+        standards = list(standards)
+        if len(tests) != len(standards):
+            raise ValueError("tests and standards must have the same length")
+
+        classify = self.classify
+        return [classify(test, standard) for test, standard in zip(tests, standards)]
+
+    def cache_info(self):
+        return self._memo.cache_info()
+
+    def _classify(self, test_name, standard):
+        if not test_name or not standard:
+            return "Unknown", 0.0
+
+        test_lower = str(test_name).lower().strip()
+        standard_lower = str(standard).lower().strip()
+        combined_text = f"{test_lower} {standard_lower}"
+
+        # STEP 1: standard map (exact base code, then first pattern in map order)
+        std_match = STD_BASE_RE.search(standard_lower)
+        if std_match:
+            domain = self.standard_map.get(f"{std_match.group(1)} {std_match.group(2)}")
+            if domain is not None:
+                return domain, 0.9
+
+        domain = self.standard_index.first_match(standard_lower)
+        if domain is not None:
+            return domain, 0.85
+
+        hits = self.automaton.scan(combined_text)
+
+        # STEP 2: rule scoring
+        domain_scores = {}
+        for domain, confidence, standards, keyword_bit, extended_bit in self.rules:
+            score = 0.0
+            for std_lower, std_base in standards:
+                if std_lower in standard_lower or standard_lower in std_lower:
+                    score += 0.6
+                    break
+                if std_base is not None and std_base in standard_lower:
+                    score += 0.5
+                    break
+            if hits & keyword_bit:
+                score += 0.3
+            if extended_bit is not None and hits & extended_bit:
+                score += 0.25
+            if score > 0:
+                domain_scores[domain] = score * confidence
+
+        # STEP 3: indicator words
+        for domain, bit, boost in self.indicators:
+            matched = hits & bit
+            if bit == self.environmental_indicator and not matched:
+                matched = IP_RATING_RE.search(combined_text) is not None
+            if matched:
+                domain_scores[domain] = domain_scores.get(domain, 0) + boost
+
+        if domain_scores:
+            best_domain = max(domain_scores, key=domain_scores.get)
+            best_score = domain_scores[best_domain]
+            if best_score >= 0.1:
+                return best_domain, min(best_score, 1.0)
+
+        # STEP 4: standard body present
+        if any(body in standard_lower for body in STANDARD_BODIES):
+            for domain, bit in self.fallback:
+                if hits & bit:
+                    return domain, 0.7
+            if 'iec 6' in standard_lower or 'is 1' in standard_lower or 'is 6' in standard_lower:
+                return 'Safety', 0.6
+            elif 'iec 6' in standard_lower[:10] or 'is 3' in standard_lower[:10]:
+                return 'Electrical', 0.6
+            return 'Safety', 0.5
+
+        # STEP 5: keyword-only
+        for domain, bit in self.last_resort:
+            if hits & bit:
+                return domain, 0.5
+
+        return 'Safety', 0.4
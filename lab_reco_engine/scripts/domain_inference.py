@@ -69,10 +69,37 @@ DOMAIN_KEYWORDS = {
     'Chemical': ['rohs', 'cadmium', 'lead', 'mercury', 'hazardous', 'chemical', 'halogen', 'content']
 }
 
+_classifier = None
+
+
+def get_classifier():
+    """The compiled classifier for config/domain_rules.yaml, built on first use."""
+    global _classifier
+    if _classifier is None:
+        from .domain_classifier import DomainClassifier
+        _classifier = DomainClassifier(rules, STANDARD_DOMAIN_MAP, DOMAIN_KEYWORDS)
+    return _classifier
+
+
 def infer_domain(test_name, standard):
     """
     Aggressive domain inference - classifies based on standards first, then keywords.
     Goal: Classify ALL records, not leave any Unknown.
+    Uses the precompiled classifier (scripts/domain_classifier.py); results are
+    identical to infer_domain_legacy.
+    """
+    return get_classifier().classify(test_name, standard)
+
+
+def infer_domains(tests, standards):
+    """Classify whole columns of test names and standards; returns [(domain, confidence), ...]."""
+    return get_classifier().classify_column(tests, standards)
+
+
+def infer_domain_legacy(test_name, standard):
+    """
+    Original row-at-a-time implementation, kept as the reference for the
+    compiled classifier (see scripts/benchmark_domain_inference.py).
     """
     if not test_name or not standard:
         return "Unknown", 0.0
@@ -1,41 +1,40 @@
 import re
+from functools import lru_cache
 
+# Patterns to match standard codes (IEC, IS, ISO, CISPR), tried in order
+STANDARD_PATTERNS = [
+    (re.compile(r'(IEC)\s*(\d+[-\s]?\d*[-\s]?\d*[-\s]?\d*)'), 'IEC'),
+    (re.compile(r'(IS)\s*(\d+[-\s]?\d*[-\s]?\d*[-\s]?\d*)'), 'IS'),
+    (re.compile(r'(ISO)\s*(\d+[-\s]?\d*[-\s]?\d*[-\s]?\d*)'), 'ISO'),
+    (re.compile(r'(CISPR)[-\s]?(\d+[-\s]?\d*[-\s]?\d*[-\s]?\d*)'), 'CISPR'),
+]
+WHITESPACE_RE = re.compile(r'\s+')
+YEAR_RE = re.compile(r'(\d{4})')
 
-def parse_standard(full_code):
-    """
-    Parse standard string to extract body, code, and year.
-    Returns: (standard_body, standard_code, year, full_code)
-    """
+UNSPECIFIED_STANDARD = ('GENERIC', 'UNSPECIFIED', None, 'UNSPECIFIED')
+
+
+def _parse_standard(full_code):
     if not full_code or str(full_code).strip().lower() in ['nan', 'none', '']:
-        return ('GENERIC', 'UNSPECIFIED', None, 'UNSPECIFIED')
+        return UNSPECIFIED_STANDARD
     
     full_code = str(full_code).strip()
-    
-    # Patterns to match standard codes (IEC, IS, ISO, CISPR)
-    patterns = [
-        (r'(IEC)\s*(\d+[-\s]?\d*[-\s]?\d*[-\s]?\d*)', 'IEC'),
-        (r'(IS)\s*(\d+[-\s]?\d*[-\s]?\d*[-\s]?\d*)', 'IS'),
-        (r'(ISO)\s*(\d+[-\s]?\d*[-\s]?\d*[-\s]?\d*)', 'ISO'),
-        (r'(CISPR)[-\s]?(\d+[-\s]?\d*[-\s]?\d*[-\s]?\d*)', 'CISPR'),
-    ]
-    
     standard_upper = full_code.upper()
     
-    for pattern, body in patterns:
-        match = re.search(pattern, standard_upper)
+    # Try to extract year (first 4-digit number)
+    year_match = YEAR_RE.search(full_code)
+    year = year_match.group(1) if year_match else None
+    
+    for pattern, body in STANDARD_PATTERNS:
+        match = pattern.search(standard_upper)
         if match:
-            code = re.sub(r'\s+', '-', match.group(2).strip())
+            code = WHITESPACE_RE.sub('-', match.group(2).strip())
             standard_code = f"{body} {code}".strip()
-            
-            # Try to extract year (4-digit number at end)
-            year_match = re.search(r'(\d{4})', full_code)
-            year = year_match.group(1) if year_match else None
-            
             return (body, standard_code, year, full_code)
     
     # If no pattern matches, use full_code as standard_code
     # Normalize spaces and special chars
-    standard_code = re.sub(r'\s+', ' ', full_code).strip()
+    standard_code = WHITESPACE_RE.sub(' ', full_code).strip()
     if len(standard_code) > 100:  # Truncate if too long
         standard_code = standard_code[:100]
     
@@ -46,13 +45,58 @@ def parse_standard(full_code):
         if parts:
             body = parts[0]
     
-    # Extract year
-    year_match = re.search(r'(\d{4})', full_code)
-    year = year_match.group(1) if year_match else None
-    
     return (body, standard_code, year, full_code)
 
 
+# typed: 1 and 1.0 stringify differently, so they must not share an entry
+_parse_standard_cached = lru_cache(maxsize=65536, typed=True)(_parse_standard)
+
+
+def parse_standard(full_code):
+    """
+    Parse standard string to extract body, code, and year.
+    Returns: (standard_body, standard_code, year, full_code)
+    Results are LRU-cached, so repeated codes are parsed once.
+    """
+    try:
+        return _parse_standard_cached(full_code)
+    except TypeError:
+        return _parse_standard(full_code)  # unhashable input
+
+
+def parse_standards(values):
+    """
+    Batch version of parse_standard for a column of raw standards (list or Series).
+    Distinct values are parsed once and mapped back.
+    Returns a list of (standard_body, standard_code, year, full_code) in input order.
+    """
+    values = list(values)
+    parsed = {}
+    for value in values:
+        if type(value) is str and value not in parsed:
+            parsed[value] = _parse_standard(value)
+    return [
+        parsed[value] if type(value) is str else parse_standard(value)
+        for value in values
+    ]
+
+
+@lru_cache(maxsize=4096)
+def canonical_standard(value):
+    """
+    Canonical form of a user-supplied standard for matching against
+    standards.standard_code, e.g. "iec60068 2 1" -> "IEC 60068-2-1".
+    Text that is not a recognised standard code is only whitespace-normalized.
+    """
+    value = (value or '').strip()
+    if not value:
+        return ''
+    body, standard_code, year, full_code = _parse_standard(value)
+    if standard_code == 'UNSPECIFIED':
+        return WHITESPACE_RE.sub(' ', value)
+    return standard_code
+
+
 def get_or_create(cur, table, column, value):
     """
     Safe UPSERT helper.
@@ -0,0 +1,116 @@
+"""
+Grouped lab detail payload in a single round trip, shared by the API
+(/api/labs/<id>?view=grouped) and the Streamlit UI.
+
+One statement reads the lab's capabilities once and lets Postgres build the
+whole payload (json_agg), nested domain -> standard -> tests, so domain_name
+and the standard fields appear once per group instead of on every capability
+row:
+
+{
+    "lab": {"lab_id", "lab_name", "created_at", "updated_at"},
+    "total_capabilities", "test_count", "standard_count",
+    "domains": [
+        {"domain_name", "capability_count", "test_count", "standard_count",
+         "standards": [{"standard_code", "full_code", "standard_body", "tests": [...]}]}
+    ]
+}
+
+Domains are ordered by capability count, standards by code, tests by name.
+"""
+
+# %(lab_id)s placeholder; prepared statements substitute $1 (LAB_DETAIL_SQL % {"lab_id": "$1::int"})
+LAB_DETAIL_SQL = """
+    WITH lab AS (
+        SELECT lab_id, lab_name, created_at, updated_at
+        FROM labs
+        WHERE lab_id = %(lab_id)s AND deleted_at IS NULL
+    ),
+    caps AS (
+        SELECT
+            d.domain_name,
+            lc.standard_id,
+            s.standard_code,
+            s.full_code,
+            s.standard_body,
+            lc.test_id,
+            t.test_name
+        FROM lab_capabilities lc
+        JOIN lab ON lab.lab_id = lc.lab_id
+        JOIN tests t ON t.test_id = lc.test_id
+        JOIN standards s ON s.standard_id = lc.standard_id
+        JOIN domains d ON d.domain_id = lc.domain_id
+    ),
+    by_standard AS (
+        SELECT
+            domain_name,
+            standard_code,
+            full_code,
+            standard_body,
+            COUNT(*) AS capability_count,
+            json_agg(test_name ORDER BY test_name) AS tests
+        FROM caps
+        GROUP BY domain_name, standard_id, standard_code, full_code, standard_body
+    ),
+    by_domain AS (
+        SELECT
+            domain_name,
+            SUM(capability_count)::int AS capability_count,
+            COUNT(*) AS standard_count,
+            json_agg(
+                json_build_object(
+                    'standard_code', standard_code,
+                    'full_code', full_code,
+                    'standard_body', standard_body,
+                    'tests', tests
+                ) ORDER BY standard_code, full_code
+            ) AS standards
+        FROM by_standard
+        GROUP BY domain_name
+    ),
+    domain_tests AS (
+        SELECT domain_name, COUNT(DISTINCT test_id) AS test_count
+        FROM caps
+        GROUP BY domain_name
+    )
+    SELECT json_build_object(
+        'lab', row_to_json(lab),
+        'total_capabilities', (SELECT COUNT(*) FROM caps),
+        'test_count', (SELECT COUNT(DISTINCT test_id) FROM caps),
+        'standard_count', (SELECT COUNT(DISTINCT standard_id) FROM caps),
+        'domains', COALESCE((
+            SELECT json_agg(
+                json_build_object(
+                    'domain_name', bd.domain_name,
+                    'capability_count', bd.capability_count,
+                    'test_count', dt.test_count,
+                    'standard_count', bd.standard_count,
+                    'standards', bd.standards
+                ) ORDER BY bd.capability_count DESC, bd.domain_name
+            )
+            FROM by_domain bd
+            JOIN domain_tests dt ON dt.domain_name = bd.domain_name
+        ), '[]'::json)
+    )
+    FROM lab
+"""
+
+
+def fetch_lab_detail(cur, lab_id):
+    """Grouped detail payload of an active lab, or None. cur must be a plain (tuple) cursor."""
+    cur.execute(LAB_DETAIL_SQL, {"lab_id": lab_id})
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def capability_table(detail):
+    """Flat capabilities (one row per domain/standard/test) of a grouped payload, as a DataFrame."""
+    import pandas as pd
+
+    rows = [
+        (test_name, standard["standard_code"], standard["full_code"], standard["standard_body"], domain["domain_name"])
+        for domain in detail["domains"]
+        for standard in domain["standards"]
+        for test_name in standard["tests"]
+    ]
+    return pd.DataFrame(rows, columns=["test_name", "standard_code", "full_code", "standard_body", "domain_name"])
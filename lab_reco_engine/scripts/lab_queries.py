@@ -0,0 +1,517 @@
+"""
+Read-side queries shared by the API (api/recommendation_api.py) and the
+Streamlit UI (ui/app.py).
+
+LabQueries runs every query through a ConnectionPool (scripts/db_pool.py):
+fixed queries are registered as prepared statements (STATEMENTS), each call
+checks a connection out only for its own duration, and results are returned as
+plain dicts/lists, ready for jsonify or st.dataframe.
+
+Everything here only changes when the pipeline publishes a new build, so the
+front-ends cache results per build_id(): the API in its ResponseCache
+(scripts/response_cache.py), the UI with st.cache_data keyed by the build id.
+"""
+
+import threading
+import time
+
+from psycopg2.extras import RealDictCursor
+
+from .build_statistics import current_statistics
+from .db_pool import ConnectionPool
+from .entity_resolution import canonical_standard
+from .lab_details import LAB_DETAIL_SQL
+from .lab_search import (
+    STANDARD_CONDITION, estimate_total, fetch_page, installed_search_modes, iter_rows, set_similarity_threshold
+)
+from .response_cache import BuildVersion
+
+# Shared credentials (same as build_capabilities.get_db_connection)
+DB_CONFIG = {
+    "dbname": "lab_reco_engine",
+    "user": "postgres",
+    "password": "2003",
+    "host": "localhost",
+    "port": 5432,
+}
+
+# How often search_modes re-checks whether pg_trgm is installed
+SEARCH_MODES_CHECK_SECONDS = 60.0
+
+# Fixed queries, prepared once per pooled connection (EXECUTE name (...))
+STATEMENTS = {
+    "active_lab_count": """
+        SELECT COUNT(*) FROM labs WHERE deleted_at IS NULL
+    """,
+    "lab_info": """
+        SELECT lab_id, lab_name, created_at, updated_at
+        FROM labs
+        WHERE lab_id = $1::int AND deleted_at IS NULL
+    """,
+    "lab_capabilities": """
+        SELECT
+            t.test_name,
+            s.standard_code,
+            s.full_code,
+            s.standard_body,
+            d.domain_name
+        FROM lab_capabilities lc
+        JOIN tests t ON t.test_id = lc.test_id
+        JOIN standards s ON s.standard_id = lc.standard_id
+        JOIN domains d ON d.domain_id = lc.domain_id
+        WHERE lc.lab_id = $1::int
+        ORDER BY d.domain_name, t.test_name
+    """,
+    "lab_domain_summary": """
+        SELECT
+            d.domain_name,
+            COUNT(*) AS capability_count
+        FROM lab_capabilities lc
+        JOIN domains d ON d.domain_id = lc.domain_id
+        WHERE lc.lab_id = $1::int
+        GROUP BY d.domain_id, d.domain_name
+        ORDER BY capability_count DESC
+    """,
+    # Grouped lab detail (scripts/lab_details.py); the _text variant returns the
+    # JSON as text so the API can pass it through without re-serializing it
+    "lab_detail": LAB_DETAIL_SQL % {"lab_id": "$1::int"},
+    "lab_detail_text": (
+        "SELECT payload::text FROM (" + LAB_DETAIL_SQL % {"lab_id": "$1::int"} + ") detail(payload)"
+    ),
+    "labs_by_name": """
+        SELECT
+            l.lab_id,
+            l.lab_name,
+            COUNT(lc.lab_id) AS capability_count
+        FROM labs l
+        LEFT JOIN lab_capabilities lc ON lc.lab_id = l.lab_id
+        WHERE l.deleted_at IS NULL
+          AND LOWER(l.lab_name) LIKE LOWER($1::text)
+        GROUP BY l.lab_id, l.lab_name
+        ORDER BY capability_count DESC, l.lab_name
+        LIMIT $2::int
+    """,
+    "labs_all": """
+        SELECT
+            l.lab_id,
+            l.lab_name,
+            COUNT(lc.lab_id) AS capability_count
+        FROM labs l
+        LEFT JOIN lab_capabilities lc ON lc.lab_id = l.lab_id
+        WHERE l.deleted_at IS NULL
+        GROUP BY l.lab_id, l.lab_name
+        ORDER BY capability_count DESC, l.lab_name
+        LIMIT $1::int
+    """,
+    "domains": """
+        SELECT
+            domain_id,
+            domain_name,
+            total_capabilities,
+            lab_count
+        FROM mv_domain_summary
+        ORDER BY total_capabilities DESC
+    """,
+    "tests_like": """
+        SELECT
+            t.test_id,
+            t.test_name,
+            COUNT(DISTINCT lc.lab_id) AS lab_count
+        FROM tests t
+        JOIN lab_capabilities lc ON lc.test_id = t.test_id
+        JOIN labs l ON l.lab_id = lc.lab_id
+        WHERE LOWER(t.test_name) LIKE LOWER($1::text)
+          AND l.deleted_at IS NULL
+        GROUP BY t.test_id, t.test_name
+        ORDER BY lab_count DESC, t.test_name
+        LIMIT $2::int
+    """,
+    "tests_similarity": """
+        WITH matches AS (
+            SELECT
+                t.test_id,
+                t.test_name,
+                word_similarity(LOWER($1::text), LOWER(t.test_name)) AS similarity
+            FROM tests t
+            WHERE LOWER($1::text) <% LOWER(t.test_name)
+        )
+        SELECT
+            m.test_id,
+            m.test_name,
+            ROUND(m.similarity::numeric, 3) AS similarity,
+            COUNT(DISTINCT lc.lab_id) AS lab_count
+        FROM matches m
+        JOIN lab_capabilities lc ON lc.test_id = m.test_id
+        JOIN labs l ON l.lab_id = lc.lab_id
+        WHERE l.deleted_at IS NULL
+        GROUP BY m.test_id, m.test_name, m.similarity
+        ORDER BY m.similarity DESC, lab_count DESC, m.test_name
+        LIMIT $2::int
+    """,
+    "test_lab_names": """
+        SELECT lc.test_id AS id, array_agg(DISTINCT l.lab_name ORDER BY l.lab_name) AS lab_names
+        FROM lab_capabilities lc
+        JOIN labs l ON l.lab_id = lc.lab_id
+        WHERE lc.test_id = ANY($1::int[])
+          AND l.deleted_at IS NULL
+        GROUP BY lc.test_id
+    """,
+    "standards_like": """
+        SELECT
+            s.standard_id,
+            s.standard_code,
+            s.full_code,
+            s.standard_body,
+            ss.lab_count
+        FROM standards s
+        JOIN mv_standard_summary ss ON ss.standard_id = s.standard_id
+        WHERE """ + STANDARD_CONDITION % ("$1::text", "$2::text") + """
+        ORDER BY ss.lab_count DESC, s.standard_code
+        LIMIT $3::int
+    """,
+    "standards_similarity": """
+        WITH matches AS (
+            SELECT
+                s.standard_id,
+                s.standard_code,
+                s.full_code,
+                s.standard_body,
+                GREATEST(
+                    word_similarity(LOWER($1::text), LOWER(s.standard_code)),
+                    word_similarity(LOWER($1::text), LOWER(s.full_code))
+                ) AS similarity
+            FROM standards s
+            WHERE LOWER($1::text) <% LOWER(s.standard_code)
+               OR LOWER($1::text) <% LOWER(s.full_code)
+        )
+        SELECT
+            m.standard_id,
+            m.standard_code,
+            m.full_code,
+            m.standard_body,
+            ROUND(m.similarity::numeric, 3) AS similarity,
+            ss.lab_count
+        FROM matches m
+        JOIN mv_standard_summary ss ON ss.standard_id = m.standard_id
+        ORDER BY m.similarity DESC, ss.lab_count DESC, m.standard_code
+        LIMIT $2::int
+    """,
+    "standard_lab_names": """
+        SELECT lc.standard_id AS id, array_agg(DISTINCT l.lab_name ORDER BY l.lab_name) AS lab_names
+        FROM lab_capabilities lc
+        JOIN labs l ON l.lab_id = lc.lab_id
+        WHERE lc.standard_id = ANY($1::int[])
+          AND l.deleted_at IS NULL
+        GROUP BY lc.standard_id
+    """,
+    # Domain-only recommendations: the per-lab/domain summary already holds the aggregates
+    "recommend_domain": """
+        SELECT
+            lab_id,
+            lab_name,
+            test_count AS matching_tests,
+            standard_count AS matching_standards,
+            1 AS matching_domains,
+            capability_count AS total_matches,
+            test_names[1:5] AS sample_tests,
+            standard_codes[1:5] AS sample_standards,
+            (test_count * 10 + standard_count * 5 + 1) AS relevance_score
+        FROM mv_lab_domain_summary
+        WHERE domain_name = $1::text
+        ORDER BY (test_count * 10 + standard_count * 5) DESC, test_count DESC, standard_count DESC
+        LIMIT $2::int
+    """,
+}
+
+
+def create_pool(size=None):
+    """Connection pool over DB_CONFIG with STATEMENTS registered."""
+    return ConnectionPool(DB_CONFIG, size=size, statements=STATEMENTS)
+
+
+class LabQueries:
+    """
+    Query service over a pool. alias_graph (scripts/standard_aliases.py)
+    resolves standard alias classes; matrix_service (scripts/recommender.py),
+    when given, serves recommend() from memory once its matrix is loaded.
+    """
+
+    def __init__(self, pool, alias_graph, matrix_service=None):
+        self.pool = pool
+        self.alias_graph = alias_graph
+        self.matrix_service = matrix_service
+        self.build_version = BuildVersion(pool.connection)
+        self._search_modes = None
+        self._search_modes_checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def search_modes(self):
+        """
+        Search modes the database serves: "like", plus "similarity" when pg_trgm
+        is installed (db/trigram.sql). Re-checked at most every
+        SEARCH_MODES_CHECK_SECONDS, so installing the extension needs no restart.
+        """
+        with self._lock:
+            if (self._search_modes is not None
+                    and time.monotonic() - self._search_modes_checked_at < SEARCH_MODES_CHECK_SECONDS):
+                return self._search_modes
+
+        with self.pool.connection() as conn:
+            modes = installed_search_modes(conn)
+        with self._lock:
+            self._search_modes = modes
+            self._search_modes_checked_at = time.monotonic()
+        return modes
+
+    def _check_mode(self, mode):
+        if mode not in self.search_modes:
+            raise ValueError(f"mode {mode} needs the pg_trgm extension (db/trigram.sql)")
+
+    def build_id(self):
+        """Latest published build id (re-read at most once a second)."""
+        return self.build_version.current()
+
+    def backend_status(self):
+        """Serving backend details for the health check."""
+        return {
+            "backend": "postgres",
+            "database": "connected",
+            "pool": self.pool.stats(),
+            "search_modes": list(self.search_modes),
+        }
+
+    def _fetch(self, name, params=(), one=False):
+        with self.pool.connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            try:
+                self.pool.execute(cur, name, params)
+                if one:
+                    row = cur.fetchone()
+                    return dict(row) if row else None
+                return [dict(row) for row in cur.fetchall()]
+            finally:
+                cur.close()
+
+    def active_lab_count(self):
+        return self._fetch("active_lab_count", one=True)["count"]
+
+    def statistics(self, history=0):
+        """
+        Statistics snapshot of the latest build with deltas against the previous
+        build (scripts/build_statistics.py), computed live before the first one.
+        """
+        with self.pool.connection() as conn:
+            cur = conn.cursor()
+            try:
+                return current_statistics(cur, history)
+            finally:
+                cur.close()
+
+    def domains(self):
+        """Domains with capability and lab counts, largest first."""
+        return self._fetch("domains")
+
+    def labs_by_name(self, query=None, limit=100):
+        """Active labs whose name contains query (all labs if empty), largest first."""
+        query = (query or "").strip()
+        if query:
+            return self._fetch("labs_by_name", (f"%{query}%", limit))
+        return self._fetch("labs_all", (limit,))
+
+    def lab_detail(self, lab_id):
+        """Grouped lab detail (scripts/lab_details.py), or None."""
+        with self.pool.connection() as conn:
+            cur = conn.cursor()
+            try:
+                self.pool.execute(cur, "lab_detail", (lab_id,))
+                row = cur.fetchone()
+            finally:
+                cur.close()
+        return row[0] if row else None
+
+    def lab_detail_json(self, lab_id):
+        """Grouped lab detail as JSON text, or None."""
+        with self.pool.connection() as conn:
+            cur = conn.cursor()
+            try:
+                self.pool.execute(cur, "lab_detail_text", (lab_id,))
+                row = cur.fetchone()
+            finally:
+                cur.close()
+        return row[0] if row else None
+
+    def lab_detail_flat(self, lab_id):
+        """Lab info, one row per capability and a domain summary, or None."""
+        with self.pool.connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            try:
+                self.pool.execute(cur, "lab_info", (lab_id,))
+                lab = cur.fetchone()
+                if not lab:
+                    return None
+                self.pool.execute(cur, "lab_capabilities", (lab_id,))
+                capabilities = cur.fetchall()
+                self.pool.execute(cur, "lab_domain_summary", (lab_id,))
+                domain_summary = cur.fetchall()
+            finally:
+                cur.close()
+
+        return {
+            "lab": dict(lab),
+            "capabilities": [dict(c) for c in capabilities],
+            "domain_summary": [dict(d) for d in domain_summary],
+            "total_capabilities": len(capabilities),
+        }
+
+    def _with_lab_names(self, cur, rows, id_column, statement):
+        """Add the sorted names of the active labs offering each row's test/standard."""
+        if not rows:
+            return rows
+        self.pool.execute(cur, statement, ([row[id_column] for row in rows],))
+        names = {row["id"]: row["lab_names"] for row in cur.fetchall()}
+        for row in rows:
+            row["lab_names"] = names.get(row[id_column], [])
+        return rows
+
+    def search_tests(self, query, limit=20, mode="like", threshold=0.3, lab_names=False):
+        """Tests matching query by substring or (mode=similarity) word similarity."""
+        self._check_mode(mode)
+        with self.pool.connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            try:
+                if mode == "similarity":
+                    set_similarity_threshold(cur, threshold)
+                    self.pool.execute(cur, "tests_similarity", (query, limit))
+                else:
+                    self.pool.execute(cur, "tests_like", (f"%{query}%", limit))
+                rows = [dict(row) for row in cur.fetchall()]
+                if lab_names:
+                    self._with_lab_names(cur, rows, "test_id", "test_lab_names")
+            finally:
+                cur.close()
+        return rows
+
+    def search_standards(self, query, limit=20, mode="like", threshold=0.3, lab_names=False):
+        """
+        Standards matching query (canonicalized first, e.g. "iec60068" -> "IEC 60068"):
+        by code including alias classes, or (mode=similarity) by word similarity.
+        """
+        self._check_mode(mode)
+        query = canonical_standard(query)
+        with self.pool.connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            try:
+                if mode == "similarity":
+                    set_similarity_threshold(cur, threshold)
+                    self.pool.execute(cur, "standards_similarity", (query, limit))
+                else:
+                    self.pool.execute(
+                        cur, "standards_like", (f"%{query}%", self.alias_graph.class_key(query), limit)
+                    )
+                rows = [dict(row) for row in cur.fetchall()]
+                if lab_names:
+                    self._with_lab_names(cur, rows, "standard_id", "standard_lab_names")
+            finally:
+                cur.close()
+        return rows
+
+    def search_labs(self, search, cursor=None, limit=50):
+        """
+        One keyset page of a LabSearch (scripts/lab_search.py) with its total
+        estimate: {"results", "next_cursor", "total_estimate", "total_estimate_source"}.
+        Raises ValueError for an invalid cursor or a mode the database does not serve.
+        """
+        self._check_mode(search.mode)
+        with self.pool.connection() as conn:
+            page = fetch_page(conn, search, cursor, limit)
+            page["total_estimate"], page["total_estimate_source"] = estimate_total(conn, search)
+        return page
+
+    def iter_search_rows(self, search, cursor=None, limit=None):
+        """Stream all rows of a LabSearch; holds a pooled connection until exhausted or closed."""
+        self._check_mode(search.mode)
+        with self.pool.connection() as conn:
+            yield from iter_rows(conn, search, cursor, limit)
+
+    def recommend(self, test_name="", standard="", domain="", limit=20, engine="matrix"):
+        """
+        Ranked labs for the criteria: {"results", "engine"} (+ "build_id" from
+        the matrix). Scored in memory when the capability matrix is loaded,
+        otherwise (or with engine="sql") from the summary views.
+        """
+        standard = canonical_standard(standard)
+        matrix = self.matrix_service.start().matrix if self.matrix_service else None
+        if matrix is not None and engine != "sql":
+            return {
+                "results": matrix.recommend(test_name, standard, domain, limit),
+                "engine": "matrix",
+                "build_id": matrix.build_id,
+            }
+        return {"results": self.recommend_sql(test_name, standard, domain, limit), "engine": "sql"}
+
+    def recommend_sql(self, test_name="", standard="", domain="", limit=20):
+        """recommend() on mv_capability_search / mv_lab_domain_summary (active labs only)."""
+        if domain and not (test_name or standard):
+            return self._fetch("recommend_domain", (domain, limit))
+
+        # Build conditions on the denormalized capability rows
+        conditions = []
+        params = []
+
+        if test_name:
+            conditions.append(
+                "cs.test_id IN (SELECT t.test_id FROM tests t WHERE LOWER(t.test_name) LIKE LOWER(%s))"
+            )
+            params.append(f"%{test_name}%")
+
+        if standard:
+            conditions.append(
+                f"cs.standard_id IN (SELECT s.standard_id FROM standards s WHERE {STANDARD_CONDITION})"
+            )
+            params.extend([f"%{standard}%", self.alias_graph.class_key(standard)])
+
+        if domain:
+            conditions.append("cs.domain_name = %s")
+            params.append(domain)
+
+        # Calculate scores
+        query = f"""
+            WITH lab_scores AS (
+                SELECT
+                    cs.lab_id,
+                    cs.lab_name,
+                    COUNT(DISTINCT cs.test_id) AS matching_tests,
+                    COUNT(DISTINCT cs.standard_id) AS matching_standards,
+                    COUNT(DISTINCT cs.domain_id) AS matching_domains,
+                    COUNT(*) AS total_matches,
+                    array_agg(DISTINCT cs.test_name) AS test_names,
+                    array_agg(DISTINCT cs.standard_code) AS standard_codes
+                FROM mv_capability_search cs
+                WHERE {' AND '.join(conditions)}
+                GROUP BY cs.lab_id, cs.lab_name
+            )
+            SELECT
+                lab_id,
+                lab_name,
+                matching_tests,
+                matching_standards,
+                matching_domains,
+                total_matches,
+                test_names[1:5] AS sample_tests,
+                standard_codes[1:5] AS sample_standards,
+                (matching_tests * 10 + matching_standards * 5 + matching_domains * 1) AS relevance_score
+            FROM lab_scores
+            WHERE total_matches > 0
+            ORDER BY relevance_score DESC, matching_tests DESC, matching_standards DESC
+            LIMIT %s
+        """
+        params.append(limit)
+
+        with self.pool.connection() as conn:
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            try:
+                cur.execute(query, params)
+                return [dict(row) for row in cur.fetchall()]
+            finally:
+                cur.close()
@@ -0,0 +1,403 @@
+"""
+Lab entity resolution: decide which labs of the cleaned dataset are the same
+lab, and under which name each one is loaded.
+
+Labs are named after their raw CSV, so a lab split over several files
+("AANCHAL TECHNO SOLUTIONS.csv", "AANCHAL TECHNO SOLUTIONS_1.csv") or spelled
+two ways ("... PVT LTD", "... PRIVATE LIMITED") would become separate labs.
+
+Blocking keeps this far from comparing every pair of labs:
+- lab_key(): the name's distinct upper-case tokens, sorted, with the split
+  suffix (_1, _2, ...) stripped and abbreviations spelled out. Labs with the
+  same key are merged without scoring.
+- Sorted neighbourhoods: the keys are sorted three ways (as they are, in
+  name word order, and by their character trigrams rarest first) and only
+  keys within WINDOW places of each other become candidate pairs.
+
+Candidate pairs are scored on name similarity (trigram Jaccard of the keys).
+Pairs that are close enough are also scored on capability overlap: the
+Jaccard of the labs' standard codes, held as bitsets. Files of one lab word
+their tests differently, so tests are not compared; split files divide a
+lab's scope, so overlap only ever counts for a merge. A pair is merged when
+the names differ only by word forms ("TEST"/"TESTING") and the labs share
+standards. Extra words usually name another branch ("UNIT II", a city), so
+such pairs are only logged for review. config/lab_merges.yaml forces or
+prevents merges.
+
+Merged labs form clusters (union-find, as in standard_aliases). Each cluster
+is loaded under one canonical name, without a split suffix;
+data/lab_merges.json maps the other names to it and is applied by the
+capability build.
+
+    python -m scripts.lab_resolution
+"""
+
+import json
+import os
+import re
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+MERGES_PATH = Path("data/lab_merges.json")
+OVERRIDES_PATH = Path(__file__).parent.parent / "config" / "lab_merges.yaml"
+RESOLUTION_LOG_PATH = Path("logs/lab_resolution.csv")
+
+# "<lab>_1.csv", "<lab>_2.csv", ...: further files of the same lab
+SPLIT_SUFFIX_RE = re.compile(r'_\d+$')
+TOKEN_RE = re.compile(r'[A-Z0-9]+')
+
+# Abbreviations spelled out, so both spellings give the same key
+TOKEN_SYNONYMS = {
+    "PVT": "PRIVATE",
+    "PRIV": "PRIVATE",
+    "LTD": "LIMITED",
+    "CO": "COMPANY",
+    "CORP": "CORPORATION",
+    "INC": "INCORPORATED",
+    "LAB": "LABORATORY",
+    "LABS": "LABORATORIES",
+    "CENTER": "CENTRE",
+    "DEPT": "DEPARTMENT",
+    "INTL": "INTERNATIONAL",
+}
+
+# Sorted-neighbourhood window: each key is compared with the next WINDOW keys
+WINDOW = 4
+
+# Capabilities are only compared for pairs whose names are at least this close
+MIN_NAME_SCORE = 0.5
+# Automatic merge: the names differ only by word forms and both scores reach these
+MERGE_NAME_SCORE = 0.75
+MERGE_CAPABILITY_JACCARD = 0.1
+# Pair score: weighted name and capability scores; other pairs reaching
+# REVIEW_SCORE are logged for review
+NAME_WEIGHT = 0.7
+REVIEW_SCORE = 0.6
+
+
+def lab_tokens(name):
+    """Key tokens of a lab name: split suffix stripped, upper-case, abbreviations spelled out."""
+    name = SPLIT_SUFFIX_RE.sub("", str(name).strip()).upper().replace("&", " AND ")
+    return [TOKEN_SYNONYMS.get(token, token) for token in TOKEN_RE.findall(name)]
+
+
+def lab_key(name):
+    """
+    Blocking key of a lab name; labs with the same key are the same lab, e.g.
+    "Yathva Energy Solutions Pvt. Ltd._1" -> "ENERGY LIMITED PRIVATE SOLUTIONS YATHVA".
+    """
+    return " ".join(sorted(set(lab_tokens(name))))
+
+
+def word_forms_only(tokens_a, tokens_b):
+    """
+    True when the token sets differ only by word forms: every token missing
+    from one side starts, or is the start of, a token missing from the other
+    ("PETROCHEMICAL"/"PETROCHEMICALS", "TEST"/"TESTING").
+    """
+    only_a, only_b = tokens_a - tokens_b, tokens_b - tokens_a
+
+    def covered(tokens, others):
+        return all(
+            any(token.startswith(other) or other.startswith(token) for other in others)
+            for token in tokens
+        )
+
+    return bool(only_a) and covered(only_a, only_b) and covered(only_b, only_a)
+
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def bitset_jaccard(a, b):
+    """Jaccard similarity of two sets held as int bitsets."""
+    union = bin(a | b).count("1")
+    return bin(a & b).count("1") / union if union else 0.0
+
+
+class _Clusters:
+    """Union-find over hashable items."""
+
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        self.parent.setdefault(item, item)
+        root = item
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[item] != root:
+            self.parent[item], item = root, self.parent[item]
+        return root
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[root_b] = root_a
+
+    def groups(self):
+        members = {}
+        for item in self.parent:
+            members.setdefault(self.find(item), []).append(item)
+        return list(members.values())
+
+
+def candidate_pairs(keys, spellings, window=WINDOW):
+    """
+    Sorted-neighbourhood blocking over distinct keys: (i, j) index pairs, i < j,
+    of keys within window places of each other when sorted on the key itself,
+    on spellings[i] (its tokens in name word order), or on its trigrams rarest
+    first. Trigrams no other key has are left out of that sort key, so keys
+    sharing a rare trigram sort together.
+    """
+    grams = [trigrams(key) for key in keys]
+    frequency = Counter(gram for key_grams in grams for gram in key_grams)
+
+    def rarest_first(key_grams):
+        shared = [gram for gram in key_grams if frequency[gram] > 1]
+        return "".join(sorted(shared, key=lambda gram: (frequency[gram], gram)))
+
+    sort_keys = [
+        keys,
+        spellings,
+        [rarest_first(key_grams) for key_grams in grams],
+    ]
+
+    pairs = set()
+    for values in sort_keys:
+        order = sorted(range(len(keys)), key=values.__getitem__)
+        for position, i in enumerate(order):
+            for j in order[position + 1:position + 1 + window]:
+                pairs.add((i, j) if i < j else (j, i))
+    return pairs, grams
+
+
+def _bitsets(capability_sets, components):
+    """
+    Int bitsets of capability sets. Bits are numbered per component (labs that
+    are compared with each other), so a bitset is only as wide as the distinct
+    capabilities of its component.
+    """
+    vocabularies = {}
+    bitsets = {}
+    for index, capabilities in capability_sets.items():
+        vocabulary = vocabularies.setdefault(components[index], {})
+        bits = bytearray((len(vocabulary) + len(capabilities)) // 8 + 1)
+        for capability in capabilities:
+            bit = vocabulary.setdefault(capability, len(vocabulary))
+            bits[bit >> 3] |= 1 << (bit & 7)
+        bitsets[index] = int.from_bytes(bits, "little")
+    return bitsets
+
+
+def resolve_labs(lab_names, capabilities_of, overrides=None, window=WINDOW):
+    """
+    Decide which of lab_names are the same lab.
+
+    capabilities_of(lab_name) returns the lab's set of capabilities (standard
+    codes); it is only called for labs in candidate pairs whose names are
+    close. overrides is {"merge": {lab_name: canonical name}, "distinct":
+    [[lab_name, lab_name], ...]} (config/lab_merges.yaml); distinct pairs are
+    never merged with each other directly.
+
+    Returns (merges, decisions, stats): merges maps every lab name loaded under
+    another name to that canonical name; decisions are the merged and review
+    pairs with their scores.
+    """
+    overrides = overrides or {}
+    forced = {
+        str(name).strip(): str(target).strip()
+        for name, target in (overrides.get("merge") or {}).items()
+    }
+    distinct = {
+        frozenset(str(name).strip().lower() for name in pair)
+        for pair in overrides.get("distinct") or []
+    }
+
+    def separate(a, b):
+        return frozenset((a.lower(), b.lower())) in distinct
+
+    clusters = _Clusters()
+    decisions = []
+
+    # Same key: the same lab without scoring
+    by_key = {}
+    for name in lab_names:
+        by_key.setdefault(lab_key(name), []).append(name)
+    for key, names in by_key.items():
+        clusters.find(names[0])
+        for name in names[1:]:
+            if not separate(names[0], name):
+                clusters.union(names[0], name)
+                decisions.append({
+                    "lab_name": name, "other": names[0], "name_score": 1.0,
+                    "capability_jaccard": None, "score": None, "decision": "merge",
+                    "reason": "name_key",
+                })
+
+    # Candidate pairs of distinct keys, scored on name first
+    keys = sorted(key for key in by_key if key)
+    spellings = [" ".join(lab_tokens(by_key[key][0])) for key in keys]
+    pairs, grams = candidate_pairs(keys, spellings, window)
+    close = []
+    for i, j in pairs:
+        shared = len(grams[i] & grams[j])
+        name_score = shared / (len(grams[i]) + len(grams[j]) - shared)
+        if name_score >= MIN_NAME_SCORE:
+            close.append((i, j, name_score))
+
+    # Capabilities of the keys in close pairs only, as bitsets
+    components = _Clusters()
+    for i, j, _ in close:
+        components.union(i, j)
+    capability_sets = {
+        index: set().union(*(capabilities_of(name) for name in by_key[keys[index]]))
+        for index in components.parent
+    }
+    bitsets = _bitsets(capability_sets, {index: components.find(index) for index in capability_sets})
+
+    for i, j, name_score in sorted(close):
+        a, b = by_key[keys[i]][0], by_key[keys[j]][0]
+        capability_jaccard = bitset_jaccard(bitsets[i], bitsets[j])
+        score = NAME_WEIGHT * name_score + (1 - NAME_WEIGHT) * capability_jaccard
+
+        if (word_forms_only(set(keys[i].split()), set(keys[j].split()))
+                and name_score >= MERGE_NAME_SCORE
+                and capability_jaccard >= MERGE_CAPABILITY_JACCARD and not separate(a, b)):
+            clusters.union(a, b)
+            decision = "merge"
+        elif score >= REVIEW_SCORE:
+            decision = "review"
+        else:
+            continue
+        decisions.append({
+            "lab_name": b, "other": a, "name_score": round(name_score, 3),
+            "capability_jaccard": round(capability_jaccard, 3), "score": round(score, 3),
+            "decision": decision, "reason": "similar",
+        })
+
+    for name, target in forced.items():
+        clusters.union(target, name)
+        decisions.append({
+            "lab_name": name, "other": target, "name_score": None,
+            "capability_jaccard": None, "score": None, "decision": "merge", "reason": "override",
+        })
+
+    # Canonical name of a cluster: an override target, else its longest (most
+    # spelled-out) name, preferring names without a split suffix. The suffix is
+    # a file name artifact, so it is dropped: a lab's _1 file alone loads as
+    # the lab too.
+    targets = set(forced.values())
+    present = set(lab_names)
+    merges = {}
+    for members in clusters.groups():
+        best = min(members, key=lambda name: (
+            name not in targets, SPLIT_SUFFIX_RE.search(name) is not None, -len(name), name
+        ))
+        canonical = best if best in targets else SPLIT_SUFFIX_RE.sub("", best).strip()
+        merges.update({name: canonical for name in members if name != canonical and name in present})
+
+    stats = {
+        "labs": len(present),
+        "keys": len(by_key),
+        "candidate_pairs": len(pairs),
+        "scored_pairs": len(close),
+        "merged": len(merges),
+        "clusters": len(set(merges.values())),
+        "review": sum(1 for decision in decisions if decision["decision"] == "review"),
+    }
+    return merges, decisions, stats
+
+
+def load_overrides(path=OVERRIDES_PATH):
+    """config/lab_merges.yaml, or no overrides when it is missing."""
+    import yaml
+
+    path = Path(path)
+    if not path.exists():
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def load_lab_merges(path=MERGES_PATH):
+    """{lab_name: canonical lab_name} from data/lab_merges.json ({} before the first resolution)."""
+    path = Path(path)
+    if not path.exists():
+        return {}
+    try:
+        return json.loads(path.read_text(encoding="utf-8")).get("merges", {})
+    except (OSError, ValueError) as e:
+        print(f"[WARNING] Could not read {path} ({e}), loading labs unmerged")
+        return {}
+
+
+def save_lab_merges(merges, stats, path=MERGES_PATH):
+    """Write the merge decisions atomically, like the manifest."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "stats": stats,
+        "merges": merges,
+    }
+    tmp_path = path.with_suffix(".json.tmp")
+    tmp_path.write_text(json.dumps(payload, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def run_lab_resolution(cleaned_dir=None, window=WINDOW):
+    """
+    Resolve the labs of the cleaned dataset: write the merge decisions to
+    data/lab_merges.json and every merged or review pair to
+    logs/lab_resolution.csv. Returns {lab_name: canonical lab_name}.
+    """
+    print("Running lab resolution stage")
+
+    import pandas as pd
+
+    from .build_capabilities import CLEANED_DIR, read_capability_rows
+    from .cleaned_dataset import iter_partitions, partition_lab_name
+    from .entity_resolution import parse_standards
+
+    started = time.perf_counter()
+    partitions = {
+        partition_lab_name(partition).strip(): partition
+        for partition in iter_partitions(cleaned_dir or CLEANED_DIR)
+    }
+
+    def capabilities_of(lab_name):
+        standards = [standard for test, standard in read_capability_rows(partitions[lab_name])]
+        return {parsed[1] for parsed in parse_standards(standards)} - {"UNSPECIFIED"}
+
+    merges, decisions, stats = resolve_labs(list(partitions), capabilities_of, load_overrides(), window)
+    save_lab_merges(merges, stats)
+
+    RESOLUTION_LOG_PATH.parent.mkdir(exist_ok=True)
+    pd.DataFrame(decisions, columns=[
+        "lab_name", "other", "name_score", "capability_jaccard", "score", "decision", "reason"
+    ]).to_csv(RESOLUTION_LOG_PATH, index=False)
+
+    print(
+        f"  Labs: {stats['labs']}, candidate pairs: {stats['candidate_pairs']}, "
+        f"scored on capabilities: {stats['scored_pairs']}, for review: {stats['review']}"
+    )
+    print(
+        f"[OK] Lab resolution completed in {time.perf_counter() - started:.1f}s: "
+        f"{stats['merged']} lab names loaded as {stats['clusters']} labs"
+    )
+    return merges
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Find duplicate labs in data/cleaned and write data/lab_merges.json")
+    parser.add_argument("--window", type=int, default=WINDOW, help="sorted-neighbourhood window")
+    args = parser.parse_args()
+
+    run_lab_resolution(window=args.window)
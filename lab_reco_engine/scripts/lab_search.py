@@ -0,0 +1,294 @@
+"""
+Keyset-paginated lab capability search, shared by the API (/api/labs/search)
+and the Streamlit UI.
+
+Rows are the active capabilities of mv_capability_search (db/summaries.sql),
+ordered by (lab_name, test_name, lab_id). test_id and standard_id complete the
+key: (lab_id, test_id, standard_id) is the lab_capabilities primary key, so the
+order is total and each page continues strictly after the previous page's
+last row:
+
+    WHERE (lab_name, test_name, lab_id, test_id, standard_id) > (last row)
+    ORDER BY lab_name, test_name, lab_id, test_id, standard_id
+    LIMIT page_size + 1
+
+The keyset indexes on mv_capability_search make every page an index range
+scan, however deep (OFFSET would read and discard all earlier rows). In
+similarity mode rows are ordered by similarity first, and the cursor also
+carries the last row's similarity.
+
+Cursors are opaque tokens: base64 JSON of the last row's sort key and a
+fingerprint of the search criteria, so a cursor only continues the search it
+came from.
+"""
+
+import base64
+import binascii
+import hashlib
+import json
+
+from psycopg2.extras import RealDictCursor
+
+SEARCH_MODES = ("like", "similarity")
+
+# Matches a standard by code or through its alias class (standard_equivalence, built by the pipeline)
+STANDARD_CONDITION = """(
+    LOWER(s.standard_code) LIKE LOWER(%s)
+    OR s.standard_id IN (SELECT standard_id FROM standard_equivalence WHERE class_key = %s)
+)"""
+
+KEY_COLUMNS = ["lab_name", "test_name", "lab_id", "test_id", "standard_id"]
+
+RESULT_COLUMNS = """
+    cs.lab_id,
+    cs.lab_name,
+    cs.test_id,
+    cs.test_name,
+    cs.standard_id,
+    s.standard_code,
+    s.full_code,
+    s.standard_body,
+    cs.domain_name"""
+
+
+class LabSearch:
+    """
+    Search criteria (each optional, at least one required by callers):
+    substring or similarity matches on test name, standard (aliases included
+    in like mode) and lab name, and an exact domain.
+    """
+
+    def __init__(self, test_name="", standard="", lab_name="", domain="",
+                 mode="like", threshold=0.3, class_key=None):
+        self.test_name = test_name
+        self.standard = standard
+        self.lab_name = lab_name
+        self.domain = domain
+        self.mode = mode
+        self.threshold = threshold
+        self.class_key = class_key
+
+    @property
+    def ranked(self):
+        """Whether rows are ordered by similarity (similarity mode with a text criterion)."""
+        return self.mode == "similarity" and any([self.test_name, self.standard, self.lab_name])
+
+    def fingerprint(self):
+        criteria = [self.test_name, self.standard, self.lab_name, self.domain, self.mode]
+        if self.mode == "similarity":
+            criteria.append(self.threshold)
+        return hashlib.sha1(json.dumps(criteria).encode("utf-8")).hexdigest()[:12]
+
+    def _filters(self):
+        """(conditions, params, score expressions, score params) on mv_capability_search cs / standards s."""
+        conditions = []
+        params = []
+        scores = []
+        score_params = []
+
+        if self.mode == "similarity":
+            for term, subquery, column in (
+                (self.test_name, "cs.test_id IN (SELECT t.test_id FROM tests t WHERE LOWER(%s) <%% LOWER(t.test_name))", "cs.test_name"),
+                (self.lab_name, "cs.lab_id IN (SELECT l.lab_id FROM labs l WHERE LOWER(%s) <%% LOWER(l.lab_name))", "cs.lab_name"),
+            ):
+                if term:
+                    conditions.append(subquery)
+                    params.append(term)
+                    scores.append(f"word_similarity(LOWER(%s), LOWER({column}))")
+                    score_params.append(term)
+            if self.standard:
+                conditions.append(
+                    "(LOWER(%s) <%% LOWER(s.standard_code) OR LOWER(%s) <%% LOWER(s.full_code))"
+                )
+                params.extend([self.standard, self.standard])
+                scores.append(
+                    "GREATEST(word_similarity(LOWER(%s), LOWER(s.standard_code)), "
+                    "word_similarity(LOWER(%s), LOWER(s.full_code)))"
+                )
+                score_params.extend([self.standard, self.standard])
+        else:
+            if self.test_name:
+                conditions.append(
+                    "cs.test_id IN (SELECT t.test_id FROM tests t WHERE LOWER(t.test_name) LIKE LOWER(%s))"
+                )
+                params.append(f"%{self.test_name}%")
+            if self.standard:
+                conditions.append(STANDARD_CONDITION)
+                params.extend([f"%{self.standard}%", self.class_key])
+            if self.lab_name:
+                conditions.append(
+                    "cs.lab_id IN (SELECT l.lab_id FROM labs l WHERE LOWER(l.lab_name) LIKE LOWER(%s))"
+                )
+                params.append(f"%{self.lab_name}%")
+
+        if self.domain:
+            conditions.append("cs.domain_name = %s")
+            params.append(self.domain)
+
+        return conditions or ["TRUE"], params, scores, score_params
+
+    def page_query(self, after=None, limit=None):
+        """SQL and params for the rows after sort key after (None: from the start); limit None = all."""
+        conditions, params, scores, score_params = self._filters()
+        key = ", ".join(KEY_COLUMNS)
+
+        if scores:
+            similarity_column = f",\n    (({' + '.join(scores)}) / {len(scores)})::real AS similarity"
+            order_by = f"similarity DESC, {key}"
+        else:
+            similarity_column = ""
+            order_by = key
+
+        keyset = "TRUE"
+        keyset_params = []
+        if after is not None:
+            placeholders = ", ".join(["%s"] * len(KEY_COLUMNS))
+            if scores:
+                keyset = f"(similarity < %s::real OR (similarity = %s::real AND ({key}) > ({placeholders})))"
+                keyset_params = [after[0], after[0]] + list(after[1:])
+            else:
+                keyset = f"({key}) > ({placeholders})"
+                keyset_params = list(after)
+
+        query = f"""
+            WITH matches AS (
+                SELECT {RESULT_COLUMNS}{similarity_column}
+                FROM mv_capability_search cs
+                JOIN standards s ON s.standard_id = cs.standard_id
+                WHERE {' AND '.join(conditions)}
+            )
+            SELECT *
+            FROM matches
+            WHERE {keyset}
+            ORDER BY {order_by}
+            LIMIT %s
+        """
+        return query, score_params + params + keyset_params + [limit]
+
+    def sort_key(self, row):
+        key = [row[column] for column in KEY_COLUMNS]
+        return [row["similarity"]] + key if self.ranked else key
+
+    def encode_cursor(self, row):
+        token = json.dumps({"f": self.fingerprint(), "k": self.sort_key(row)}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(token.encode("utf-8")).decode("ascii").rstrip("=")
+
+    def decode_cursor(self, token):
+        """Sort key of a cursor from encode_cursor(); ValueError if invalid or from another search."""
+        try:
+            padded = token + "=" * (-len(token) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+            fingerprint, key = data["f"], data["k"]
+        except (binascii.Error, ValueError, KeyError, TypeError, UnicodeError):
+            raise ValueError("Invalid cursor")
+        if fingerprint != self.fingerprint():
+            raise ValueError("Cursor belongs to a different search")
+        if not isinstance(key, list) or len(key) != len(KEY_COLUMNS) + self.ranked:
+            raise ValueError("Invalid cursor")
+        return key
+
+
+def installed_search_modes(conn):
+    """SEARCH_MODES the database serves: similarity needs the pg_trgm extension."""
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        installed = cur.fetchone() is not None
+    finally:
+        cur.close()
+    return SEARCH_MODES if installed else ("like",)
+
+
+def set_similarity_threshold(cur, threshold):
+    """Set the <% operator threshold for the current transaction only."""
+    cur.execute(
+        "SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)",
+        (str(threshold),)
+    )
+
+
+def fetch_page(conn, search, cursor=None, limit=50):
+    """
+    One page of results: {"results", "next_cursor"}; next_cursor is None on the
+    last page. Raises ValueError for an invalid cursor.
+    """
+    after = search.decode_cursor(cursor) if cursor else None
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    try:
+        if search.mode == "similarity":
+            set_similarity_threshold(cur, search.threshold)
+        query, params = search.page_query(after, limit + 1)
+        cur.execute(query, params)
+        rows = [dict(row) for row in cur.fetchall()]
+    finally:
+        cur.close()
+
+    next_cursor = search.encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return {"results": rows[:limit], "next_cursor": next_cursor}
+
+
+def estimate_total(conn, search):
+    """
+    Cheap row count estimate: (count, source). Domain-only and standard-only
+    (like mode) searches add up exact counts from mv_domain_summary /
+    mv_standard_summary; anything else uses the planner's row estimate for the
+    filter (no rows are read).
+    """
+    criteria = [name for name in ("test_name", "standard", "lab_name", "domain") if getattr(search, name)]
+    cur = conn.cursor()
+    try:
+        if criteria == ["domain"]:
+            cur.execute("SELECT total_capabilities FROM mv_domain_summary WHERE domain_name = %s", (search.domain,))
+            row = cur.fetchone()
+            return (row[0] if row else 0), "summary"
+        if criteria == ["standard"] and search.mode == "like":
+            cur.execute(
+                f"""
+                SELECT COALESCE(SUM(ss.capability_count), 0)
+                FROM standards s
+                JOIN mv_standard_summary ss ON ss.standard_id = s.standard_id
+                WHERE {STANDARD_CONDITION}
+                """,
+                (f"%{search.standard}%", search.class_key)
+            )
+            return int(cur.fetchone()[0]), "summary"
+
+        conditions, params, _, _ = search._filters()
+        cur.execute(
+            f"""
+            EXPLAIN (FORMAT JSON)
+            SELECT 1
+            FROM mv_capability_search cs
+            JOIN standards s ON s.standard_id = cs.standard_id
+            WHERE {' AND '.join(conditions)}
+            """,
+            params
+        )
+        plan = cur.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"]), "planner"
+    finally:
+        cur.close()
+
+
+def iter_rows(conn, search, cursor=None, limit=None, itersize=2000):
+    """
+    Yield result rows (dicts) in page order from a server-side cursor, so an
+    export never holds the whole result in memory. limit None = all rows.
+    """
+    after = search.decode_cursor(cursor) if cursor else None
+    if search.mode == "similarity":
+        setup = conn.cursor()
+        set_similarity_threshold(setup, search.threshold)
+        setup.close()
+
+    cur = conn.cursor(name="lab_search_export", cursor_factory=RealDictCursor)
+    cur.itersize = itersize
+    try:
+        query, params = search.page_query(after, limit)
+        cur.execute(query, params)
+        for row in cur:
+            yield dict(row)
+    finally:
+        cur.close()
@@ -1,28 +1,220 @@
 """
 Main pipeline runner for Lab Recommendation Engine
 Runs:
-1. Lab profiling
-2. Data normalization
-3. Capability building
+1. Data normalization into the Parquet dataset data/cleaned
+2. Lab profiling (from the dataset's Parquet metadata)
+3. Lab resolution: duplicate labs merged under one name (scripts/lab_resolution.py)
+4. Capability building
+5. Serving snapshot (scripts/snapshot.py), rewritten when a new build was published
+
+Runs are incremental: data/manifest.json records each raw CSV's hash and what
+every stage produced from it, so only new or changed files are processed and
+removed files retire their labs. A lab merged from several files is rebuilt
+from all of them when any of them changes. Use --full to rebuild everything:
+every lab is reloaded from scratch and labs without a current file are retired.
 """
 
+import argparse
+import shutil
+from pathlib import Path
+
 from scripts.profile_labs import run_profile_labs
 from scripts.normalize_rows import run_normalization
-from scripts.build_capabilities import run_capabilities
+from scripts.cleaned_dataset import CLEANED_DIR, iter_partitions, partition_dir, partition_lab_name
+from scripts.build_capabilities import (
+    run_capabilities,
+    reset_labs,
+    retire_labs,
+    retire_other_labs,
+    refresh_standard_equivalence,
+    refresh_summaries,
+)
+from scripts.manifest import (
+    MANIFEST_VERSION,
+    load_manifest,
+    save_manifest,
+    scan_files,
+    pending_files,
+    removed_files,
+    record_stage,
+    file_sha256,
+)
+from scripts.lab_resolution import run_lab_resolution
+from scripts.snapshot import DEFAULT_SNAPSHOT_PATH, publish_snapshot
+from scripts.standard_aliases import ALIASES_PATH
+
+RAW_DIR = Path("data/raw_csvs")
+
+
+def _loaded_lab(entry):
+    """Lab a file's capabilities were loaded into, or None if they were not loaded."""
+    return entry.get("stages", {}).get("capabilities", {}).get("lab_name")
+
+
+def _retire_removed(manifest, fingerprints):
+    removed = removed_files(manifest, fingerprints)
+    if not removed:
+        return False
+
+    print(f"▶ Retiring {len(removed)} removed files")
+    files = manifest["files"]
+    labs = {_loaded_lab(files[name]) or Path(name).stem for name in removed}
+    for name in removed:
+        shutil.rmtree(partition_dir(Path(name).stem, CLEANED_DIR), ignore_errors=True)
+        del files[name]
+
+    # A merged lab keeps its other files: they are reloaded into the reset lab
+    kept = set()
+    for entry in files.values():
+        if _loaded_lab(entry) in labs:
+            entry["stages"]["capabilities"]["sha256"] = None
+            kept.add(_loaded_lab(entry))
+    retire_labs(sorted(labs - kept))
+    save_manifest(manifest)
+    return True
+
+
+def run_pipeline(full=False, mode="bulk", snapshot=True):
+    """
+    Run normalization, profiling, lab resolution and capability building, then
+    publish the serving snapshot unless snapshot is False.
+    Without full, each stage only sees files whose content changed since it
+    last ran; lab resolution always sees every lab.
+    """
+    manifest = {"version": MANIFEST_VERSION, "files": {}} if full else load_manifest()
+    fingerprints = scan_files(RAW_DIR, manifest)
+
+    if full:
+        # No manifest to find removed files: drop partitions without a raw CSV
+        stems = {Path(name).stem for name in fingerprints}
+        for partition in iter_partitions(CLEANED_DIR):
+            if partition_lab_name(partition) not in stems:
+                shutil.rmtree(partition, ignore_errors=True)
+        retired = False
+    else:
+        retired = _retire_removed(manifest, fingerprints)
+    aliases_sha256 = file_sha256(ALIASES_PATH)
+
+    def paths(names):
+        return [fingerprints[name]["path"] for name in names]
+
+    print("▶ Step 1: Normalizing raw data")
+    pending = pending_files(manifest, fingerprints, "normalize")
+    if pending:
+        results = run_normalization(files=paths(pending))
+        for result in results:
+            if result["error"] is None:
+                record_stage(
+                    manifest, result["file"], fingerprints[result["file"]], "normalize",
+                    rows=result["rows"],
+                    output=str(partition_dir(Path(result["file"]).stem, CLEANED_DIR))
+                )
+        save_manifest(manifest)
+    else:
+        print("[OK] Cleaned files up to date")
+
+    # Files that failed to normalize have no partition yet
+    normalized = set(pending_files(manifest, fingerprints, "normalize"))
+
+    print("▶ Step 2: Profiling labs")
+    pending = [
+        name for name in pending_files(manifest, fingerprints, "profile")
+        if name not in normalized
+    ]
+    if pending:
+        logs = run_profile_labs(files=None if full else paths(pending))
+        profiled = {log["file"]: log for log in logs}
+        for name in pending:
+            if name in profiled:
+                record_stage(manifest, name, fingerprints[name], "profile", rows=profiled[name]["rows"])
+        save_manifest(manifest)
+    else:
+        print("[OK] Lab profiles up to date")
+
+    print("▶ Step 3: Resolving duplicate labs")
+    merges = run_lab_resolution()
+
+    def lab_of(name):
+        stem = Path(name).stem.strip()
+        return merges.get(stem, stem)
+
+    print("▶ Step 4: Building lab capabilities")
+    current = [name for name in fingerprints if name not in normalized]
+    loaded = {
+        name: _loaded_lab(manifest["files"][name])
+        for name in current
+        if _loaded_lab(manifest["files"].get(name, {}))
+    }
+    pending = [
+        name for name in pending_files(manifest, fingerprints, "capabilities")
+        if name not in normalized
+    ]
+    # Files whose lab changed with the merge decisions, and the labs they leave and join
+    moved = [name for name, lab in loaded.items() if lab != lab_of(name)]
+    affected = {lab_of(name) for name in pending + moved}
+    affected |= {loaded[name] for name in pending + moved if name in loaded}
+
+    if not full:
+        # A merged lab is rebuilt from all of its files
+        pending = sorted(set(pending) | {name for name in current if lab_of(name) in affected})
+
+    # Retire labs left without files and labs now loaded under another name
+    # (matched case-insensitively, so never one spelling of a live lab)
+    live = {lab_of(name) for name in current}
+    live_keys = {lab.lower() for lab in live}
+    stale = (affected - live) | set(merges)
+    retired = retire_labs(sorted(lab for lab in stale if lab.lower() not in live_keys)) > 0 or retired
+    if full:
+        # Labs of files removed before this run, or never loaded by this tree
+        retired = retire_other_labs(sorted(live)) > 0 or retired
+
+    if pending:
+        # Reloaded labs get their capabilities replaced instead of added to (a
+        # full rebuild reloads every lab) and come back if they were retired
+        reset_labs(sorted(live if full else affected & live))
 
+        processed = run_capabilities(
+            mode=mode, files=[partition_dir(Path(name).stem, CLEANED_DIR) for name in pending]
+        )
+        for name in pending:
+            if name in processed:
+                record_stage(
+                    manifest, name, fingerprints[name], "capabilities",
+                    lab_name=processed[name]["lab_name"], rows=processed[name]["rows"]
+                )
+    else:
+        print("[OK] No new or changed files, capabilities up to date")
+        # run_capabilities refreshes standard_equivalence and the summary views
+        # (publishing a new build); otherwise redo the equivalence only when the
+        # aliases changed, and publish a build if labs were retired or aliases changed
+        aliases_changed = manifest.get("standard_aliases_sha256") != aliases_sha256
+        if aliases_changed:
+            refresh_standard_equivalence()
+        if retired or aliases_changed:
+            refresh_summaries()
 
-def main():
-    print("🚀 Pipeline started")
+    manifest["standard_aliases_sha256"] = aliases_sha256
+    save_manifest(manifest)
 
-    print("▶ Step 1: Profiling labs")
-    run_profile_labs()
+    if snapshot:
+        print("▶ Step 5: Publishing serving snapshot")
+        publish_snapshot(DEFAULT_SNAPSHOT_PATH)
 
-    print("▶ Step 2: Normalizing raw data")
-    run_normalization()
 
-    print("▶ Step 3: Building lab capabilities")
-    run_capabilities()
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the lab recommendation data pipeline")
+    parser.add_argument(
+        "--full", action="store_true",
+        help="ignore data/manifest.json and reprocess every raw CSV"
+    )
+    parser.add_argument(
+        "--no-snapshot", action="store_true",
+        help=f"do not write the serving snapshot ({DEFAULT_SNAPSHOT_PATH})"
+    )
+    args = parser.parse_args(argv)
 
+    print("🚀 Pipeline started" + (" (full rebuild)" if args.full else ""))
+    run_pipeline(full=args.full, snapshot=not args.no_snapshot)
     print("✅ Pipeline completed successfully")
 
 
@@ -0,0 +1,108 @@
+"""
+Build manifest for incremental pipeline runs.
+
+data/manifest.json records, per raw CSV, its content hash, size and mtime plus
+what each stage produced from that exact content. A stage only needs to process
+files whose current hash differs from the hash it last recorded.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+
+MANIFEST_PATH = Path("data/manifest.json")
+# 2: data/cleaned became a Parquet dataset, so files are normalized again
+MANIFEST_VERSION = 2
+
+STAGES = ("profile", "normalize", "capabilities")
+
+
+def load_manifest(path=MANIFEST_PATH):
+    """Load the manifest, or an empty one if missing/unreadable/outdated."""
+    path = Path(path)
+    if path.exists():
+        try:
+            manifest = json.loads(path.read_text(encoding="utf-8"))
+            if manifest.get("version") == MANIFEST_VERSION:
+                return manifest
+            print(f"[WARNING] Manifest version changed, rebuilding {path}")
+        except (OSError, ValueError) as e:
+            print(f"[WARNING] Could not read {path} ({e}), rebuilding it")
+    return {"version": MANIFEST_VERSION, "files": {}}
+
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    """Write the manifest atomically (a crash mid-write keeps the previous one)."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    manifest["updated_at"] = datetime.now(timezone.utc).isoformat()
+    tmp_path = path.with_suffix(".json.tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_files(raw_dir, manifest):
+    """
+    Fingerprint every CSV in raw_dir.
+    The hash is reused when size and mtime match the manifest, so unchanged
+    files are not re-read.
+    Returns {file_name: {"sha256", "size", "mtime", "path"}}.
+    """
+    known = manifest.get("files", {})
+    fingerprints = {}
+
+    for file in sorted(Path(raw_dir).glob("*.csv")):
+        stat = file.stat()
+        entry = known.get(file.name, {})
+        if entry.get("size") == stat.st_size and entry.get("mtime") == stat.st_mtime:
+            sha256 = entry["sha256"]
+        else:
+            sha256 = file_sha256(file)
+        fingerprints[file.name] = {
+            "sha256": sha256,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+            "path": str(file),
+        }
+
+    return fingerprints
+
+
+def pending_files(manifest, fingerprints, stage):
+    """Files whose current content has not been processed by stage yet."""
+    files = manifest.get("files", {})
+    return [
+        name
+        for name, fp in fingerprints.items()
+        if files.get(name, {}).get("stages", {}).get(stage, {}).get("sha256") != fp["sha256"]
+    ]
+
+
+def removed_files(manifest, fingerprints):
+    """Files recorded in the manifest that no longer exist in the raw directory."""
+    return sorted(set(manifest.get("files", {})) - set(fingerprints))
+
+
+def record_stage(manifest, fingerprint_name, fingerprint, stage, **outputs):
+    """Mark stage as done for the file's current content, with its outputs/row counts."""
+    entry = manifest.setdefault("files", {}).setdefault(fingerprint_name, {})
+    entry.update({
+        "sha256": fingerprint["sha256"],
+        "size": fingerprint["size"],
+        "mtime": fingerprint["mtime"],
+    })
+    entry.setdefault("stages", {})[stage] = {
+        "sha256": fingerprint["sha256"],
+        "completed_at": datetime.now(timezone.utc).isoformat(),
+        **outputs,
+    }
@@ -1,6 +1,13 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
 import pandas as pd
 from pathlib import Path
 
+from .cleaned_dataset import CLEANED_DIR, write_partition
+
 # -------------------------------------------------
 # COLUMN ALIAS MAP (CANONICALIZATION)
 # -------------------------------------------------
@@ -47,55 +54,80 @@ COLUMN_ALIASES = {
 }
 
 
+# Flattened (variant, canonical) pairs in COLUMN_ALIASES order: the first
+# canonical with a matching variant wins, exactly like the nested loop did
+ALIAS_VARIANTS = [
+    (variant, canonical)
+    for canonical, variants in COLUMN_ALIASES.items()
+    for variant in variants
+]
+
+
 # -------------------------------------------------
 # NORMALIZE HEADERS USING THE MAP
 # -------------------------------------------------
-def normalize_columns(df):
-    """Normalize column names to canonical schema using alias map."""
-    new_columns = {}
-
-    for col in df.columns:
-        col_clean = (
-            str(col)
-            .strip()
-            .lower()
-            .replace("/", " ")
-            .replace("-", " ")
-            .replace("&", "and")
-        )
+@lru_cache(maxsize=None)
+def canonical_column(col):
+    """Map one raw header to its canonical name (headers repeat across labs, so cached)."""
+    col_clean = (
+        str(col)
+        .strip()
+        .lower()
+        .replace("/", " ")
+        .replace("-", " ")
+        .replace("&", "and")
+    )
+
+    for variant, canonical in ALIAS_VARIANTS:
+        if variant in col_clean:
+            return canonical
+
+    return col_clean.replace(" ", "_")
+
+
+def alias_coverage(columns):
+    """
+    How a raw header maps onto COLUMN_ALIASES: {"matched": {canonical: first raw
+    header}, "missing": [canonical columns with no header], "unmatched": [raw
+    headers that map to no canonical column]}.
+    """
+    matched = {}
+    unmatched = []
+    for column in columns:
+        canonical = canonical_column(column)
+        if canonical in COLUMN_ALIASES:
+            matched.setdefault(canonical, str(column))
+        else:
+            unmatched.append(str(column))
+    return {
+        "matched": matched,
+        "missing": [canonical for canonical in COLUMN_ALIASES if canonical not in matched],
+        "unmatched": unmatched,
+    }
 
-        matched = False
-
-        for canonical, variants in COLUMN_ALIASES.items():
-            for v in variants:
-                if v in col_clean:
-                    new_columns[col] = canonical
-                    matched = True
-                    break
-            if matched:
-                break
-
-        if not matched:
-            new_columns[col] = col_clean.replace(" ", "_")
 
+def normalize_columns(df):
+    """Normalize column names to canonical schema using alias map."""
+    new_columns = {col: canonical_column(col) for col in df.columns}
     return df.rename(columns=new_columns)
 
 
-def run_normalization():
-    print("Running normalization stage")
-
-    RAW_DIR = Path("data/raw_csvs")
-    OUTPUT_DIR = Path("data/cleaned")
-    OUTPUT_DIR.mkdir(exist_ok=True)
-
-    for file in RAW_DIR.glob("*.csv"):
-        print("READING:", file.name)
+def normalize_file(file, output_dir):
+    """
+    Normalize one raw lab CSV into its partition of the cleaned dataset in
+    output_dir (scripts/cleaned_dataset.py).
+    Never raises: returns a result dict with rows, seconds and error (None on success).
+    """
+    started = time.perf_counter()
+    result = {"file": Path(file).name, "rows": 0, "seconds": 0.0, "error": None}
 
+    try:
         # 1️⃣ Read WITHOUT headers
         df = pd.read_csv(file, header=None)
 
         # 2️⃣ Use row 1 as header
         df.columns = df.iloc[1]
+        source_columns = ["" if pd.isna(column) else str(column) for column in df.columns]
 
         # 3️⃣ Drop first two rows (junk + header row)
         df = df.iloc[2:].reset_index(drop=True)
@@ -103,13 +135,103 @@ def run_normalization():
         # 4️⃣ Normalize column names to canonical schema
         df = normalize_columns(df)
 
-        # 5️⃣ Add lab_name
-        df["lab_name"] = file.stem
+        # 5️⃣ Write the lab's partition (canonical columns, typed; lab_name is the partition key)
+        result["rows"] = write_partition(
+            df, Path(file).stem, Path(file).name, source_columns, output_dir
+        )
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+
+def default_workers():
+    """Worker count from LAB_RECO_NORMALIZE_WORKERS, else the CPU count."""
+    configured = os.environ.get("LAB_RECO_NORMALIZE_WORKERS")
+    if configured:
+        return max(1, int(configured))
+    return os.cpu_count() or 1
+
+
+def print_timing_summary(results, slowest=10):
+    """Print totals, failures and the slowest files; write logs/normalization_timings.csv."""
+    ok = [r for r in results if r["error"] is None]
+    failed = [r for r in results if r["error"] is not None]
+    total_seconds = sum(r["seconds"] for r in results)
 
-        # 6️⃣ Write CLEAN CSV (with REAL headers)
-        output_file = OUTPUT_DIR / file.name
-        df.to_csv(output_file, index=False, header=True, encoding="utf-8")
+    print(f"  Files: {len(results)} ({len(ok)} ok, {len(failed)} failed), "
+          f"rows: {sum(r['rows'] for r in ok)}, file time: {total_seconds:.1f}s")
 
-        print("[OK] Written cleaned file:", output_file.name)
+    if results:
+        print("  Slowest files:")
+        for r in sorted(results, key=lambda r: r["seconds"], reverse=True)[:slowest]:
+            print(f"    {r['seconds']:7.2f}s  {r['rows']:>7} rows  {r['file']}")
 
-    print("[OK] Normalization completed")
+    for r in failed:
+        print(f"[ERROR] {r['file']}: {r['error']}")
+
+    logs_dir = Path("logs")
+    logs_dir.mkdir(exist_ok=True)
+    pd.DataFrame(results, columns=["file", "rows", "seconds", "error"]).to_csv(
+        logs_dir / "normalization_timings.csv", index=False
+    )
+
+
+def run_normalization(workers=None, files=None):
+    """
+    Normalize data/raw_csvs into the Parquet dataset data/cleaned.
+
+    workers > 1 runs files in a process pool (default: default_workers()).
+    Files are processed and reported in sorted order, so output does not depend
+    on the worker count. A failing file is reported and skipped. Returns the
+    per-file result dicts.
+    """
+    print("Running normalization stage")
+
+    RAW_DIR = Path("data/raw_csvs")
+    OUTPUT_DIR = CLEANED_DIR
+    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+
+    if files is None:
+        files = RAW_DIR.glob("*.csv")
+    files = sorted(files, key=lambda f: Path(f).name)
+
+    workers = default_workers() if workers is None else max(1, workers)
+    workers = min(workers, len(files)) or 1
+    started = time.perf_counter()
+
+    if workers == 1:
+        results = map(normalize_file, files, [OUTPUT_DIR] * len(files))
+        executor = None
+    else:
+        print(f"  Using {workers} worker processes")
+        executor = ProcessPoolExecutor(max_workers=workers)
+        results = executor.map(normalize_file, files, [OUTPUT_DIR] * len(files), chunksize=4)
+
+    collected = []
+    try:
+        for result in results:
+            collected.append(result)
+            if result["error"] is None:
+                print("[OK] Written cleaned partition:", result["file"])
+            else:
+                print(f"[ERROR] Failed to normalize {result['file']}: {result['error']}")
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    print_timing_summary(collected)
+    print(f"[OK] Normalization completed in {time.perf_counter() - started:.1f}s")
+    return collected
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Normalize raw lab CSVs into the Parquet dataset data/cleaned")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes (default: LAB_RECO_NORMALIZE_WORKERS or CPU count)")
+    args = parser.parse_args()
+
+    run_normalization(workers=args.workers)
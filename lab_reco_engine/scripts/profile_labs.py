@@ -1,33 +1,184 @@
-def run_profile_labs():
-    print("Running lab profiling stage")
+"""
+Lab profiling: rows, header columns and size per lab file, and how each header
+maps onto the canonical columns (normalize_rows.COLUMN_ALIASES), written to
+logs/lab_profile.csv. Files with missing canonical columns or unmatched headers
+(alias gaps) are summarized at the end.
+
+Two sources, neither of which parses cell data:
+- "dataset" (the pipeline's step 2): the Parquet footers of the cleaned dataset
+  (scripts/cleaned_dataset.py), written by normalization.
+- "raw": the raw CSVs, without normalizing them. Only the junk row and the
+  header row are parsed (normalize_rows uses row 1 as the header). Records are
+  counted by a buffered scan for newlines outside quoted fields.
+
+    python -m scripts.profile_labs          # cleaned dataset
+    python -m scripts.profile_labs --raw    # raw CSVs
+"""
+
+import csv
+from collections import Counter
+from itertools import islice
+from pathlib import Path
+
+RAW_DIR = Path("data/raw_csvs")
+PROFILE_PATH = Path("logs/lab_profile.csv")
+
+# Raw CSVs: row 0 is junk, row 1 the header, records follow
+HEADER_ROW = 1
+
+SCAN_CHUNK_SIZE = 1 << 20
+
+
+def sniff_header(path):
+    """Header row of a raw CSV (parses the first two records only)."""
+    with open(path, newline="", encoding="utf-8-sig", errors="replace") as f:
+        rows = list(islice(csv.reader(f), HEADER_ROW + 1))
+    if len(rows) <= HEADER_ROW:
+        raise ValueError("no header row")
+    return rows[HEADER_ROW]
+
+
+def count_records(path, chunk_size=SCAN_CHUNK_SIZE):
+    """
+    CSV records in a file: newlines outside quoted fields, plus a last line
+    without a newline. Quotes are tracked across chunks; escaped quotes ("")
+    toggle twice and cancel out.
+    """
+    records = 0
+    quoted = False
+    last = b"\n"
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            if not quoted and b'"' not in chunk:
+                records += chunk.count(b"\n")
+            else:
+                for index, segment in enumerate(chunk.split(b'"')):
+                    if index:
+                        quoted = not quoted
+                    if not quoted:
+                        records += segment.count(b"\n")
+            last = chunk[-1:]
+    if last != b"\n":
+        records += 1
+    return records
+
+
+def profile_raw_file(path):
+    path = Path(path)
+    return {
+        "file": path.name,
+        "rows": max(count_records(path) - (HEADER_ROW + 1), 0),
+        "columns": sniff_header(path),
+        "bytes": path.stat().st_size,
+    }
+
+
+def profile_partition(partition):
+    from .cleaned_dataset import partition_metadata
+
+    info = partition_metadata(partition)
+    return {
+        "file": info["source_file"],
+        "rows": info["rows"],
+        "columns": info["source_columns"],
+        "bytes": info["bytes"],
+    }
+
+
+def print_coverage_summary(logs, top=10):
+    """Files mapping every canonical column, then the most common gaps."""
+    from .normalize_rows import COLUMN_ALIASES
+
+    profiled = [log for log in logs if "error" not in log]
+    complete = sum(1 for log in profiled if not log["missing_columns"])
+    print(f"  Alias coverage: {complete}/{len(profiled)} files map all {len(COLUMN_ALIASES)} canonical columns")
+
+    missing = Counter(column for log in profiled for column in log["missing_columns"])
+    if missing:
+        print("  Missing canonical columns: " + ", ".join(
+            f"{column} ({count} files)" for column, count in missing.most_common()
+        ))
+    unmatched = Counter(column for log in profiled for column in set(log["unmatched_columns"]))
+    if unmatched:
+        print("  Unmatched headers: " + ", ".join(
+            f"{column!r} ({count} files)" for column, count in unmatched.most_common(top)
+        ))
+
+
+def run_profile_labs(files=None, source="dataset"):
+    """
+    Profile labs into logs/lab_profile.csv from the cleaned dataset's Parquet
+    footers (source="dataset", after normalization) or from the raw CSVs
+    (source="raw"). Each entry also records the canonical columns matched,
+    missing and the unmatched headers.
+    When files (raw CSV paths) is given, only those are profiled and their
+    entries replace the matching ones in the existing profile log. Returns the
+    new log entries.
+    """
+    print(f"Running lab profiling stage ({source})")
 
     import pandas as pd
-    from pathlib import Path
 
-    folder = Path("data/raw_csvs")
-    logs_dir = Path("logs")
-    logs_dir.mkdir(exist_ok=True)
+    from .cleaned_dataset import CLEANED_DIR, iter_partitions, partition_dir
+    from .normalize_rows import alias_coverage
 
-    logs = []
+    PROFILE_PATH.parent.mkdir(exist_ok=True)
 
-    for file in folder.iterdir():
-        if file.suffix.lower() != ".csv":
-            continue
+    if source == "raw":
+        if files is None:
+            files = (file for file in RAW_DIR.iterdir() if file.suffix.lower() == ".csv")
+        targets = [(file.name, file, profile_raw_file) for file in sorted(Path(f) for f in files)]
+    elif source == "dataset":
+        if files is None:
+            partitions = [(partition.name, partition) for partition in iter_partitions(CLEANED_DIR)]
+        else:
+            partitions = [(Path(f).name, partition_dir(Path(f).stem, CLEANED_DIR)) for f in sorted(files)]
+        targets = [(name, partition, profile_partition) for name, partition in partitions]
+    else:
+        raise ValueError(f"Unknown profiling source: {source}")
 
+    logs = []
+
+    for name, target, profile in targets:
         try:
-            df = pd.read_csv(file)
-            logs.append({
-                "file": file.name,
-                "rows": len(df),
-                "columns": list(df.columns)
+            log = profile(target)
+            coverage = alias_coverage(log["columns"])
+            log.update({
+                "canonical_columns": len(coverage["matched"]),
+                "missing_columns": coverage["missing"],
+                "unmatched_columns": coverage["unmatched"],
             })
+            logs.append(log)
         except Exception as e:
             logs.append({
-                "file": file.name,
+                "file": name,
                 "rows": 0,
                 "columns": [],
                 "error": str(e)
             })
 
-    pd.DataFrame(logs).to_csv(logs_dir / "lab_profile.csv", index=False)
+    profile = pd.DataFrame(logs)
+    if files is not None and PROFILE_PATH.exists():
+        previous = pd.read_csv(PROFILE_PATH)
+        previous = previous[~previous["file"].isin(profile["file"] if len(profile) else [])]
+        profile = pd.concat([previous, profile], ignore_index=True)
+
+    profile.to_csv(PROFILE_PATH, index=False)
+    print_coverage_summary(logs)
     print("[OK] Lab profiling completed")
+    return logs
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Profile lab files into logs/lab_profile.csv")
+    parser.add_argument("--raw", action="store_true",
+                        help="profile data/raw_csvs directly instead of the cleaned dataset")
+    parser.add_argument("files", nargs="*", help="raw CSVs to profile (default: all)")
+    args = parser.parse_args()
+
+    run_profile_labs(files=args.files or None, source="raw" if args.raw else "dataset")
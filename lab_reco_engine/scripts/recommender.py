@@ -0,0 +1,695 @@
+"""
+In-process lab recommendation engine.
+
+Active capabilities are loaded into compact sparse matrices (labs x tests,
+labs x standards, labs x domains, plus per-domain slices of the first two), and
+test names and standard codes into token -> column id dictionaries. A query is
+resolved to column ids, scored with sparse vector products (one gather per
+dimension) and ranked with IDF weights, so rare capabilities count for more
+than ones almost every lab has. A query on both a test name and a standard
+needs them on the same capability row, so it is scored from the capability rows
+of the matched tests (or standards, whichever are fewer) instead.
+
+MatrixService keeps the current matrices and swaps in new ones when the
+pipeline publishes a new build (build_versions, see refresh_summaries()).
+"""
+
+import re
+import threading
+import time
+from functools import lru_cache
+
+import numpy as np
+
+# Relative weight of a matched test / standard / domain (same ratio as the SQL scoring)
+TEST_WEIGHT = 10.0
+STANDARD_WEIGHT = 5.0
+DOMAIN_WEIGHT = 1.0
+
+SAMPLE_SIZE = 5
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+# Set bits of every byte value, for popcounts over bitsets
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+def _ranges(starts, lengths):
+    """Concatenation of arange(start, start + length) for every pair."""
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(total)
+
+
+def _positions(ids, values):
+    """Index of each value in ids (every value must be present)."""
+    order = np.argsort(ids, kind="stable")
+    return order[np.searchsorted(ids, values, sorter=order)]
+
+
+def _sample(names, columns):
+    """First SAMPLE_SIZE distinct names of name-ordered columns."""
+    sample = []
+    for column in columns:
+        name = names[column]
+        if not sample or sample[-1] != name:
+            sample.append(name)
+            if len(sample) == SAMPLE_SIZE:
+                break
+    return sample
+
+
+def _popcount(words):
+    """Set bits in each row of a (rows, words) uint64 bitset array."""
+    return _POPCOUNT[words.view(np.uint8)].reshape(len(words), -1).sum(axis=1, dtype=np.int64)
+
+
+def _idf(document_frequency, total):
+    """Smoothed inverse document frequency: ln((N + 1) / (df + 1)) + 1."""
+    return np.log((total + 1.0) / (document_frequency + 1.0)) + 1.0
+
+
+class TokenIndex:
+    """
+    Substring search over names with the semantics of LOWER(name) LIKE '%query%'.
+
+    Every name is split into alphanumeric tokens (token -> column ids). If the
+    query is a substring of a name, each query token lies inside a name token,
+    and a token with separators on both sides within the query is a whole name
+    token. Candidate columns come from exact lookups of those inner tokens (or,
+    without any, from vocabulary tokens containing the edge tokens); only the
+    candidates are checked against the full name.
+    """
+
+    def __init__(self, names):
+        self.names = [str(name).lower() for name in names]
+
+        postings = {}
+        for column, name in enumerate(self.names):
+            for token in set(_TOKEN_RE.findall(name)):
+                postings.setdefault(token, []).append(column)
+        self.tokens = {token: np.array(columns, dtype=np.int32) for token, columns in postings.items()}
+
+        self._expand = lru_cache(maxsize=16384)(self._expand_token)
+        self.match = lru_cache(maxsize=4096)(self._match)
+
+    def _expand_token(self, token):
+        """Columns having a token that contains token."""
+        parts = [columns for candidate, columns in self.tokens.items() if token in candidate]
+        if not parts:
+            return np.empty(0, dtype=np.int32)
+        return np.unique(np.concatenate(parts))
+
+    def _match(self, query):
+        """Sorted column ids whose name contains query (case-insensitive)."""
+        query = query.lower()
+        spans = [(m.group(), m.start(), m.end()) for m in _TOKEN_RE.finditer(query)]
+        inner = [token for token, start, end in spans if start > 0 and end < len(query)]
+
+        if inner:
+            postings = [self.tokens.get(token, np.empty(0, dtype=np.int32)) for token in set(inner)]
+            lookups = sorted(postings, key=len)
+        elif spans:
+            lookups = [self._expand(token) for token, _, _ in spans]
+        else:
+            lookups = None
+
+        if lookups:
+            candidates = lookups[0]
+            for columns in lookups[1:]:
+                if not len(candidates):
+                    break
+                candidates = np.intersect1d(candidates, columns, assume_unique=True)
+        else:
+            candidates = range(len(self.names))
+
+        matches = np.array([c for c in candidates if query in self.names[c]], dtype=np.int32)
+        matches.flags.writeable = False
+        return matches
+
+
+class SparseColumns:
+    """
+    labs x columns matrix of capability counts, stored both column-major (CSC,
+    for scoring a query) and row-major (CSR, for listing a lab's columns).
+    """
+
+    def __init__(self, rows, columns, shape):
+        n_rows, n_columns = shape
+        keys, counts = np.unique(rows.astype(np.int64) * n_columns + columns, return_counts=True)
+        rows = (keys // n_columns).astype(np.int32)
+        columns = (keys % n_columns).astype(np.int32)
+        self.shape = shape
+
+        self.row_ptr = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n_rows), out=self.row_ptr[1:])
+        self.row_columns = columns
+        self.row_capabilities = np.bincount(rows, weights=counts, minlength=n_rows).astype(np.int64)
+
+        order = np.argsort(columns, kind="stable")
+        self.col_ptr = np.zeros(n_columns + 1, dtype=np.int64)
+        np.cumsum(np.bincount(columns, minlength=n_columns), out=self.col_ptr[1:])
+        self.col_rows = rows[order]
+        self.col_counts = counts[order].astype(np.int32)
+
+    @property
+    def nnz(self):
+        return len(self.col_rows)
+
+    def document_frequency(self):
+        """Number of labs having each column."""
+        return np.diff(self.col_ptr)
+
+    def gather(self, columns, weights):
+        """
+        Multiply by the query vector (weights on columns). Returns, per lab,
+        the weighted score, the number of matched columns and the capability
+        rows behind them.
+        """
+        starts = self.col_ptr[columns]
+        lengths = self.col_ptr[columns + 1] - starts
+        index = _ranges(starts, lengths)
+        rows = self.col_rows[index]
+        n_rows = self.shape[0]
+
+        score = np.bincount(rows, weights=np.repeat(weights, lengths), minlength=n_rows)
+        matched = np.bincount(rows, minlength=n_rows)
+        capabilities = np.bincount(rows, weights=self.col_counts[index], minlength=n_rows)
+        return score, matched, capabilities.astype(np.int64)
+
+    def gather_all(self, weights):
+        """gather() over every column, from the row-major arrays."""
+        n_rows = self.shape[0]
+        rows = np.repeat(np.arange(n_rows), np.diff(self.row_ptr))
+        score = np.bincount(rows, weights=weights[self.row_columns], minlength=n_rows)
+        return score, np.diff(self.row_ptr), self.row_capabilities
+
+    def row(self, row):
+        """Sorted column ids of a lab."""
+        return self.row_columns[self.row_ptr[row]:self.row_ptr[row + 1]]
+
+
+class RowGroups:
+    """
+    Capability rows (lab row, test, standard, domain column) grouped by one of
+    their columns, so the rows having any of a set of values are one gather.
+    """
+
+    def __init__(self, rows, key, n_keys):
+        self.rows = rows[np.argsort(rows[:, key], kind="stable")]
+        self.ptr = np.zeros(n_keys + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows[:, key], minlength=n_keys), out=self.ptr[1:])
+
+    def count(self, keys):
+        """Number of rows having one of keys."""
+        return int((self.ptr[keys + 1] - self.ptr[keys]).sum())
+
+    def gather(self, keys):
+        """Rows having one of keys."""
+        starts = self.ptr[keys]
+        return self.rows[_ranges(starts, self.ptr[keys + 1] - starts)]
+
+
+class CapabilityMatrix:
+    """Sparse capability matrices of one published build, with recommend()."""
+
+    def __init__(self, build_id, labs, tests, standards, domains, capabilities, alias_graph):
+        """
+        labs: [(lab_id, lab_name)], tests: [(test_id, test_name)],
+        standards: [(standard_id, standard_code, class_key)], domains: [(domain_id, domain_name)],
+        capabilities: int array of (lab_id, test_id, standard_id, domain_id) rows.
+        """
+        self.build_id = build_id
+        self.alias_graph = alias_graph
+
+        # Columns are ordered by name, so a lab's columns come out alphabetically
+        labs = sorted(labs, key=lambda lab: lab[0])
+        tests = sorted(tests, key=lambda test: (test[1], test[0]))
+        standards = sorted(standards, key=lambda standard: (standard[1], standard[0]))
+        domains = sorted(domains, key=lambda domain: domain[1])
+
+        self.lab_ids = np.array([lab[0] for lab in labs], dtype=np.int64)
+        self.lab_names = [lab[1] for lab in labs]
+        self.test_names = [test[1] for test in tests]
+        self.standard_codes = [standard[1] for standard in standards]
+        self.domain_names = [domain[1] for domain in domains]
+        self.domain_index = {name: column for column, name in enumerate(self.domain_names)}
+
+        capabilities = np.asarray(capabilities, dtype=np.int64).reshape(-1, 4)
+        lab_rows = _positions(self.lab_ids, capabilities[:, 0])
+        test_columns = _positions(np.array([t[0] for t in tests], dtype=np.int64), capabilities[:, 1])
+        standard_columns = _positions(np.array([s[0] for s in standards], dtype=np.int64), capabilities[:, 2])
+        domain_columns = _positions(np.array([d[0] for d in domains], dtype=np.int64), capabilities[:, 3])
+
+        n_labs = len(labs)
+        self.tests = SparseColumns(lab_rows, test_columns, (n_labs, len(tests)))
+        self.standards = SparseColumns(lab_rows, standard_columns, (n_labs, len(standards)))
+        self.domains = SparseColumns(lab_rows, domain_columns, (n_labs, len(domains)))
+        self.tests_by_domain = []
+        self.standards_by_domain = []
+        for column in range(len(domains)):
+            mask = domain_columns == column
+            self.tests_by_domain.append(SparseColumns(lab_rows[mask], test_columns[mask], (n_labs, len(tests))))
+            self.standards_by_domain.append(SparseColumns(lab_rows[mask], standard_columns[mask], (n_labs, len(standards))))
+
+        rows = np.stack([lab_rows, test_columns, standard_columns, domain_columns], axis=1).astype(np.int32)
+        self.rows_by_test = RowGroups(rows, 1, len(tests))
+        self.rows_by_standard = RowGroups(rows, 2, len(standards))
+
+        self.test_idf = _idf(self.tests.document_frequency(), n_labs)
+        self.standard_idf = _idf(self.standards.document_frequency(), n_labs)
+        self.domain_idf = _idf(self.domains.document_frequency(), n_labs)
+
+        self.test_index = TokenIndex(self.test_names)
+        self.standard_index = TokenIndex(self.standard_codes)
+        classes = {}
+        for column, standard in enumerate(standards):
+            classes.setdefault(standard[2] or standard[1].strip().upper(), []).append(column)
+        self.standard_classes = {key: np.array(columns, dtype=np.int32) for key, columns in classes.items()}
+
+        self.capability_count = len(capabilities)
+
+    def stats(self):
+        return {
+            "build_id": self.build_id,
+            "labs": len(self.lab_names),
+            "tests": self.tests.shape[1],
+            "standards": self.standards.shape[1],
+            "domains": len(self.domain_names),
+            "capabilities": self.capability_count,
+        }
+
+    def match_tests(self, test_name):
+        """Test columns whose name contains test_name."""
+        return self.test_index.match(test_name)
+
+    def match_standards(self, standard):
+        """Standard columns whose code contains standard, or in its alias class."""
+        columns = self.standard_index.match(standard)
+        equivalent = self.standard_classes.get(self.alias_graph.class_key(standard))
+        if equivalent is not None:
+            columns = np.union1d(columns, equivalent)
+        return columns
+
+    def _matched_domains(self, matrices, columns, weights):
+        """Per lab: number of domains (and their IDF sum) in which it has a matched column."""
+        count = np.zeros(len(self.lab_names), dtype=np.int64)
+        score = np.zeros(len(self.lab_names))
+        for column, matrix in enumerate(matrices):
+            _, matched, _ = matrix.gather(columns, weights)
+            has = matched > 0
+            count += has
+            score += has * self.domain_idf[column]
+        return count, score
+
+    def _evaluate_rows(self, test_columns, standard_columns, domain_column, details):
+        """
+        _evaluate() for a test name and a standard: only capability rows having
+        both a matched test and a matched standard (and the domain) count.
+        """
+        n_labs = len(self.lab_names)
+        if self.rows_by_test.count(test_columns) <= self.rows_by_standard.count(standard_columns):
+            rows = self.rows_by_test.gather(test_columns)
+        else:
+            rows = self.rows_by_standard.gather(standard_columns)
+
+        test_mask = np.zeros(self.tests.shape[1], dtype=bool)
+        test_mask[test_columns] = True
+        standard_mask = np.zeros(self.standards.shape[1], dtype=bool)
+        standard_mask[standard_columns] = True
+        keep = test_mask[rows[:, 1]] & standard_mask[rows[:, 2]]
+        if domain_column is not None:
+            keep &= rows[:, 3] == domain_column
+        rows = rows[keep]
+
+        # The matched rows as matrices of their own: every column in them matched
+        tests = SparseColumns(rows[:, 0], rows[:, 1], self.tests.shape)
+        standards = SparseColumns(rows[:, 0], rows[:, 2], self.standards.shape)
+        domains = SparseColumns(rows[:, 0], rows[:, 3], self.domains.shape)
+        test_score, matching_tests, total_matches = tests.gather_all(self.test_idf)
+        standard_score, matching_standards, _ = standards.gather_all(self.standard_idf)
+        domain_score, matching_domains, _ = domains.gather_all(self.domain_idf)
+
+        match = {
+            "candidates": total_matches > 0,
+            "score": TEST_WEIGHT * test_score + STANDARD_WEIGHT * standard_score + DOMAIN_WEIGHT * domain_score,
+            "matching_tests": matching_tests,
+            "matching_standards": matching_standards,
+            "matching_domains": matching_domains,
+            "total_matches": total_matches,
+            "test_columns": test_columns,
+            "standard_columns": standard_columns,
+        }
+        if details:
+            match["tests"], match["standards"] = tests, standards
+            match["test_mask"] = np.ones(tests.shape[1], dtype=bool)
+            match["standard_mask"] = np.ones(standards.shape[1], dtype=bool)
+        return match
+
+    def _evaluate(self, test_name="", standard="", domain="", details=True):
+        """
+        Score every lab for one test name / standard / domain query.
+
+        Labs must match every given criterion on the same capability row, like
+        the SQL query: a test whose name contains test_name, a standard matching
+        standard (substring or alias class), and the domain. With only a domain,
+        every test and standard of the lab in that domain matches. The score is
+        the IDF-weighted sum of matched tests (x10), standards (x5) and domains
+        (x1); details=False skips the domain breakdown and sample masks.
+        Returns None if nothing can match.
+        """
+        if not (test_name or standard or domain):
+            return None
+
+        n_labs = len(self.lab_names)
+        domain_column = None
+        if domain:
+            domain_column = self.domain_index.get(domain)
+            if domain_column is None:
+                return None
+
+        if domain_column is None:
+            tests, standards = self.tests, self.standards
+        else:
+            tests = self.tests_by_domain[domain_column]
+            standards = self.standards_by_domain[domain_column]
+
+        test_columns = self.match_tests(test_name) if test_name else None
+        standard_columns = self.match_standards(standard) if standard else None
+        if test_columns is not None and standard_columns is not None:
+            return self._evaluate_rows(test_columns, standard_columns, domain_column, details)
+        domain_only = test_columns is None and standard_columns is None
+
+        score = np.zeros(n_labs)
+        candidates = np.ones(n_labs, dtype=bool)
+        matching_tests = np.zeros(n_labs, dtype=np.int64)
+        matching_standards = np.zeros(n_labs, dtype=np.int64)
+        total_matches = None
+
+        if domain_only:
+            test_score, matching_tests, total_matches = tests.gather_all(self.test_idf)
+            standard_score, matching_standards, _ = standards.gather_all(self.standard_idf)
+            score += TEST_WEIGHT * test_score + STANDARD_WEIGHT * standard_score
+            candidates &= matching_tests > 0
+
+        if test_columns is not None:
+            weights = self.test_idf[test_columns]
+            test_score, matching_tests, total_matches = tests.gather(test_columns, weights)
+            score += TEST_WEIGHT * test_score
+            candidates &= matching_tests > 0
+
+        if standard_columns is not None:
+            weights = self.standard_idf[standard_columns]
+            standard_score, matching_standards, capabilities = standards.gather(standard_columns, weights)
+            score += STANDARD_WEIGHT * standard_score
+            candidates &= matching_standards > 0
+            if total_matches is None:
+                total_matches = capabilities
+
+        match = {
+            "candidates": candidates,
+            "score": score,
+            "matching_tests": matching_tests,
+            "matching_standards": matching_standards,
+            "total_matches": total_matches,
+            "test_columns": test_columns,
+            "standard_columns": standard_columns,
+        }
+
+        if domain_column is not None:
+            match["matching_domains"] = np.ones(n_labs, dtype=np.int64)
+            score += DOMAIN_WEIGHT * self.domain_idf[domain_column]
+        elif not details:
+            return match
+        elif test_columns is not None:
+            match["matching_domains"], domain_score = self._matched_domains(
+                self.tests_by_domain, test_columns, self.test_idf[test_columns]
+            )
+            score += DOMAIN_WEIGHT * domain_score
+        else:
+            match["matching_domains"], domain_score = self._matched_domains(
+                self.standards_by_domain, standard_columns, self.standard_idf[standard_columns]
+            )
+            score += DOMAIN_WEIGHT * domain_score
+
+        if details:
+            # Matched columns of each lab, for the samples
+            match["tests"], match["standards"] = tests, standards
+            match["test_mask"] = np.full(tests.shape[1], domain_only)
+            if test_columns is not None:
+                match["test_mask"][test_columns] = True
+            match["standard_mask"] = np.full(standards.shape[1], domain_only)
+            if standard_columns is not None:
+                match["standard_mask"][standard_columns] = True
+        return match
+
+    def recommend(self, test_name="", standard="", domain="", limit=20):
+        """Rank labs for a test name / standard / domain query (see _evaluate)."""
+        match = self._evaluate(test_name, standard, domain)
+        if match is None:
+            return []
+
+        labs = np.flatnonzero(match["candidates"])
+        score = np.round(match["score"], 3)
+        order = np.lexsort((
+            labs,
+            -match["matching_standards"][labs],
+            -match["matching_tests"][labs],
+            -score[labs],
+        ))
+
+        results = []
+        for lab in labs[order[:limit]]:
+            lab_tests = match["tests"].row(lab)
+            lab_standards = match["standards"].row(lab)
+            lab_tests = lab_tests[match["test_mask"][lab_tests]]
+            lab_standards = lab_standards[match["standard_mask"][lab_standards]]
+            results.append({
+                "lab_id": int(self.lab_ids[lab]),
+                "lab_name": self.lab_names[lab],
+                "matching_tests": int(match["matching_tests"][lab]),
+                "matching_standards": int(match["matching_standards"][lab]),
+                "matching_domains": int(match["matching_domains"][lab]),
+                "total_matches": int(match["total_matches"][lab]),
+                "sample_tests": _sample(self.test_names, lab_tests),
+                "sample_standards": _sample(self.standard_codes, lab_standards),
+                "relevance_score": float(score[lab]),
+            })
+        return results
+
+    def cover(self, requirements, limit=20):
+        """
+        Match a list of requirements (dicts with test_name / standard / domain)
+        in one pass: rank labs by how many requirements they cover, and choose
+        a small set of labs that together covers every coverable requirement.
+
+        Each requirement is matched like recommend() (a test name and a
+        standard must be on the same capability row) and sets one bit in a
+        per-lab bitset (uint64 words). Ranking is by covered requirements, then
+        by the summed relevance score. The covering set is greedy: repeatedly
+        take the lab covering the most still-uncovered requirements (ties: higher
+        score), which is within a factor ln(n) of the minimum.
+        """
+        n_labs = len(self.lab_names)
+        hits = np.zeros((n_labs, len(requirements)), dtype=bool)
+        score = np.zeros(n_labs)
+        summary = []
+
+        for index, requirement in enumerate(requirements):
+            match = self._evaluate(
+                requirement.get("test_name", ""),
+                requirement.get("standard", ""),
+                requirement.get("domain", ""),
+                details=False,
+            )
+            entry = {"index": index, **requirement, "lab_count": 0}
+            if match is not None:
+                hits[:, index] = match["candidates"]
+                score += np.where(match["candidates"], match["score"], 0.0)
+                entry["lab_count"] = int(match["candidates"].sum())
+                if match["test_columns"] is not None:
+                    entry["matched_tests"] = len(match["test_columns"])
+                if match["standard_columns"] is not None:
+                    entry["matched_standards"] = len(match["standard_columns"])
+            summary.append(entry)
+
+        # Bitsets: bit i of a lab's words is set when it covers requirement i
+        packed = np.packbits(hits, axis=1, bitorder="little")
+        n_words = max(1, -(-packed.shape[1] // 8))
+        padded = np.zeros((n_labs, n_words * 8), dtype=np.uint8)
+        padded[:, :packed.shape[1]] = packed
+        bits = padded.view(np.uint64)
+
+        covered = _popcount(bits)
+        score = np.round(score, 3)
+        labs = np.flatnonzero(covered)
+        order = np.lexsort((labs, -score[labs], -covered[labs]))
+
+        def describe(lab, requirement_hits):
+            return {
+                "lab_id": int(self.lab_ids[lab]),
+                "lab_name": self.lab_names[lab],
+                "requirements": [int(i) for i in np.flatnonzero(requirement_hits)],
+            }
+
+        ranked = []
+        for lab in labs[order[:limit]]:
+            entry = describe(lab, hits[lab])
+            entry["covered"] = int(covered[lab])
+            entry["coverage"] = round(covered[lab] / len(requirements), 3)
+            entry["relevance_score"] = float(score[lab])
+            ranked.append(entry)
+
+        coverable = np.bitwise_or.reduce(bits, axis=0)
+        uncovered = coverable.copy()
+        lab_order = np.arange(n_labs)
+        cover_set = []
+        while uncovered.any():
+            gain = _popcount(bits & uncovered)
+            best = np.lexsort((lab_order, -score, -gain))[0]
+            newly = np.unpackbits((bits[best] & uncovered).view(np.uint8), bitorder="little")
+            cover_set.append(describe(best, newly[:len(requirements)]))
+            uncovered &= ~bits[best]
+
+        coverable_hits = np.unpackbits(coverable.view(np.uint8), bitorder="little")[:len(requirements)]
+        return {
+            "requirements": summary,
+            "labs": ranked,
+            "cover": {
+                "labs": cover_set,
+                "covered": int(coverable_hits.sum()),
+                "uncovered": [int(i) for i in np.flatnonzero(coverable_hits == 0)],
+            },
+        }
+
+
+def current_build_id(conn):
+    """Latest published build id (0 before the first build or on an older schema)."""
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT to_regclass('build_versions') IS NOT NULL")
+        if not cur.fetchone()[0]:
+            return 0
+        cur.execute("SELECT COALESCE(MAX(build_id), 0) FROM build_versions")
+        return cur.fetchone()[0]
+    finally:
+        cur.close()
+
+
+def load_capability_matrix(conn, alias_graph):
+    """
+    Read the latest build's active capabilities and dimension names into a
+    CapabilityMatrix. Everything is read from one snapshot.
+    """
+    conn.rollback()
+    cur = conn.cursor()
+    try:
+        cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+        build_id = current_build_id(conn)
+
+        cur.execute("SELECT lab_id, lab_name FROM labs WHERE deleted_at IS NULL")
+        labs = cur.fetchall()
+
+        cur.execute("""
+            SELECT lc.lab_id, lc.test_id, lc.standard_id, lc.domain_id
+            FROM lab_capabilities lc
+            JOIN labs l ON l.lab_id = lc.lab_id
+            WHERE l.deleted_at IS NULL
+        """)
+        capabilities = np.array(cur.fetchall(), dtype=np.int64).reshape(-1, 4)
+
+        cur.execute("""
+            SELECT t.test_id, t.test_name
+            FROM tests t
+            WHERE EXISTS (SELECT 1 FROM lab_capabilities lc WHERE lc.test_id = t.test_id)
+        """)
+        tests = cur.fetchall()
+
+        cur.execute("""
+            SELECT s.standard_id, s.standard_code, se.class_key
+            FROM standards s
+            LEFT JOIN standard_equivalence se ON se.standard_id = s.standard_id
+            WHERE EXISTS (SELECT 1 FROM lab_capabilities lc WHERE lc.standard_id = s.standard_id)
+        """)
+        standards = cur.fetchall()
+
+        cur.execute("SELECT domain_id, domain_name FROM domains")
+        domains = cur.fetchall()
+    finally:
+        cur.close()
+        conn.rollback()
+
+    return CapabilityMatrix(build_id, labs, tests, standards, domains, capabilities, alias_graph)
+
+
+class MatrixService:
+    """
+    Holds the CapabilityMatrix of the latest published build. A background
+    thread checks build_versions every poll_seconds and loads a new matrix when
+    a newer build appears; the reference is swapped only once it is complete,
+    so requests keep using the old matrix until then.
+
+    connection is a callable returning a context manager that yields a
+    connection, e.g. ConnectionPool.connection (scripts/db_pool.py).
+    """
+
+    def __init__(self, connection, alias_graph, poll_seconds=30):
+        self.connection = connection
+        self.alias_graph = alias_graph
+        self.poll_seconds = poll_seconds
+        self.matrix = None
+        self.loaded_at = None
+        self.load_seconds = None
+        self.last_error = None
+        self._reload_lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Start the reload thread (once)."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="capability-matrix", daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"[WARNING] Capability matrix reload failed: {e}")
+            time.sleep(self.poll_seconds)
+
+    def refresh(self):
+        """Load the latest build if it differs from the current one. Returns True if swapped."""
+        with self._reload_lock:
+            with self.connection() as conn:
+                if self.matrix is not None and self.matrix.build_id == current_build_id(conn):
+                    return False
+                started = time.perf_counter()
+                matrix = load_capability_matrix(conn, self.alias_graph)
+
+            self.matrix = matrix
+            self.load_seconds = round(time.perf_counter() - started, 3)
+            self.loaded_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+            self.last_error = None
+            stats = matrix.stats()
+            print(
+                f"[OK] Capability matrix for build {matrix.build_id} loaded in {self.load_seconds}s "
+                f"({stats['labs']} labs, {stats['capabilities']} capabilities)"
+            )
+            return True
+
+    def status(self):
+        status = {
+            "loaded": self.matrix is not None,
+            "loaded_at": self.loaded_at,
+            "load_seconds": self.load_seconds,
+        }
+        if self.matrix is not None:
+            status.update(self.matrix.stats())
+        if self.last_error:
+            status["last_error"] = self.last_error
+        return status
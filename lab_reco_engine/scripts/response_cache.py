@@ -0,0 +1,165 @@
+"""
+Response cache keyed by the dataset build version.
+
+Reference data (domains, lab details, test/standard search) only changes when
+the pipeline publishes a new build (build_versions, written by
+refresh_summaries() at the end of run_capabilities). Responses are cached per
+(build_id, request key) with no expiry: once a newer build is seen, every entry
+of older builds is dropped at once.
+
+Tiers:
+- in-process LRU (max_entries responses)
+- optional on-disk tier shared by the worker processes of a host
+  (LAB_RECO_CACHE_DIR), one directory per build: <dir>/<build_id>/<sha1>.json
+
+The ETag of a response is derived from (build_id, key), so a matching
+If-None-Match is answered with 304 without reading the cache or the database.
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+DEFAULT_MAX_ENTRIES = 2048
+
+# How often the latest build id is re-read from build_versions
+VERSION_CHECK_SECONDS = 1.0
+
+
+class BuildVersion:
+    """
+    Latest published build id, read from build_versions at most every
+    check_seconds. connection is a callable returning a context manager that
+    yields a connection (e.g. ConnectionPool.connection).
+    """
+
+    def __init__(self, connection, check_seconds=VERSION_CHECK_SECONDS):
+        self.connection = connection
+        self.check_seconds = check_seconds
+        self._build_id = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def current(self):
+        with self._lock:
+            if self._build_id is not None and time.monotonic() - self._checked_at < self.check_seconds:
+                return self._build_id
+
+        from .recommender import current_build_id
+
+        with self.connection() as conn:
+            build_id = current_build_id(conn)
+        with self._lock:
+            self._build_id = build_id
+            self._checked_at = time.monotonic()
+        return build_id
+
+
+class ResponseCache:
+    """Two-tier cache of response bodies (bytes) keyed by (build_id, key)."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, disk_dir=None):
+        self.max_entries = max_entries
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self._entries = OrderedDict()
+        self._build_id = None
+        self._lock = threading.Lock()
+        self._hits = {"memory": 0, "disk": 0}
+        self._misses = 0
+
+    @staticmethod
+    def digest(key):
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    def etag(self, build_id, key):
+        """Entity tag of the response for key in build build_id."""
+        return f"b{build_id}-{self.digest(key)[:20]}"
+
+    def _switch_build(self, build_id):
+        """
+        Move to build_id, dropping everything cached for older builds (caller
+        holds the lock). Returns False for a build older than the current one,
+        which is then neither read nor stored.
+        """
+        if self._build_id is not None and build_id <= self._build_id:
+            return build_id == self._build_id
+        self._entries.clear()
+        self._build_id = build_id
+        if self.disk_dir is not None and self.disk_dir.is_dir():
+            for path in self.disk_dir.iterdir():
+                if path.is_dir() and path.name.isdigit() and int(path.name) < build_id:
+                    shutil.rmtree(path, ignore_errors=True)
+        return True
+
+    def _disk_path(self, build_id, key):
+        return self.disk_dir / str(build_id) / f"{self.digest(key)}.json"
+
+    def get(self, build_id, key):
+        """Cached body, or None."""
+        with self._lock:
+            if not self._switch_build(build_id):
+                self._misses += 1
+                return None
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+                self._hits["memory"] += 1
+                return body
+
+        if self.disk_dir is not None:
+            try:
+                body = self._disk_path(build_id, key).read_bytes()
+            except OSError:
+                body = None
+            if body is not None:
+                with self._lock:
+                    self._hits["disk"] += 1
+                    self._store(build_id, key, body)
+                return body
+
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def _store(self, build_id, key, body):
+        if self._build_id != build_id:
+            return
+        self._entries[key] = body
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def put(self, build_id, key, body):
+        with self._lock:
+            if not self._switch_build(build_id):
+                return
+            self._store(build_id, key, body)
+
+        if self.disk_dir is not None:
+            path = self._disk_path(build_id, key)
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                # Write then rename, so other processes never read a partial file
+                fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(body)
+                os.replace(tmp, path)
+            except OSError as e:
+                print(f"[WARNING] Response cache write failed: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "build_id": self._build_id,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "disk_dir": str(self.disk_dir) if self.disk_dir else None,
+                "hits": dict(self._hits),
+                "misses": self._misses,
+            }
+
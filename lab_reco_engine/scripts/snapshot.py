@@ -0,0 +1,692 @@
+"""
+Read-only SQLite snapshot of a published build, for serving the API and the UI
+without Postgres.
+
+publish_snapshot() (the last pipeline step) copies the latest build into one
+file: active labs, the domains, tests and standards they use (with their
+summary counts and alias classes), the capabilities (mv_capability_search with
+its keyset indexes), trigram full-text indexes for substring search, and the
+build's statistics snapshot. The file is written next to the target and
+renamed over it, so readers only ever see complete snapshots.
+
+SnapshotQueries answers the LabQueries interface (scripts/lab_queries.py) from
+such a file. Set LAB_RECO_SNAPSHOT to its path to serve from it:
+
+    LAB_RECO_SNAPSHOT=data/snapshot.sqlite python api/recommendation_api.py
+
+Each thread opens the file read-only and immutable (no locking) and memory-maps
+it, so any number of replicas can share one copy and start serving at once.
+Publishing a new file at the same path switches readers over within a second.
+Similarity (pg_trgm) search modes need Postgres; snapshots serve mode=like.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from .entity_resolution import canonical_standard
+from .lab_search import STANDARD_CONDITION
+from .recommender import CapabilityMatrix
+
+SNAPSHOT_FORMAT = 1
+DEFAULT_SNAPSHOT_PATH = Path("data/snapshot.sqlite")
+
+# Rows fetched from Postgres per round trip while publishing
+COPY_BATCH = 20000
+
+# Builds of statistics history kept in the snapshot
+STATISTICS_HISTORY = 100
+
+# How often readers check whether a new file was published at their path
+FILE_CHECK_SECONDS = 1.0
+
+MMAP_SIZE = 1 << 30
+
+SCHEMA_SQL = """
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+CREATE TABLE labs (
+    lab_id INTEGER PRIMARY KEY,
+    lab_name TEXT NOT NULL,
+    created_at TEXT,
+    updated_at TEXT,
+    capability_count INTEGER NOT NULL
+);
+
+CREATE TABLE domains (
+    domain_id INTEGER PRIMARY KEY,
+    domain_name TEXT NOT NULL,
+    total_capabilities INTEGER NOT NULL,
+    lab_count INTEGER NOT NULL,
+    test_count INTEGER NOT NULL,
+    standard_count INTEGER NOT NULL
+);
+
+CREATE TABLE tests (
+    test_id INTEGER PRIMARY KEY,
+    test_name TEXT NOT NULL,
+    lab_count INTEGER NOT NULL
+);
+
+CREATE TABLE standards (
+    standard_id INTEGER PRIMARY KEY,
+    standard_code TEXT,
+    full_code TEXT,
+    standard_body TEXT,
+    class_key TEXT,
+    lab_count INTEGER NOT NULL,
+    test_count INTEGER NOT NULL,
+    capability_count INTEGER NOT NULL
+);
+
+-- Same rows as the Postgres view; standard codes are read from standards
+CREATE TABLE mv_capability_search (
+    lab_id INTEGER NOT NULL,
+    lab_name TEXT NOT NULL,
+    domain_id INTEGER NOT NULL,
+    domain_name TEXT NOT NULL,
+    test_id INTEGER NOT NULL,
+    test_name TEXT NOT NULL,
+    standard_id INTEGER NOT NULL
+);
+
+CREATE VIEW standard_equivalence AS
+SELECT standard_id, class_key FROM standards WHERE class_key IS NOT NULL;
+"""
+
+INDEX_SQL = """
+CREATE INDEX idx_capability_search_lab ON mv_capability_search(lab_id);
+CREATE INDEX idx_capability_search_test ON mv_capability_search(test_id);
+CREATE INDEX idx_capability_search_standard ON mv_capability_search(standard_id);
+-- Domain pages walk this index too: with a handful of domains a page is found
+-- within a few thousand entries, not worth a second copy of the names
+CREATE INDEX idx_capability_search_keyset
+ON mv_capability_search(lab_name, test_name, lab_id, test_id, standard_id);
+CREATE INDEX idx_standards_class ON standards(class_key);
+
+-- Substring search: LIKE '%term%' on these tables uses the trigram index
+CREATE VIRTUAL TABLE labs_fts USING fts5(lab_name, content='labs', content_rowid='lab_id', tokenize='trigram');
+INSERT INTO labs_fts(labs_fts) VALUES ('rebuild');
+CREATE VIRTUAL TABLE tests_fts USING fts5(test_name, content='tests', content_rowid='test_id', tokenize='trigram');
+INSERT INTO tests_fts(tests_fts) VALUES ('rebuild');
+CREATE VIRTUAL TABLE standards_fts USING fts5(
+    standard_code, content='standards', content_rowid='standard_id', tokenize='trigram'
+);
+INSERT INTO standards_fts(standards_fts) VALUES ('rebuild');
+
+ANALYZE;
+"""
+
+# (table, columns, Postgres query); rows are active capabilities and what they reference
+COPIES = [
+    (
+        "labs",
+        ["lab_id", "lab_name", "created_at", "updated_at", "capability_count"],
+        """
+        SELECT l.lab_id, l.lab_name, l.created_at, l.updated_at, COUNT(lc.lab_id)
+        FROM labs l
+        LEFT JOIN lab_capabilities lc ON lc.lab_id = l.lab_id
+        WHERE l.deleted_at IS NULL
+        GROUP BY l.lab_id, l.lab_name, l.created_at, l.updated_at
+        """,
+    ),
+    (
+        "domains",
+        ["domain_id", "domain_name", "total_capabilities", "lab_count", "test_count", "standard_count"],
+        """
+        SELECT domain_id, domain_name, total_capabilities, lab_count, test_count, standard_count
+        FROM mv_domain_summary
+        """,
+    ),
+    (
+        "tests",
+        ["test_id", "test_name", "lab_count"],
+        """
+        SELECT t.test_id, t.test_name, COUNT(DISTINCT cs.lab_id)
+        FROM tests t
+        JOIN mv_capability_search cs ON cs.test_id = t.test_id
+        GROUP BY t.test_id, t.test_name
+        """,
+    ),
+    (
+        "standards",
+        ["standard_id", "standard_code", "full_code", "standard_body", "class_key",
+         "lab_count", "test_count", "capability_count"],
+        """
+        SELECT
+            s.standard_id, s.standard_code, s.full_code, s.standard_body, se.class_key,
+            ss.lab_count, ss.test_count, ss.capability_count
+        FROM mv_standard_summary ss
+        JOIN standards s ON s.standard_id = ss.standard_id
+        LEFT JOIN standard_equivalence se ON se.standard_id = s.standard_id
+        """,
+    ),
+    (
+        "mv_capability_search",
+        ["lab_id", "lab_name", "domain_id", "domain_name", "test_id", "test_name", "standard_id"],
+        """
+        SELECT lab_id, lab_name, domain_id, domain_name, test_id, test_name, standard_id
+        FROM mv_capability_search
+        ORDER BY lab_name, test_name, lab_id, test_id, standard_id
+        """,
+    ),
+]
+
+
+def _sqlite_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _copy(conn, lite, table, columns, query):
+    cur = conn.cursor(name=f"snapshot_{table}")
+    cur.itersize = COPY_BATCH
+    insert = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['?'] * len(columns))})"
+    count = 0
+    try:
+        cur.execute(query)
+        while True:
+            rows = cur.fetchmany(COPY_BATCH)
+            if not rows:
+                break
+            lite.executemany(insert, [tuple(_sqlite_value(v) for v in row) for row in rows])
+            count += len(rows)
+    finally:
+        cur.close()
+    return count
+
+
+def read_meta(lite):
+    return {key: json.loads(value) for key, value in lite.execute("SELECT key, value FROM meta")}
+
+
+def snapshot_build_id(path):
+    """Build id of the snapshot at path, or None if there is no readable snapshot."""
+    path = Path(path)
+    if not path.is_file():
+        return None
+    try:
+        lite = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            meta = read_meta(lite)
+        finally:
+            lite.close()
+    except sqlite3.Error:
+        return None
+    if meta.get("format") != SNAPSHOT_FORMAT:
+        return None
+    return meta.get("build_id")
+
+
+def publish_snapshot(path=DEFAULT_SNAPSHOT_PATH, force=False):
+    """
+    Write the latest published build to the snapshot at path. Skipped when the
+    snapshot already holds that build, unless force. Returns the build id.
+    """
+    from .build_capabilities import get_db_connection
+    from .build_statistics import current_statistics
+    from .recommender import current_build_id
+
+    path = Path(path)
+    started = time.perf_counter()
+    conn = get_db_connection()
+    try:
+        # One consistent view of the build for every table
+        conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+        build_id = current_build_id(conn)
+        if not build_id:
+            print("[WARNING] No published build yet, snapshot not written")
+            return None
+        if not force and snapshot_build_id(path) == build_id:
+            print(f"[OK] Snapshot {path} already holds build {build_id}")
+            return build_id
+
+        cur = conn.cursor()
+        cur.execute("SELECT published_at FROM build_versions WHERE build_id = %s", (build_id,))
+        published_at = cur.fetchone()[0]
+        statistics = current_statistics(cur, STATISTICS_HISTORY)
+        cur.close()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        tmp.unlink(missing_ok=True)
+        lite = sqlite3.connect(tmp)
+        try:
+            lite.executescript("PRAGMA journal_mode = OFF; PRAGMA synchronous = OFF;" + SCHEMA_SQL)
+            counts = {
+                table: _copy(conn, lite, table, columns, query)
+                for table, columns, query in COPIES
+            }
+            meta = {
+                "format": SNAPSHOT_FORMAT,
+                "build_id": build_id,
+                "published_at": published_at.isoformat(),
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "counts": counts,
+                "statistics": statistics,
+            }
+            lite.executemany(
+                "INSERT INTO meta (key, value) VALUES (?, ?)",
+                [(key, json.dumps(value, default=str)) for key, value in meta.items()]
+            )
+            lite.executescript(INDEX_SQL)
+            lite.commit()
+        finally:
+            lite.close()
+        os.replace(tmp, path)
+    finally:
+        conn.close()
+
+    size_mb = path.stat().st_size / (1024 * 1024)
+    print(
+        f"[OK] Snapshot of build {build_id} written to {path} in {time.perf_counter() - started:.1f}s "
+        f"({counts['mv_capability_search']} capabilities, {size_mb:.1f} MB)"
+    )
+    return build_id
+
+
+class SnapshotMatrixService:
+    """
+    MatrixService counterpart for a snapshot: the capability matrix is read
+    from the file on first use, and again once a newer file is published.
+    """
+
+    def __init__(self, queries):
+        self.queries = queries
+        self.matrix = None
+        self.loaded_at = None
+        self.load_seconds = None
+        self.last_error = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Load the matrix of the current snapshot if it is not loaded yet."""
+        build_id = self.queries.build_id()
+        if self.matrix is None or self.matrix.build_id != build_id:
+            with self._lock:
+                if self.matrix is None or self.matrix.build_id != build_id:
+                    self._load()
+        return self
+
+    def _load(self):
+        started = time.perf_counter()
+        lite = self.queries.connection()
+        build_id = json.loads(lite.execute("SELECT value FROM meta WHERE key = 'build_id'").fetchone()[0])
+        labs = lite.execute("SELECT lab_id, lab_name FROM labs").fetchall()
+        capabilities = np.array(
+            lite.execute("SELECT lab_id, test_id, standard_id, domain_id FROM mv_capability_search").fetchall(),
+            dtype=np.int64
+        ).reshape(-1, 4)
+        tests = lite.execute("SELECT test_id, test_name FROM tests").fetchall()
+        standards = lite.execute("SELECT standard_id, standard_code, class_key FROM standards").fetchall()
+        domains = lite.execute("SELECT domain_id, domain_name FROM domains").fetchall()
+
+        self.matrix = CapabilityMatrix(
+            build_id, labs, tests, standards, domains, capabilities, self.queries.alias_graph
+        )
+        self.load_seconds = round(time.perf_counter() - started, 3)
+        self.loaded_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+        print(f"[OK] Capability matrix for build {build_id} loaded from snapshot in {self.load_seconds}s")
+
+    def status(self):
+        status = {
+            "loaded": self.matrix is not None,
+            "loaded_at": self.loaded_at,
+            "load_seconds": self.load_seconds,
+        }
+        if self.matrix is not None:
+            status.update(self.matrix.stats())
+        return status
+
+
+class SnapshotQueries:
+    """
+    LabQueries interface over a snapshot file. alias_graph resolves standard
+    alias classes of queries (the classes of the snapshot's standards were
+    resolved when it was published).
+    """
+
+    search_modes = ("like",)
+
+    def __init__(self, path, alias_graph, check_seconds=FILE_CHECK_SECONDS):
+        self.path = Path(path).resolve()
+        self.alias_graph = alias_graph
+        self.check_seconds = check_seconds
+        self.matrix_service = SnapshotMatrixService(self)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._file = None
+        self._meta = None
+        self._checked_at = 0.0
+        self._check_file()
+
+    def _open(self):
+        lite = sqlite3.connect(
+            f"{self.path.as_uri()}?mode=ro&immutable=1", uri=True, check_same_thread=False
+        )
+        lite.row_factory = sqlite3.Row
+        lite.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+        return lite
+
+    def _check_file(self):
+        """Switch to a file newly published at path (looked at once every check_seconds)."""
+        with self._lock:
+            if self._meta is not None and time.monotonic() - self._checked_at < self.check_seconds:
+                return
+            self._checked_at = time.monotonic()
+            stat = self.path.stat()
+            file = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if file == self._file:
+                return
+            lite = self._open()
+            try:
+                meta = read_meta(lite)
+            finally:
+                lite.close()
+            if meta.get("format") != SNAPSHOT_FORMAT:
+                raise ValueError(f"{self.path} is not a format {SNAPSHOT_FORMAT} snapshot")
+            self._file, self._meta = file, meta
+
+    def connection(self):
+        """This thread's connection to the current file."""
+        self._check_file()
+        local = self._local
+        key = (self._file, os.getpid())
+        if getattr(local, "key", None) != key:
+            # A connection opened before a fork is not reused (nor closed) in the child
+            if getattr(local, "conn", None) is not None and local.key[1] == os.getpid():
+                local.conn.close()
+            local.conn = self._open()
+            local.key = key
+        return local.conn
+
+    def _rows(self, sql, params=()):
+        return [dict(row) for row in self.connection().execute(sql, params)]
+
+    def _check_mode(self, mode):
+        if mode not in self.search_modes:
+            raise ValueError(f"mode {mode} needs the Postgres backend")
+
+    def build_id(self):
+        self._check_file()
+        return self._meta["build_id"]
+
+    def backend_status(self):
+        self._check_file()
+        return {
+            "backend": "snapshot",
+            "snapshot": {
+                "path": str(self.path),
+                "build_id": self._meta["build_id"],
+                "published_at": self._meta["published_at"],
+                "size_bytes": self._file[2],
+            },
+            "search_modes": list(self.search_modes),
+        }
+
+    def active_lab_count(self):
+        return self.connection().execute("SELECT COUNT(*) FROM labs").fetchone()[0]
+
+    def statistics(self, history=0):
+        self._check_file()
+        result = dict(self._meta["statistics"])
+        if history:
+            result["history"] = result.get("history", [])[:history]
+        else:
+            result.pop("history", None)
+        return result
+
+    def domains(self):
+        return self._rows(
+            """
+            SELECT domain_id, domain_name, total_capabilities, lab_count
+            FROM domains
+            ORDER BY total_capabilities DESC
+            """
+        )
+
+    def labs_by_name(self, query=None, limit=100):
+        query = (query or "").strip()
+        if query:
+            return self._rows(
+                """
+                SELECT lab_id, lab_name, capability_count
+                FROM labs
+                WHERE lab_id IN (SELECT rowid FROM labs_fts WHERE lab_name LIKE ?)
+                ORDER BY capability_count DESC, lab_name
+                LIMIT ?
+                """,
+                (f"%{query}%", limit)
+            )
+        return self._rows(
+            "SELECT lab_id, lab_name, capability_count FROM labs ORDER BY capability_count DESC, lab_name LIMIT ?",
+            (limit,)
+        )
+
+    def _lab(self, lab_id):
+        row = self.connection().execute(
+            "SELECT lab_id, lab_name, created_at, updated_at FROM labs WHERE lab_id = ?", (lab_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def lab_detail(self, lab_id):
+        """Grouped lab detail, same payload as scripts/lab_details.py."""
+        lab = self._lab(lab_id)
+        if lab is None:
+            return None
+
+        domains = {}
+        tests = set()
+        standards = set()
+        rows = self.connection().execute(
+            """
+            SELECT cs.domain_name, cs.standard_id, s.standard_code, s.full_code, s.standard_body,
+                   cs.test_id, cs.test_name
+            FROM mv_capability_search cs
+            JOIN standards s ON s.standard_id = cs.standard_id
+            WHERE cs.lab_id = ?
+            """,
+            (lab_id,)
+        ).fetchall()
+        for domain_name, standard_id, standard_code, full_code, standard_body, test_id, test_name in rows:
+            domain = domains.setdefault(domain_name, {"rows": 0, "tests": set(), "standards": {}})
+            domain["rows"] += 1
+            domain["tests"].add(test_id)
+            standard = domain["standards"].setdefault(standard_id, {
+                "standard_code": standard_code,
+                "full_code": full_code,
+                "standard_body": standard_body,
+                "tests": [],
+            })
+            standard["tests"].append(test_name)
+            tests.add(test_id)
+            standards.add(standard_id)
+
+        def by_code(standard):
+            code, full = standard["standard_code"], standard["full_code"]
+            return (code is None, code or "", full is None, full or "")
+
+        grouped = []
+        for domain_name, domain in domains.items():
+            for standard in domain["standards"].values():
+                standard["tests"].sort()
+            grouped.append({
+                "domain_name": domain_name,
+                "capability_count": domain["rows"],
+                "test_count": len(domain["tests"]),
+                "standard_count": len(domain["standards"]),
+                "standards": sorted(domain["standards"].values(), key=by_code),
+            })
+        grouped.sort(key=lambda d: (-d["capability_count"], d["domain_name"]))
+
+        return {
+            "lab": lab,
+            "total_capabilities": len(rows),
+            "test_count": len(tests),
+            "standard_count": len(standards),
+            "domains": grouped,
+        }
+
+    def lab_detail_json(self, lab_id):
+        detail = self.lab_detail(lab_id)
+        return json.dumps(detail) if detail is not None else None
+
+    def lab_detail_flat(self, lab_id):
+        lab = self._lab(lab_id)
+        if lab is None:
+            return None
+        capabilities = self._rows(
+            """
+            SELECT cs.test_name, s.standard_code, s.full_code, s.standard_body, cs.domain_name
+            FROM mv_capability_search cs
+            JOIN standards s ON s.standard_id = cs.standard_id
+            WHERE cs.lab_id = ?
+            ORDER BY cs.domain_name, cs.test_name
+            """,
+            (lab_id,)
+        )
+        domain_summary = self._rows(
+            """
+            SELECT domain_name, COUNT(*) AS capability_count
+            FROM mv_capability_search
+            WHERE lab_id = ?
+            GROUP BY domain_id, domain_name
+            ORDER BY capability_count DESC
+            """,
+            (lab_id,)
+        )
+        return {
+            "lab": lab,
+            "capabilities": capabilities,
+            "domain_summary": domain_summary,
+            "total_capabilities": len(capabilities),
+        }
+
+    def _with_lab_names(self, rows, id_column):
+        if not rows:
+            return rows
+        ids = [row[id_column] for row in rows]
+        names = {}
+        for item_id, lab_name in self.connection().execute(
+            f"""
+            SELECT DISTINCT {id_column}, lab_name
+            FROM mv_capability_search
+            WHERE {id_column} IN ({', '.join(['?'] * len(ids))})
+            ORDER BY lab_name
+            """,
+            ids
+        ):
+            names.setdefault(item_id, []).append(lab_name)
+        for row in rows:
+            row["lab_names"] = names.get(row[id_column], [])
+        return rows
+
+    def search_tests(self, query, limit=20, mode="like", threshold=0.3, lab_names=False):
+        self._check_mode(mode)
+        rows = self._rows(
+            """
+            SELECT test_id, test_name, lab_count
+            FROM tests
+            WHERE test_id IN (SELECT rowid FROM tests_fts WHERE test_name LIKE ?)
+            ORDER BY lab_count DESC, test_name
+            LIMIT ?
+            """,
+            (f"%{query}%", limit)
+        )
+        return self._with_lab_names(rows, "test_id") if lab_names else rows
+
+    def search_standards(self, query, limit=20, mode="like", threshold=0.3, lab_names=False):
+        self._check_mode(mode)
+        query = canonical_standard(query)
+        rows = self._rows(
+            """
+            SELECT standard_id, standard_code, full_code, standard_body, lab_count
+            FROM standards
+            WHERE standard_id IN (SELECT rowid FROM standards_fts WHERE standard_code LIKE ?)
+               OR class_key = ?
+            ORDER BY lab_count DESC, standard_code
+            LIMIT ?
+            """,
+            (f"%{query}%", self.alias_graph.class_key(query), limit)
+        )
+        return self._with_lab_names(rows, "standard_id") if lab_names else rows
+
+    def _search_cursor(self, search, after, limit):
+        """Run LabSearch.page_query (Postgres placeholders become SQLite ones)."""
+        self._check_mode(search.mode)
+        query, params = search.page_query(after, limit)
+        params[-1] = -1 if limit is None else limit
+        return self.connection().execute(query.replace("%s", "?"), params)
+
+    def _estimate_total(self, search):
+        """Exact count: summary counts for domain-only and standard-only searches, else COUNT(*)."""
+        lite = self.connection()
+        criteria = [name for name in ("test_name", "standard", "lab_name", "domain") if getattr(search, name)]
+        if criteria == ["domain"]:
+            row = lite.execute(
+                "SELECT total_capabilities FROM domains WHERE domain_name = ?", (search.domain,)
+            ).fetchone()
+            return (row[0] if row else 0), "summary"
+        if criteria == ["standard"]:
+            row = lite.execute(
+                f"SELECT COALESCE(SUM(s.capability_count), 0) FROM standards s WHERE {STANDARD_CONDITION}".replace("%s", "?"),
+                (f"%{search.standard}%", search.class_key)
+            ).fetchone()
+            return row[0], "summary"
+
+        conditions, params, _, _ = search._filters()
+        row = lite.execute(
+            f"""
+            SELECT COUNT(*)
+            FROM mv_capability_search cs
+            JOIN standards s ON s.standard_id = cs.standard_id
+            WHERE {' AND '.join(conditions)}
+            """.replace("%s", "?"),
+            params
+        ).fetchone()
+        return row[0], "count"
+
+    def search_labs(self, search, cursor=None, limit=50):
+        after = search.decode_cursor(cursor) if cursor else None
+        rows = [dict(row) for row in self._search_cursor(search, after, limit + 1)]
+        total_estimate, estimate_source = self._estimate_total(search)
+        return {
+            "results": rows[:limit],
+            "next_cursor": search.encode_cursor(rows[limit - 1]) if len(rows) > limit else None,
+            "total_estimate": total_estimate,
+            "total_estimate_source": estimate_source,
+        }
+
+    def iter_search_rows(self, search, cursor=None, limit=None):
+        after = search.decode_cursor(cursor) if cursor else None
+        for row in self._search_cursor(search, after, limit):
+            yield dict(row)
+
+    def recommend(self, test_name="", standard="", domain="", limit=20, engine="matrix"):
+        """Ranked labs from the snapshot's capability matrix (engine is always "matrix")."""
+        standard = canonical_standard(standard)
+        matrix = self.matrix_service.start().matrix
+        return {
+            "results": matrix.recommend(test_name, standard, domain, limit),
+            "engine": "matrix",
+            "build_id": matrix.build_id,
+        }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Publish the latest build as a read-only SQLite snapshot")
+    parser.add_argument("--output", type=Path, default=DEFAULT_SNAPSHOT_PATH)
+    parser.add_argument("--force", action="store_true", help="rewrite even if the snapshot holds the latest build")
+    args = parser.parse_args()
+
+    publish_snapshot(args.output, force=args.force)
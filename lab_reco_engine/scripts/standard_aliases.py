@@ -0,0 +1,273 @@
+"""
+Standard alias graph built from config/standard_aliases.yaml.
+
+Each yaml entry (variant -> target) is an edge between two standard codes. Codes
+are normalized with alias_key(), edges are merged with union-find (transitive
+closure), and every connected component gets one canonical class key: its
+smallest member code. The build stage writes each standard's class key to
+standard_equivalence, so the API can find every equivalent standard with one
+indexed lookup on class_key.
+
+The closure is only as good as the yaml: one wrong or truncated entry joins two
+unrelated families. Entries with a truncated code ("IEC60068-2-") are rejected.
+A component larger than MAX_CLASS_SIZE, or holding a KNOWN_UNRELATED pair, is
+split by cutting its bridging edges; the direct edges inside each piece stay.
+A graph that separates a KNOWN_EQUIVALENT pair is refused.
+"""
+
+import re
+from pathlib import Path
+
+import yaml
+
+from .entity_resolution import canonical_standard
+
+ALIASES_PATH = Path(__file__).parent.parent / "config" / "standard_aliases.yaml"
+
+_DASHES_RE = re.compile(r'-{2,}')
+
+# Real equivalence classes are a handful of codes (IEC, IS, EN editions and
+# renumberings); anything bigger has been chained together by a wrong entry.
+MAX_CLASS_SIZE = 6
+
+# Codes that must never end up in one class, whatever the yaml says
+KNOWN_UNRELATED = (
+    ("IS 2071", "IEC 60076-1"),
+    ("IS 2071", "IS 2026"),
+    ("IEC 60335-1", "IEC 60034-1"),
+    ("CISPR 22", "CISPR 14"),
+    ("CISPR 22", "CISPR 13"),
+    ("IEC 60068-2-1", "IEC 60068-2-2"),
+    ("IEC 60068-2-14", "IEC 60512-11-4"),
+)
+
+# Codes that must stay in one class, so splitting never loses them
+KNOWN_EQUIVALENT = (
+    ("CISPR 22", "CISPR 32"),
+    ("IEC 60060-1", "IS 2071"),
+)
+
+
+def alias_key(code):
+    """
+    Comparable form of a standard code: canonical_standard() output, upper-case,
+    with repeated dashes collapsed ("IEC 60068 --2-1" -> "IEC 60068-2-1").
+    A trailing dash is kept, so truncated codes stay recognizable.
+    """
+    key = canonical_standard(str(code or ''))
+    key = _DASHES_RE.sub('-', key).strip()
+    return key.upper()
+
+
+def is_truncated(key):
+    """True for codes cut off after a separator ("IEC 60068-2-"), which would
+    otherwise become a hub joining every part of the standard."""
+    return key.endswith('-')
+
+
+def _edge_betweenness(adjacency):
+    """
+    Shortest-path edge betweenness of an unweighted graph ({node: set(nodes)}),
+    with Brandes' algorithm: how many shortest paths between two codes go
+    through each edge. Bridges between two clusters carry the most.
+    """
+    betweenness = {}
+    for source in adjacency:
+        order, paths, parents = [source], {source: 1}, {source: []}
+        distance = {source: 0}
+        for node in order:
+            for neighbour in adjacency[node]:
+                if neighbour not in distance:
+                    distance[neighbour] = distance[node] + 1
+                    paths[neighbour] = 0
+                    parents[neighbour] = []
+                    order.append(neighbour)
+                if distance[neighbour] == distance[node] + 1:
+                    paths[neighbour] += paths[node]
+                    parents[neighbour].append(node)
+        dependency = dict.fromkeys(order, 0.0)
+        for node in reversed(order):
+            for parent in parents[node]:
+                share = paths[parent] / paths[node] * (1.0 + dependency[node])
+                edge = (min(parent, node), max(parent, node))
+                betweenness[edge] = betweenness.get(edge, 0.0) + share
+                dependency[parent] += share
+    return betweenness
+
+
+def _components(nodes, adjacency):
+    """Connected components of nodes, as sorted lists."""
+    seen = set()
+    components = []
+    for node in sorted(nodes):
+        if node in seen:
+            continue
+        seen.add(node)
+        component = [node]
+        for member in component:
+            for neighbour in adjacency[member]:
+                if neighbour not in seen:
+                    seen.add(neighbour)
+                    component.append(neighbour)
+        components.append(sorted(component))
+    return components
+
+
+def _same_piece(pieces, a, b):
+    """False when a and b are both in pieces but in different ones."""
+    piece_of = {key: index for index, piece in enumerate(pieces) for key in piece}
+    return a not in piece_of or b not in piece_of or piece_of[a] == piece_of[b]
+
+
+class AliasGraph:
+    """Equivalence classes of standard codes (connected components of the alias map)."""
+
+    def __init__(self, aliases, max_class_size=MAX_CLASS_SIZE):
+        parent = {}
+        # Entries skipped for a truncated code, as (variant, target)
+        self.rejected = []
+        # Components that had to be split, as (smallest code, size, number of classes)
+        self.split = []
+
+        def find(key):
+            parent.setdefault(key, key)
+            root = key
+            while parent[root] != root:
+                root = parent[root]
+            while parent[key] != root:
+                parent[key], key = root, parent[key]
+            return root
+
+        # Times each edge is stated in the yaml (either direction)
+        weights = {}
+        for variant, target in aliases.items():
+            a, b = alias_key(variant), alias_key(target)
+            if not a or not b:
+                continue
+            if is_truncated(a) or is_truncated(b):
+                self.rejected.append((variant, target))
+                continue
+            root_a, root_b = find(a), find(b)
+            if root_a != root_b:
+                parent[max(root_a, root_b)] = min(root_a, root_b)
+            if a != b:
+                edge = (min(a, b), max(a, b))
+                weights[edge] = weights.get(edge, 0) + 1
+
+        components = {}
+        for key in parent:
+            components.setdefault(find(key), []).append(key)
+
+        unrelated = [(alias_key(a), alias_key(b)) for a, b in KNOWN_UNRELATED]
+        equivalent = [(alias_key(a), alias_key(b)) for a, b in KNOWN_EQUIVALENT]
+
+        def acceptable(keys):
+            members = set(keys)
+            return len(keys) <= max_class_size and not any(
+                a in members and b in members for a, b in unrelated
+            )
+
+        self.members = {}
+        self.class_of = {}
+        for keys in components.values():
+            keys.sort()
+            classes = [keys]
+            if not acceptable(keys):
+                classes = self._split(keys, weights, acceptable, equivalent)
+                self.split.append((keys[0], len(keys), len(classes)))
+            for members in classes:
+                self.members[members[0]] = members
+                for key in members:
+                    self.class_of[key] = members[0]
+        self.split.sort(key=lambda item: (-item[1], item[0]))
+
+        apart = [
+            (a, b) for a, b in KNOWN_EQUIVALENT
+            if self.class_key(a) != self.class_key(b)
+        ]
+        if apart:
+            pairs = ', '.join(f"{a} ~ {b}" for a, b in apart)
+            raise ValueError(f"Alias map no longer joins equivalent standards: {pairs}")
+
+    @staticmethod
+    def _split(keys, weights, acceptable, equivalent):
+        """
+        Split a component into acceptable classes by cutting bridging edges:
+        repeatedly remove the edge with the highest betweenness per yaml
+        statement (an edge stated several times is kept longest) until every
+        piece is acceptable. The direct edges inside each piece are kept, and
+        no cut separates an equivalent pair; a piece with no edge left to cut
+        is kept as it is.
+        """
+        members = set(keys)
+        adjacency = {key: set() for key in keys}
+        for a, b in weights:
+            if a in members and b in members:
+                adjacency[a].add(b)
+                adjacency[b].add(a)
+
+        classes = []
+        pending = [keys]
+        while pending:
+            piece = pending.pop()
+            if acceptable(piece):
+                classes.append(piece)
+                continue
+            betweenness = _edge_betweenness({key: adjacency[key] for key in piece})
+            pairs = [(a, b) for a, b in equivalent if a in adjacency and b in adjacency]
+            for a, b in sorted(betweenness, key=lambda edge: (betweenness[edge] / weights[edge], edge), reverse=True):
+                adjacency[a].discard(b)
+                adjacency[b].discard(a)
+                pieces = _components(piece, adjacency)
+                if all(_same_piece(pieces, x, y) for x, y in pairs):
+                    break
+                adjacency[a].add(b)
+                adjacency[b].add(a)
+            else:
+                classes.append(piece)
+                continue
+            pending.extend(pieces)
+        return sorted(classes)
+
+    def class_key(self, code):
+        """Canonical class key of code; codes without aliases are their own class."""
+        key = alias_key(code)
+        return self.class_of.get(key, key)
+
+    def equivalents(self, code):
+        """Every alias code equivalent to code (including itself)."""
+        class_key = self.class_key(code)
+        return self.members.get(class_key, [class_key])
+
+    def stats(self):
+        sizes = [len(keys) for keys in self.members.values()]
+        return {
+            "codes": len(self.class_of),
+            "classes": len(sizes),
+            "largest_class": max(sizes, default=0),
+            "rejected_entries": len(self.rejected),
+            "split_components": len(self.split),
+        }
+
+
+def load_alias_graph(path=ALIASES_PATH):
+    with open(path, encoding="utf-8") as f:
+        aliases = yaml.safe_load(f) or {}
+    graph = AliasGraph(aliases)
+    for variant, target in graph.rejected:
+        print(f"[WARNING] {path}: skipping truncated alias {variant!r}: {target!r}")
+    if graph.split:
+        components = ', '.join(f"{key} ({size} -> {count})" for key, size, count in graph.split)
+        print(f"[WARNING] {path}: split {len(graph.split)} chained alias components: {components}")
+    return graph
+
+
+_alias_graph = None
+
+
+def get_alias_graph():
+    """The alias graph for config/standard_aliases.yaml, built on first use."""
+    global _alias_graph
+    if _alias_graph is None:
+        _alias_graph = load_alias_graph()
+    return _alias_graph
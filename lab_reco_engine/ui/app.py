@@ -4,8 +4,7 @@ Modern web interface for finding and recommending testing laboratories
 """
 
 import streamlit as st
-import psycopg2
-from psycopg2.extras import RealDictCursor
+import os
 import sys
 from pathlib import Path
 import pandas as pd
@@ -13,6 +12,14 @@ import pandas as pd
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
+from scripts.entity_resolution import canonical_standard
+from scripts.lab_details import capability_table
+from scripts.lab_queries import LabQueries, create_pool
+from scripts.lab_search import LabSearch
+from scripts.recommender import MatrixService
+from scripts.snapshot import SnapshotQueries
+from scripts.standard_aliases import get_alias_graph
+
 # Page configuration
 st.set_page_config(
     page_title="Lab Recommendation Engine",
@@ -21,153 +28,103 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Database configuration
-def get_db_connection():
-    """Get database connection."""
-    return psycopg2.connect(
-        dbname="lab_reco_engine",
-        user="postgres",
-        password="2003",
-        host="localhost",
-        port=5432
+# Shared query service (scripts/lab_queries.py, same queries as the API)
+@st.cache_resource
+def get_queries():
+    """
+    One connection pool and capability matrix for all sessions of this
+    Streamlit process (database credentials: scripts/lab_queries.py), or
+    the snapshot file at LAB_RECO_SNAPSHOT (scripts/snapshot.py).
+    """
+    alias_graph = get_alias_graph()
+    if os.environ.get("LAB_RECO_SNAPSHOT"):
+        return SnapshotQueries(os.environ["LAB_RECO_SNAPSHOT"], alias_graph)
+    pool = create_pool()
+    return LabQueries(pool, alias_graph, MatrixService(pool.connection, alias_graph))
+
+def current_build():
+    """
+    Latest published build id. The load_* functions below take it as an
+    argument, so their st.cache_data entries are reused across reruns and
+    sessions until the pipeline publishes a new build.
+    """
+    return get_queries().build_id()
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def load_domains(build_id):
+    return get_queries().domains()
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def load_statistics(build_id):
+    """Statistics snapshot of the build (scripts/build_statistics.py) with build history."""
+    return get_queries().statistics(history=20)
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def load_search_page(test_name, standard, domain, limit, cursor, build_id):
+    search = LabSearch(
+        test_name=test_name,
+        standard=standard,
+        domain=domain,
+        class_key=get_alias_graph().class_key(standard)
     )
+    return get_queries().search_labs(search, cursor, limit)
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def load_recommendations(test_name, standard, domain, limit, engine, build_id):
+    return get_queries().recommend(test_name, standard, domain, limit, engine)
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def load_labs_by_name(query, limit, build_id):
+    return get_queries().labs_by_name(query, limit)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def load_lab_details(lab_id, build_id):
+    """Grouped lab detail payload (scripts/lab_details.py), one query per lab."""
+    return get_queries().lab_detail(lab_id)
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def load_test_search(query, limit, build_id):
+    return get_queries().search_tests(query, limit, lab_names=True)
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def load_standard_search(query, limit, build_id):
+    return get_queries().search_standards(query, limit, lab_names=True)
 
 def get_domains():
     """Get list of all domains."""
     try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        cur.execute("""
-            SELECT domain_name, COUNT(*) AS capability_count
-            FROM domains d
-            JOIN lab_capabilities lc ON lc.domain_id = d.domain_id
-            GROUP BY d.domain_id, d.domain_name
-            ORDER BY capability_count DESC
-        """)
-        domains = cur.fetchall()
-        cur.close()
-        conn.close()
-        return [d['domain_name'] for d in domains]
+        return [d['domain_name'] for d in load_domains(current_build())]
     except Exception as e:
         st.error(f"Database error: {str(e)}")
         return []
 
-def search_labs(test_name=None, standard=None, domain=None, limit=50):
-    """Search for labs."""
+def search_labs(test_name=None, standard=None, domain=None, limit=50, cursor=None):
+    """
+    Search for labs, one page at a time (keyset pagination, scripts/lab_search.py).
+    Returns {"results", "next_cursor", "total_estimate"}; pass next_cursor back for the next page.
+    """
     try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        conditions = ["l.deleted_at IS NULL"]
-        params = []
-        
-        if test_name:
-            conditions.append("LOWER(t.test_name) LIKE LOWER(%s)")
-            params.append(f'%{test_name}%')
-        
-        if standard:
-            conditions.append("LOWER(s.standard_code) LIKE LOWER(%s)")
-            params.append(f'%{standard}%')
-        
-        if domain:
-            conditions.append("d.domain_name = %s")
-            params.append(domain)
-        
-        query = f"""
-            SELECT DISTINCT
-                l.lab_id,
-                l.lab_name,
-                t.test_name,
-                s.standard_code,
-                s.full_code,
-                s.standard_body,
-                d.domain_name
-            FROM labs l
-            JOIN lab_capabilities lc ON lc.lab_id = l.lab_id
-            JOIN tests t ON t.test_id = lc.test_id
-            JOIN standards s ON s.standard_id = lc.standard_id
-            JOIN domains d ON d.domain_id = lc.domain_id
-            WHERE {' AND '.join(conditions)}
-            ORDER BY l.lab_name, t.test_name
-            LIMIT %s
-        """
-        params.append(limit)
-        
-        cur.execute(query, params)
-        results = cur.fetchall()
-        
-        cur.close()
-        conn.close()
-        
-        return [dict(row) for row in results]
+        return load_search_page(
+            (test_name or '').strip(), canonical_standard(standard or ''), domain or '',
+            limit, cursor, current_build()
+        )
     except Exception as e:
         st.error(f"Search error: {str(e)}")
-        return []
+        return {'results': [], 'next_cursor': None, 'total_estimate': 0}
 
 def get_recommendations(test_name=None, standard=None, domain=None, limit=20):
-    """Get ranked lab recommendations."""
+    """
+    Get ranked lab recommendations: in memory from the capability matrix once
+    it is loaded, from the summary views until then.
+    """
     try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        conditions = ["l.deleted_at IS NULL"]
-        params = []
-        
-        if test_name:
-            conditions.append("LOWER(t.test_name) LIKE LOWER(%s)")
-            params.append(f'%{test_name}%')
-        
-        if standard:
-            conditions.append("LOWER(s.standard_code) LIKE LOWER(%s)")
-            params.append(f'%{standard}%')
-        
-        if domain:
-            conditions.append("d.domain_name = %s")
-            params.append(domain)
-        
-        query = f"""
-            WITH lab_scores AS (
-                SELECT 
-                    l.lab_id,
-                    l.lab_name,
-                    COUNT(DISTINCT lc.test_id) AS matching_tests,
-                    COUNT(DISTINCT lc.standard_id) AS matching_standards,
-                    COUNT(DISTINCT lc.domain_id) AS matching_domains,
-                    COUNT(*) AS total_matches,
-                    array_agg(DISTINCT t.test_name) AS test_names,
-                    array_agg(DISTINCT s.standard_code) AS standard_codes
-                FROM labs l
-                JOIN lab_capabilities lc ON lc.lab_id = l.lab_id
-                JOIN tests t ON t.test_id = lc.test_id
-                JOIN standards s ON s.standard_id = lc.standard_id
-                JOIN domains d ON d.domain_id = lc.domain_id
-                WHERE {' AND '.join(conditions)}
-                GROUP BY l.lab_id, l.lab_name
-            )
-            SELECT 
-                lab_id,
-                lab_name,
-                matching_tests,
-                matching_standards,
-                matching_domains,
-                total_matches,
-                test_names[1:5] AS sample_tests,
-                standard_codes[1:5] AS sample_standards,
-                (matching_tests * 10 + matching_standards * 5 + matching_domains * 1) AS relevance_score
-            FROM lab_scores
-            WHERE total_matches > 0
-            ORDER BY relevance_score DESC, matching_tests DESC, matching_standards DESC
-            LIMIT %s
-        """
-        params.append(limit)
-        
-        cur.execute(query, params)
-        results = cur.fetchall()
-        
-        cur.close()
-        conn.close()
-        
-        return [dict(row) for row in results]
+        queries = get_queries()
+        engine = 'matrix' if queries.matrix_service.start().matrix is not None else 'sql'
+        result = load_recommendations(
+            (test_name or '').strip(), canonical_standard(standard or ''), domain or '',
+            limit, engine, current_build()
+        )
+        return result['results']
     except Exception as e:
         st.error(f"Recommendation error: {str(e)}")
         return []
@@ -175,193 +132,119 @@ def get_recommendations(test_name=None, standard=None, domain=None, limit=20):
 def search_labs_by_name(query=None, limit=100):
     """Search for labs by name."""
     try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        if query:
-            # Clean and prepare the query - trim whitespace
-            query_clean = query.strip()
-            if not query_clean:
-                # If query is empty after trimming, return all labs
-                query = None
-            else:
-                # Create search pattern with wildcards
-                search_pattern = f'%{query_clean}%'
-        
-        if query:
-            cur.execute("""
-                SELECT 
-                    l.lab_id,
-                    l.lab_name,
-                    COUNT(lc.lab_id) AS capability_count
-                FROM labs l
-                LEFT JOIN lab_capabilities lc ON lc.lab_id = l.lab_id
-                WHERE l.deleted_at IS NULL
-                  AND LOWER(l.lab_name) LIKE LOWER(%s)
-                GROUP BY l.lab_id, l.lab_name
-                ORDER BY capability_count DESC, l.lab_name
-                LIMIT %s
-            """, (search_pattern, limit))
-        else:
-            cur.execute("""
-                SELECT 
-                    l.lab_id,
-                    l.lab_name,
-                    COUNT(lc.lab_id) AS capability_count
-                FROM labs l
-                LEFT JOIN lab_capabilities lc ON lc.lab_id = l.lab_id
-                WHERE l.deleted_at IS NULL
-                GROUP BY l.lab_id, l.lab_name
-                ORDER BY capability_count DESC, l.lab_name
-                LIMIT %s
-            """, (limit,))
-        
-        results = cur.fetchall()
-        cur.close()
-        conn.close()
-        
-        return [dict(r) for r in results]
+        return load_labs_by_name((query or '').strip(), limit, current_build())
     except Exception as e:
         st.error(f"Error searching labs: {str(e)}")
-        import traceback
-        st.error(f"Details: {traceback.format_exc()}")
         return []
 
 def get_lab_details(lab_id):
-    """Get detailed information about a lab."""
+    """Get detailed information about a lab (grouped by domain and standard)."""
     try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cur.execute("""
-            SELECT lab_id, lab_name, created_at
-            FROM labs
-            WHERE lab_id = %s AND deleted_at IS NULL
-        """, (lab_id,))
-        lab = cur.fetchone()
-        
-        if not lab:
-            return None
-        
-        cur.execute("""
-            SELECT 
-                t.test_name,
-                s.standard_code,
-                s.full_code,
-                d.domain_name
-            FROM lab_capabilities lc
-            JOIN tests t ON t.test_id = lc.test_id
-            JOIN standards s ON s.standard_id = lc.standard_id
-            JOIN domains d ON d.domain_id = lc.domain_id
-            WHERE lc.lab_id = %s
-            ORDER BY d.domain_name, t.test_name
-        """, (lab_id,))
-        capabilities = cur.fetchall()
-        
-        cur.execute("""
-            SELECT 
-                d.domain_name,
-                COUNT(*) AS capability_count
-            FROM lab_capabilities lc
-            JOIN domains d ON d.domain_id = lc.domain_id
-            WHERE lc.lab_id = %s
-            GROUP BY d.domain_id, d.domain_name
-            ORDER BY capability_count DESC
-        """, (lab_id,))
-        domain_summary = cur.fetchall()
-        
-        cur.close()
-        conn.close()
-        
-        return {
-            'lab': dict(lab),
-            'capabilities': [dict(c) for c in capabilities],
-            'domain_summary': [dict(d) for d in domain_summary]
-        }
+        return load_lab_details(lab_id, current_build())
     except Exception as e:
         st.error(f"Error fetching lab details: {str(e)}")
         return None
 
+def render_lab_details(details, lab_id):
+    """Display a grouped lab detail payload."""
+    lab = details['lab']
+    domains = details['domains']
+    
+    st.markdown("---")
+    st.markdown("## 📊 Lab Information")
+    
+    # Lab info
+    st.subheader(f"🏢 {lab['lab_name']}")
+    st.caption(f"Lab ID: {lab['lab_id']} | Created: {lab['created_at']}")
+    
+    # Domain summary
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Total Capabilities", details['total_capabilities'])
+    with col2:
+        st.metric("Unique Domains", len(domains))
+    with col3:
+        st.metric("Unique Tests", details['test_count'])
+    with col4:
+        st.metric("Unique Standards", details['standard_count'])
+    
+    # Domain breakdown
+    st.subheader("Domain Distribution")
+    domain_data = {d['domain_name']: d['capability_count'] for d in domains}
+    st.bar_chart(domain_data)
+    
+    # Capabilities grouped by domain -> standard
+    st.subheader("Capabilities by Domain")
+    for domain in domains:
+        with st.expander(
+            f"{domain['domain_name']} — {domain['capability_count']} capabilities, "
+            f"{domain['standard_count']} standards, {domain['test_count']} tests"
+        ):
+            st.dataframe(
+                [
+                    {
+                        'standard_code': standard['standard_code'],
+                        'full_code': standard['full_code'],
+                        'standard_body': standard['standard_body'],
+                        'test_count': len(standard['tests']),
+                        'tests': ', '.join(standard['tests']),
+                    }
+                    for standard in domain['standards']
+                ],
+                column_config={
+                    "standard_code": "Standard Code",
+                    "full_code": "Full Code",
+                    "standard_body": "Standard Body",
+                    "test_count": "Tests",
+                    "tests": "Test Names"
+                },
+                hide_index=True,
+                use_container_width=True
+            )
+    
+    # Flat capabilities table
+    df = capability_table(details)
+    with st.expander("All Capabilities (one row per test and standard)"):
+        st.dataframe(
+            df,
+            column_config={
+                "test_name": "Test Name",
+                "standard_code": "Standard Code",
+                "full_code": "Full Code",
+                "standard_body": "Standard Body",
+                "domain_name": "Domain"
+            },
+            hide_index=True,
+            use_container_width=True
+        )
+    
+    # Download button
+    st.download_button(
+        label="📥 Download Capabilities as CSV",
+        data=df.to_csv(index=False),
+        file_name=f"lab_{lab_id}_capabilities.csv",
+        mime="text/csv"
+    )
+
+def format_lab_names(results):
+    """Join each result's lab names for display."""
+    return [
+        {**r, 'lab_names': ', '.join(r['lab_names']) if r['lab_names'] else 'No labs found'}
+        for r in results
+    ]
+
 def search_tests(query, limit=20):
     """Search for tests."""
     try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cur.execute("""
-            SELECT 
-                t.test_id,
-                t.test_name,
-                COUNT(DISTINCT lc.lab_id) AS lab_count,
-                array_agg(DISTINCT l.lab_name ORDER BY l.lab_name) AS lab_names
-            FROM tests t
-            JOIN lab_capabilities lc ON lc.test_id = t.test_id
-            JOIN labs l ON l.lab_id = lc.lab_id
-            WHERE LOWER(t.test_name) LIKE LOWER(%s)
-              AND l.deleted_at IS NULL
-            GROUP BY t.test_id, t.test_name
-            ORDER BY lab_count DESC, t.test_name
-            LIMIT %s
-        """, (f'%{query}%', limit))
-        
-        results = cur.fetchall()
-        cur.close()
-        conn.close()
-        
-        # Convert array to list and format lab names
-        formatted_results = []
-        for r in results:
-            result_dict = dict(r)
-            if result_dict['lab_names']:
-                result_dict['lab_names'] = ', '.join(result_dict['lab_names'])
-            else:
-                result_dict['lab_names'] = 'No labs found'
-            formatted_results.append(result_dict)
-        
-        return formatted_results
+        return format_lab_names(load_test_search(query.strip(), limit, current_build()))
     except Exception as e:
         st.error(f"Test search error: {str(e)}")
         return []
 
 def search_standards(query, limit=20):
-    """Search for standards."""
+    """Search for standards (aliases included)."""
     try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cur.execute("""
-            SELECT 
-                s.standard_id,
-                s.standard_code,
-                s.full_code,
-                s.standard_body,
-                COUNT(DISTINCT lc.lab_id) AS lab_count,
-                array_agg(DISTINCT l.lab_name ORDER BY l.lab_name) AS lab_names
-            FROM standards s
-            JOIN lab_capabilities lc ON lc.standard_id = s.standard_id
-            JOIN labs l ON l.lab_id = lc.lab_id
-            WHERE LOWER(s.standard_code) LIKE LOWER(%s)
-              AND l.deleted_at IS NULL
-            GROUP BY s.standard_id, s.standard_code, s.full_code, s.standard_body
-            ORDER BY lab_count DESC, s.standard_code
-            LIMIT %s
-        """, (f'%{query}%', limit))
-        
-        results = cur.fetchall()
-        cur.close()
-        conn.close()
-        
-        # Convert array to list and format lab names
-        formatted_results = []
-        for r in results:
-            result_dict = dict(r)
-            if result_dict['lab_names']:
-                result_dict['lab_names'] = ', '.join(result_dict['lab_names'])
-            else:
-                result_dict['lab_names'] = 'No labs found'
-            formatted_results.append(result_dict)
-        
-        return formatted_results
+        return format_lab_names(load_standard_search(canonical_standard(query), limit, current_build()))
     except Exception as e:
         st.error(f"Standard search error: {str(e)}")
         return []
@@ -381,18 +264,11 @@ def main():
     
     # Database stats in sidebar
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT COUNT(*) FROM labs WHERE deleted_at IS NULL")
-        lab_count = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM lab_capabilities")
-        cap_count = cur.fetchone()[0]
-        cur.close()
-        conn.close()
+        counts = load_statistics(current_build())['statistics']['counts']
         
         st.sidebar.markdown("---")
-        st.sidebar.metric("Active Labs", f"{lab_count:,}")
-        st.sidebar.metric("Total Capabilities", f"{cap_count:,}")
+        st.sidebar.metric("Active Labs", f"{counts['labs']:,}")
+        st.sidebar.metric("Total Capabilities", f"{counts['capabilities']:,}")
     except:
         pass
     
@@ -422,52 +298,76 @@ def search_labs_page():
     with col2:
         domains = get_domains()
         domain = st.selectbox("Domain", ["All"] + domains)
-        limit = st.slider("Maximum Results", 10, 100, 50)
+        limit = st.slider("Results per Page", 10, 100, 50)
     
     if st.button("🔍 Search", type="primary"):
         if not any([test_name, standard, domain != "All"]):
             st.warning("Please enter at least one search criterion")
+            st.session_state.pop('lab_search', None)
         else:
+            criteria = {
+                'test_name': test_name if test_name else None,
+                'standard': standard if standard else None,
+                'domain': domain if domain != "All" else None,
+                'limit': limit
+            }
             with st.spinner("Searching labs..."):
-                results = search_labs(
-                    test_name=test_name if test_name else None,
-                    standard=standard if standard else None,
-                    domain=domain if domain != "All" else None,
-                    limit=limit
-                )
-            
-            if results:
-                st.success(f"Found {len(results)} matching capabilities")
-                
-                # Group by lab
-                labs_dict = {}
-                for r in results:
-                    lab_id = r['lab_id']
-                    if lab_id not in labs_dict:
-                        labs_dict[lab_id] = {
-                            'lab_name': r['lab_name'],
-                            'capabilities': []
-                        }
-                    labs_dict[lab_id]['capabilities'].append(r)
-                
-                # Display results
-                for lab_id, lab_data in labs_dict.items():
-                    with st.expander(f"🏢 {lab_data['lab_name']} ({len(lab_data['capabilities'])} capabilities)", expanded=False):
-                        df = st.dataframe(
-                            lab_data['capabilities'],
-                            column_config={
-                                "lab_id": st.column_config.NumberColumn("Lab ID", format="%d"),
-                                "test_name": "Test Name",
-                                "standard_code": "Standard Code",
-                                "full_code": "Full Code",
-                                "standard_body": "Standard Body",
-                                "domain_name": "Domain"
-                            },
-                            hide_index=True,
-                            use_container_width=True
-                        )
-            else:
-                st.info("No labs found matching your criteria")
+                page = search_labs(**criteria)
+            st.session_state['lab_search'] = {
+                'criteria': criteria,
+                'results': page['results'],
+                'next_cursor': page['next_cursor'],
+                'total_estimate': page['total_estimate']
+            }
+    
+    state = st.session_state.get('lab_search')
+    if state is not None:
+        results = state['results']
+
+        if results:
+            st.success(
+                f"Showing {len(results):,} of ~{max(state['total_estimate'], len(results)):,} matching capabilities"
+            )
+
+            # Group by lab
+            labs_dict = {}
+            for r in results:
+                lab_id = r['lab_id']
+                if lab_id not in labs_dict:
+                    labs_dict[lab_id] = {
+                        'lab_name': r['lab_name'],
+                        'capabilities': []
+                    }
+                labs_dict[lab_id]['capabilities'].append(r)
+
+            # Display results
+            for lab_id, lab_data in labs_dict.items():
+                with st.expander(f"🏢 {lab_data['lab_name']} ({len(lab_data['capabilities'])} capabilities)", expanded=False):
+                    df = st.dataframe(
+                        lab_data['capabilities'],
+                        column_config={
+                            "lab_id": st.column_config.NumberColumn("Lab ID", format="%d"),
+                            "test_id": None,
+                            "standard_id": None,
+                            "test_name": "Test Name",
+                            "standard_code": "Standard Code",
+                            "full_code": "Full Code",
+                            "standard_body": "Standard Body",
+                            "domain_name": "Domain"
+                        },
+                        hide_index=True,
+                        use_container_width=True
+                    )
+
+            # Next page continues after the last row shown (keyset cursor)
+            if state['next_cursor'] and st.button("⬇️ Load more"):
+                with st.spinner("Loading more..."):
+                    page = search_labs(cursor=state['next_cursor'], **state['criteria'])
+                state['results'] = results + page['results']
+                state['next_cursor'] = page['next_cursor']
+                st.rerun()
+        else:
+            st.info("No labs found matching your criteria")
 
 def recommendations_page():
     """Recommendations page."""
@@ -595,55 +495,7 @@ def lab_details_page():
                 details = get_lab_details(selected_lab_id)
             
             if details:
-                lab = details['lab']
-                capabilities = details['capabilities']
-                domain_summary = details['domain_summary']
-                
-                st.markdown("---")
-                st.markdown("## 📊 Lab Information")
-                
-                # Lab info
-                st.subheader(f"🏢 {lab['lab_name']}")
-                st.caption(f"Lab ID: {lab['lab_id']} | Created: {lab['created_at']}")
-                
-                # Domain summary
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.metric("Total Capabilities", len(capabilities))
-                with col2:
-                    st.metric("Unique Domains", len(domain_summary))
-                with col3:
-                    st.metric("Unique Tests", len(set(c['test_name'] for c in capabilities)))
-                
-                # Domain breakdown
-                st.subheader("Domain Distribution")
-                domain_data = {d['domain_name']: d['capability_count'] for d in domain_summary}
-                st.bar_chart(domain_data)
-                
-                # Capabilities table
-                st.subheader("All Capabilities")
-                df = st.dataframe(
-                    capabilities,
-                    column_config={
-                        "test_name": "Test Name",
-                        "standard_code": "Standard Code",
-                        "full_code": "Full Code",
-                        "standard_body": "Standard Body",
-                        "domain_name": "Domain"
-                    },
-                    hide_index=True,
-                    use_container_width=True
-                )
-                
-                # Download button
-                import pandas as pd
-                csv = pd.DataFrame(capabilities).to_csv(index=False)
-                st.download_button(
-                    label="📥 Download Capabilities as CSV",
-                    data=csv,
-                    file_name=f"lab_{selected_lab_id}_capabilities.csv",
-                    mime="text/csv"
-                )
+                render_lab_details(details, selected_lab_id)
             else:
                 st.error("Lab not found or has been deleted")
     else:
@@ -682,51 +534,7 @@ def lab_details_page():
                         with st.spinner("Loading lab details..."):
                             details = get_lab_details(selected_lab_id_all)
                         if details:
-                            # Display lab details (same as above)
-                            lab = details['lab']
-                            capabilities = details['capabilities']
-                            domain_summary = details['domain_summary']
-                            
-                            st.markdown("---")
-                            st.markdown("## 📊 Lab Information")
-                            
-                            st.subheader(f"🏢 {lab['lab_name']}")
-                            st.caption(f"Lab ID: {lab['lab_id']} | Created: {lab['created_at']}")
-                            
-                            col1, col2, col3 = st.columns(3)
-                            with col1:
-                                st.metric("Total Capabilities", len(capabilities))
-                            with col2:
-                                st.metric("Unique Domains", len(domain_summary))
-                            with col3:
-                                st.metric("Unique Tests", len(set(c['test_name'] for c in capabilities)))
-                            
-                            st.subheader("Domain Distribution")
-                            domain_data = {d['domain_name']: d['capability_count'] for d in domain_summary}
-                            st.bar_chart(domain_data)
-                            
-                            st.subheader("All Capabilities")
-                            df = st.dataframe(
-                                capabilities,
-                                column_config={
-                                    "test_name": "Test Name",
-                                    "standard_code": "Standard Code",
-                                    "full_code": "Full Code",
-                                    "standard_body": "Standard Body",
-                                    "domain_name": "Domain"
-                                },
-                                hide_index=True,
-                                use_container_width=True
-                            )
-                            
-                            import pandas as pd
-                            csv = pd.DataFrame(capabilities).to_csv(index=False)
-                            st.download_button(
-                                label="📥 Download Capabilities as CSV",
-                                data=csv,
-                                file_name=f"lab_{selected_lab_id_all}_capabilities.csv",
-                                mime="text/csv"
-                            )
+                            render_lab_details(details, selected_lab_id_all)
         else:
             st.info("Enter a lab name in the search box above to find labs.")
 
@@ -861,56 +669,41 @@ def statistics_page():
     st.markdown("Overview of the lab recommendation engine database")
     
     try:
-        conn = get_db_connection()
-        # Use regular cursor for count queries
-        cur = conn.cursor()
+        snapshot = load_statistics(current_build())
+        statistics = snapshot['statistics']
+        counts = statistics['counts']
+        deltas = snapshot['deltas'] or {'counts': {}, 'domains': {}}
+        
+        if snapshot['source'] == 'snapshot':
+            st.caption(
+                f"Build {snapshot['build_id']} • published {snapshot['built_at']}"
+                + (f" • changes vs build {snapshot['previous_build_id']}" if snapshot['previous_build_id'] else "")
+            )
+        else:
+            st.caption("No build snapshot yet: computed from the summary views")
+        
+        def delta(name):
+            change = deltas['counts'].get(name)
+            return f"{change:+,}" if change else None
         
         # Overall stats
         col1, col2, col3, col4 = st.columns(4)
-        
-        cur.execute("SELECT COUNT(*) FROM labs WHERE deleted_at IS NULL")
-        lab_count = cur.fetchone()[0]
-        
-        cur.execute("SELECT COUNT(*) FROM lab_capabilities")
-        cap_count = cur.fetchone()[0]
-        
-        cur.execute("SELECT COUNT(*) FROM tests")
-        test_count = cur.fetchone()[0]
-        
-        cur.execute("SELECT COUNT(*) FROM standards")
-        std_count = cur.fetchone()[0]
-        
         with col1:
-            st.metric("Active Labs", f"{lab_count:,}")
+            st.metric("Active Labs", f"{counts['labs']:,}", delta=delta('labs'))
         with col2:
-            st.metric("Total Capabilities", f"{cap_count:,}")
+            st.metric("Total Capabilities", f"{counts['capabilities']:,}", delta=delta('capabilities'))
         with col3:
-            st.metric("Unique Tests", f"{test_count:,}")
+            st.metric("Unique Tests", f"{counts['tests']:,}", delta=delta('tests'))
         with col4:
-            st.metric("Unique Standards", f"{std_count:,}")
+            st.metric("Unique Standards", f"{counts['standards']:,}", delta=delta('standards'))
         
         # Domain distribution
         st.subheader("Domain Distribution")
-        # Switch to RealDictCursor for structured queries
-        cur.close()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        
-        cur.execute("""
-            SELECT 
-                d.domain_name,
-                COUNT(*) AS capability_count,
-                COUNT(DISTINCT lc.lab_id) AS lab_count
-            FROM domains d
-            JOIN lab_capabilities lc ON lc.domain_id = d.domain_id
-            JOIN labs l ON l.lab_id = lc.lab_id
-            WHERE l.deleted_at IS NULL
-            GROUP BY d.domain_id, d.domain_name
-            ORDER BY capability_count DESC
-        """)
-        domain_stats = cur.fetchall()
-        
-        domain_df = pd.DataFrame([dict(row) for row in domain_stats])
+        domain_df = pd.DataFrame(statistics['domains'])
         if not domain_df.empty:
+            domain_df = domain_df[['domain_name', 'capability_count', 'lab_count']]
+            if snapshot['deltas']:
+                domain_df['change'] = domain_df['domain_name'].map(deltas['domains']).fillna(0).astype(int)
             col1, col2 = st.columns(2)
             
             with col1:
@@ -922,7 +715,8 @@ def statistics_page():
                     column_config={
                         "domain_name": "Domain",
                         "capability_count": st.column_config.NumberColumn("Capabilities", format="%d"),
-                        "lab_count": st.column_config.NumberColumn("Labs", format="%d")
+                        "lab_count": st.column_config.NumberColumn("Labs", format="%d"),
+                        "change": st.column_config.NumberColumn("Change", format="%+d")
                     },
                     hide_index=True,
                     use_container_width=True
@@ -930,25 +724,8 @@ def statistics_page():
         
         # Top labs
         st.subheader("Top Labs by Capability Count")
-        cur.execute("""
-            SELECT 
-                l.lab_id,
-                l.lab_name,
-                COUNT(*) AS total_capabilities,
-                COUNT(DISTINCT lc.test_id) AS unique_tests,
-                COUNT(DISTINCT lc.standard_id) AS unique_standards,
-                COUNT(DISTINCT lc.domain_id) AS unique_domains
-            FROM labs l
-            JOIN lab_capabilities lc ON lc.lab_id = l.lab_id
-            WHERE l.deleted_at IS NULL
-            GROUP BY l.lab_id, l.lab_name
-            ORDER BY total_capabilities DESC
-            LIMIT 20
-        """)
-        top_labs = cur.fetchall()
-        
         st.dataframe(
-            [dict(row) for row in top_labs],
+            statistics['top_labs'],
             column_config={
                 "lab_id": st.column_config.NumberColumn("Lab ID", format="%d"),
                 "lab_name": "Lab Name",
@@ -961,8 +738,40 @@ def statistics_page():
             use_container_width=True
         )
         
-        cur.close()
-        conn.close()
+        # Standard bodies
+        st.subheader("Standard Bodies")
+        body_df = pd.DataFrame(statistics['standard_bodies'])
+        if not body_df.empty:
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                st.bar_chart(body_df.head(15).set_index('standard_body')['capability_count'])
+            
+            with col2:
+                st.dataframe(
+                    body_df,
+                    column_config={
+                        "standard_body": "Standard Body",
+                        "standard_count": st.column_config.NumberColumn("Standards", format="%d"),
+                        "capability_count": st.column_config.NumberColumn("Capabilities", format="%d"),
+                        "lab_count": st.column_config.NumberColumn("Labs", format="%d")
+                    },
+                    hide_index=True,
+                    use_container_width=True
+                )
+        
+        # Build history
+        history = snapshot.get('history') or []
+        if len(history) > 1:
+            st.subheader("Build History")
+            history_df = pd.DataFrame(
+                [{'build_id': h['build_id'], **h['counts']} for h in reversed(history)]
+            ).set_index('build_id')
+            col1, col2 = st.columns(2)
+            with col1:
+                st.line_chart(history_df[['capabilities']])
+            with col2:
+                st.line_chart(history_df[['labs', 'retired_labs']])
         
     except Exception as e:
         st.error(f"Error loading statistics: {str(e)}")